@@ -0,0 +1,106 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Callable, Dict, List, Optional
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache shared by ingestion runs.
+
+    Vectors are stored in SQLite keyed on (model, sha256 of the exact embedded text), so a
+    re-run or a full reindex only pays the embedding API for texts it has not seen with that
+    model before. Vectors are kept as packed float32 blobs.
+
+    Args:
+        path: SQLite file; created on first use.
+        model: Embedding model name, part of the key so switching models never returns stale vectors.
+    """
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.model = model
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Returns the cached vectors for texts, keyed by text; missing texts are absent."""
+        hashes = {self.text_hash(text): text for text in texts}
+        found = {}
+        with self._lock:
+            keys = list(hashes)
+            for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [self.model, *chunk],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[hashes[text_hash]] = array("f", blob).tolist()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def set_many(self, texts: List[str], vectors: List[List[float]]):
+        rows = [(self.model, self.text_hash(text), array("f", vector).tobytes()) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def wrap(self, embed_batch: Callable[[List[str]], List[List[float]]]) -> Callable[[List[str]], List[List[float]]]:
+        """Returns an embed_batch function that only sends cache misses to embed_batch."""
+        def cached_embed_batch(texts: List[str]) -> List[List[float]]:
+            cached = self.get_many(texts)
+            missing = list(dict.fromkeys(text for text in texts if text not in cached))
+            if missing:
+                vectors = embed_batch(missing)
+                if len(vectors) != len(missing):
+                    raise ValueError(f"Expected {len(missing)} embeddings, got {len(vectors)}")
+                self.set_many(missing, vectors)
+                cached.update(zip(missing, vectors))
+            return [cached[text] for text in texts]
+        return cached_embed_batch
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model,)).fetchone()[0]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "model": self.model,
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_embedding_cache(model: str, path: Optional[str] = None) -> EmbeddingCache:
+    """The cache at EMBEDDING_CACHE_PATH (default .cache/embeddings.sqlite3 under the backend)."""
+    path = path or os.environ.get(
+        "EMBEDDING_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "embeddings.sqlite3"),
+    )
+    return EmbeddingCache(path, model)
@@ -1,37 +1,48 @@
 import os
 import requests
 import json
-from uuid import uuid4
 import sys
 from dotenv import load_dotenv
 from pathlib import Path
 
 # Add the parent directory to the path to import from core
 sys.path.append(str(Path(__file__).parent.parent))
-from core.pinecone_data import get_gemini_embedding
+from core.pinecone_data import get_gemini_embeddings
+from api.ingest import IngestionEngine, job_fingerprint, content_hash
+from api.embedding_cache import default_embedding_cache
+from core.retrieval import job_filter_fields
+from models.data_model import MongoDB
 
 # Load environment variables
 load_dotenv()
 
-from pinecone import Pinecone, ServerlessSpec
-
-PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 RAPIDAPI_KEY = os.environ.get("RAPIDAPI_KEY") 
 
-PINECONE_ENV = "us-east-1"
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index_name = "jobs-index"
+# "pinecone" writes to jobs-index; "faiss" builds the local index served by Rag with VECTOR_BACKEND=faiss
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "pinecone").lower()
+
+if VECTOR_BACKEND == "faiss":
+    from core.faiss_store import LocalFaissIndex
+
+    index = LocalFaissIndex.open()
+else:
+    from pinecone import Pinecone, ServerlessSpec
+
+    PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
+    PINECONE_ENV = "us-east-1"
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    index_name = "jobs-index"
 
-if index_name not in pc.list_indexes().names():
-    print(f"Creating new index: {index_name}")
-    pc.create_index(
-        name=index_name,
-        dimension=768,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region=PINECONE_ENV),
-    )
+    if index_name not in pc.list_indexes().names():
+        print(f"Creating new index: {index_name}")
+        pc.create_index(
+            name=index_name,
+            dimension=768,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region=PINECONE_ENV),
+        )
 
-index = pc.Index(index_name)
+    index = pc.Index(index_name)
 
 # API Details (example: JSSearch API on RapidAPI)
 JSEARCH_URL = "https://jsearch.p.rapidapi.com/search"
@@ -85,31 +96,135 @@ def process_api_response(data):
     return jobs
 
 
-def store_jobs_in_pinecone(jobs):
-    """Store job data into Pinecone."""
-    print(f"Storing {len(jobs)} jobs in Pinecone...")
+def job_text(job):
+    """Text that is embedded for a job; optional fields (sample and scraped jobs lack some) are left out."""
+    text = f"{job['title']} at {job['company']}, {job['location']}"
+    if job.get("work_mode"):
+        text += f", Mode: {job['work_mode']}"
+    if job.get("experience"):
+        text += f", Experience: {job['experience']}"
+    if job.get("skills"):
+        text += f", Skills: {job['skills']}"
+    if job.get("description"):
+        desc_summary = job["description"][:500].replace("\n", " ")
+        text += f". {desc_summary}..."
+    return text
+
+
+def job_records(jobs):
     for job in jobs:
-        text = f"{job['title']} at {job['company']}, {job['location']}"
-        if job["work_mode"]:
-            text += f", Mode: {job['work_mode']}"
-        if job["experience"]:
-            text += f", Experience: {job['experience']}"
-        if job["skills"]:
-            text += f", Skills: {job['skills']}"
-        if job["description"]:
-            desc_summary = job["description"][:500].replace("\n", " ")
-            text += f". {desc_summary}..."
-
-        try:
-            embedding = get_gemini_embedding(text)
-            vector_id = str(uuid4())
-            metadata = job.copy()
-            metadata["text"] = text
-
-            index.upsert(vectors=[{"id": vector_id, "values": embedding, "metadata": metadata}])
-            print(f"  Stored job: {job['title']} at {job['company']}")
-        except Exception as e:
-            print(f"  Error storing job {job['title']}: {str(e)}")
+        text = job_text(job)
+        metadata = job.copy()
+        metadata.update(job_filter_fields(job))
+        metadata["text"] = text
+        # Covers the derived filter fields too, so a change in how they are computed re-ingests the job
+        metadata["content_hash"] = content_hash(text + json.dumps(job_filter_fields(job), sort_keys=True))
+        # Indexes written before these IDs hold the same jobs under uuid4 IDs; `--migrate` removes them
+        yield {"id": job_fingerprint(job), "text": text, "metadata": metadata}
+
+
+def stored_content_hashes(ids):
+    """Content hashes of the given vector IDs that are already in the index."""
+    if VECTOR_BACKEND == "faiss":
+        return index.content_hashes(ids)
+    response = index.fetch(ids=ids)
+    return {
+        vector_id: (vector.metadata or {}).get("content_hash")
+        for vector_id, vector in response.vectors.items()
+    }
+
+
+embedding_cache = default_embedding_cache("models/embedding-001")
+
+ingestion_engine = IngestionEngine(
+    embed_batch=embedding_cache.wrap(get_gemini_embeddings),
+    upsert=lambda vectors: index.upsert(vectors=vectors),
+    embed_batch_size=int(os.environ.get("INGEST_EMBED_BATCH_SIZE", "50")),
+    upsert_batch_size=int(os.environ.get("INGEST_UPSERT_BATCH_SIZE", "100")),
+    embed_concurrency=int(os.environ.get("INGEST_EMBED_CONCURRENCY", "4")),
+    upsert_concurrency=int(os.environ.get("INGEST_UPSERT_CONCURRENCY", "2")),
+    existing=stored_content_hashes,
+)
+
+
+def store_jobs_in_pinecone(jobs):
+    """Store job data into the vector index, embedding and upserting in concurrent batches, and into the job corpus."""
+    print(f"Storing {len(jobs)} jobs in {VECTOR_BACKEND}...")
+    records = list(job_records(jobs))
+    report = ingestion_engine.run(records)
+    print(f"  {report}")
+    print(f"  Embedding cache: {embedding_cache.stats()}")
+    if VECTOR_BACKEND == "faiss" and report.upserted:
+        index.save()
+    # The chat server builds its BM25 index from this corpus and picks up the changes on its next poll
+    failed = set(report.failed_ids)
+    changed = MongoDB().upsert_job_corpus([record for record in records if record["id"] not in failed])
+    print(f"  Job corpus: {changed} jobs added or changed")
+    return report
+
+
+# Metadata keys job_records adds on top of the job dict
+DERIVED_METADATA = {"text", "content_hash", "work_mode_norm", "location_terms", "skills_list", "experience_min", "experience_max"}
+MIGRATE_BATCH_SIZE = 100
+
+
+def stored_ids():
+    if VECTOR_BACKEND == "faiss":
+        return index.ids()
+    return [vector_id for page in index.list() for vector_id in page]
+
+
+def stored_metadata(ids):
+    """Metadata of the given vector IDs that are in the index."""
+    if VECTOR_BACKEND == "faiss":
+        return index.metadata(ids)
+    response = index.fetch(ids=ids)
+    return {vector_id: vector.metadata or {} for vector_id, vector in response.vectors.items()}
+
+
+def stored_job(metadata):
+    """The job dict a vector was built from, rebuilt from its metadata."""
+    return {key: value for key, value in metadata.items() if key not in DERIVED_METADATA}
+
+
+def needs_migration(vector_id, metadata):
+    # uuid4 IDs predate fingerprint IDs; vectors without work_mode_norm predate the filter fields
+    # and would never match a filtered query
+    return not vector_id.startswith("job-") or "work_mode_norm" not in metadata
+
+
+def migrate_index():
+    """
+    One-time migration of a vector index written before fingerprint IDs and filter fields.
+
+    Vectors with uuid4 IDs are duplicated by every re-ingestion of the same job, and vectors
+    without the job_filter_fields metadata are silently dropped by filtered searches. Each
+    such vector's job is rebuilt from its metadata and ingested again, under its fingerprint
+    ID and with the filter fields; legacy-ID vectors are then deleted (the FAISS index only
+    ever had fingerprint IDs). Safe to re-run; returns the number of vectors migrated.
+    """
+    # Listed up front, so the vectors upserted below do not shift the pages being read
+    ids = stored_ids()
+    print(f"Checking {len(ids)} vectors...")
+    migrated = removed = 0
+    for start in range(0, len(ids), MIGRATE_BATCH_SIZE):
+        outdated = {
+            vector_id: stored_job(metadata)
+            for vector_id, metadata in stored_metadata(ids[start:start + MIGRATE_BATCH_SIZE]).items()
+            if needs_migration(vector_id, metadata)
+        }
+        if not outdated:
+            continue
+        failed = set(store_jobs_in_pinecone(list(outdated.values())).failed_ids)
+        done = [vector_id for vector_id, job in outdated.items() if job_fingerprint(job) not in failed]
+        migrated += len(done)
+        # A legacy vector is only dropped once its job is stored under the new ID
+        legacy = [vector_id for vector_id in done if not vector_id.startswith("job-")]
+        if legacy:
+            index.delete(ids=legacy)
+            removed += len(legacy)
+    print(f"Migrated {migrated} vectors, removed {removed} with legacy IDs")
+    return migrated
 
 
 def main():
@@ -121,4 +236,11 @@ def main():
 
     if jobs:
         store_jobs_in_pinecone(jobs)
-        print("Jobs stored in Pinecone successfully")
+        print(f"Jobs stored in {VECTOR_BACKEND} successfully")
+
+
+if __name__ == "__main__":
+    if "--migrate" in sys.argv[1:]:
+        migrate_index()
+    else:
+        main()
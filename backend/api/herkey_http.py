@@ -0,0 +1,101 @@
+import json
+import os
+from urllib.parse import urlparse, parse_qsl
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+from api.herkey_parser import parse_job_cards, parse_event_cards, job_from_record, find_job_records
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+STATE_SCRIPT_IDS = ("__NEXT_DATA__", "__NUXT_DATA__", "__APOLLO_STATE__")
+STATE_GLOBALS = ("window.__INITIAL_STATE__", "window.__PRELOADED_STATE__", "window.__NEXT_DATA__")
+
+
+class HerKeyHTTPClient:
+    """
+    Fetches HerKey listings over a pooled requests.Session, without a browser.
+
+    Jobs are read, in order, from the page's embedded JSON state, from server-rendered job
+    cards, or from the XHR endpoint the listing page calls (HERKEY_JOBS_API_URL, which gets
+    the search URL's query parameters). Events come from the server-rendered events page.
+    Every method returns None when it could not find listings, so callers can fall back to
+    the Selenium scraper.
+    """
+    def __init__(self, timeout=10, pool_size=8, jobs_api_url=None):
+        self.timeout = timeout
+        self.jobs_api_url = jobs_api_url
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _get(self, url, **kwargs):
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _embedded_state(soup):
+        for script_id in STATE_SCRIPT_IDS:
+            tag = soup.find("script", id=script_id)
+            if tag and tag.string:
+                try:
+                    return json.loads(tag.string)
+                except json.JSONDecodeError:
+                    continue
+        for tag in soup.find_all("script"):
+            text = tag.string or ""
+            for name in STATE_GLOBALS:
+                if name in text:
+                    payload = text.split(name, 1)[1].lstrip(" =")
+                    try:
+                        return json.JSONDecoder().raw_decode(payload)[0]
+                    except json.JSONDecodeError:
+                        continue
+        return None
+
+    def _jobs_from_api(self, url):
+        params = dict(parse_qsl(urlparse(url).query))
+        data = self._get(self.jobs_api_url, params=params, headers={"Accept": "application/json"}).json()
+        return [job for job in map(job_from_record, find_job_records(data)) if job]
+
+    def fetch_jobs(self, url):
+        try:
+            soup = BeautifulSoup(self._get(url).text, "lxml")
+            state = self._embedded_state(soup)
+            jobs = [job for job in map(job_from_record, find_job_records(state)) if job] if state else []
+            jobs = jobs or parse_job_cards(soup)
+            if not jobs and self.jobs_api_url:
+                jobs = self._jobs_from_api(url)
+        except Exception as e:
+            print(f"HTTP job fetch failed for {url}: {e}")
+            return None
+        if not jobs:
+            print(f"No jobs found over HTTP for {url}")
+            return None
+        print(f"Fetched {len(jobs)} jobs over HTTP from {url}")
+        return jobs
+
+    def fetch_events(self, url):
+        try:
+            events = parse_event_cards(BeautifulSoup(self._get(url).text, "lxml"))
+        except Exception as e:
+            print(f"HTTP event fetch failed for {url}: {e}")
+            return None
+        if not events:
+            print(f"No events found over HTTP for {url}")
+            return None
+        print(f"Fetched {len(events)} events over HTTP from {url}")
+        return events
+
+
+herkey_http = HerKeyHTTPClient(
+    timeout=float(os.getenv("HERKEY_HTTP_TIMEOUT", "10")),
+    jobs_api_url=os.getenv("HERKEY_JOBS_API_URL"),
+)
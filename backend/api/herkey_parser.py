@@ -0,0 +1,319 @@
+import re
+from datetime import datetime
+
+
+def parse_job_card(card):
+    """Extracts one job dict from a rendered `[data-test-id="job-details"]` card, or None if it has no title/company."""
+    job_data = {}
+    job_data['source'] = "HerKey"
+
+    # Extract Title
+    title_tag = card.find('p', attrs={'data-test-id': 'job-title'})
+    job_data['title'] = title_tag.text.strip() if title_tag else 'N/A'
+
+    # Extract Company
+    company_tag = card.find('p', attrs={'data-test-id': 'company-name'})
+    company_name_raw = company_tag.text.strip() if company_tag else 'N/A'
+    job_data['company'] = re.sub(r'^Client of\s*', '', company_name_raw).strip()
+
+    # --- Extract Details (Location, Mode, Experience) ---
+    # Re-evaluating selectors based on potential variations
+    location, work_mode, experience = 'N/A', 'N/A', 'N/A'
+    details_p = card.select_one('div > div > p:-soup-contains("|")') # Heuristic: look for p tag with pipe separators
+    if not details_p: # Fallback to class-based - CAREFUL, classes might change
+        details_div = card.find('div', class_=lambda x: x and 'css-14ldegz' in x) # Example class, might need adjustment
+        if details_div:
+            company_div = details_div.find('div', class_=lambda x: x and 'css-70qvj9' in x)
+            if company_div:
+                 next_div = company_div.find_next_sibling('div')
+                 if next_div:
+                     details_p = next_div.find('p')
+
+    if details_p:
+        details_text = details_p.text.strip()
+        parts = [p.strip() for p in details_text.split('|')]
+        if len(parts) >= 1: location = parts[0]
+        if len(parts) >= 2:
+            # Try to determine if part 2 is mode or experience
+            if re.search(r'Yr|Year|Exp', parts[1], re.IGNORECASE):
+                experience = parts[1]
+            else:
+                work_mode = parts[1]
+        if len(parts) >= 3:
+             # If part 2 wasn't experience, assume part 3 is
+             if experience == 'N/A':
+                 experience = parts[2]
+             # If part 2 wasn't work mode, assume part 3 is (less likely)
+             elif work_mode == 'N/A':
+                 work_mode = parts[2]
+
+
+    job_data['location'] = location
+    job_data['work_mode'] = work_mode
+    job_data['experience'] = experience
+
+    # Extract Skills
+    skills_tag = card.select_one('span:-soup-contains("•")') # Heuristic: Look for span with bullet separators
+    job_data['skills'] = []
+    if skills_tag:
+        skills_raw = skills_tag.text.strip()
+        skills_list = [re.sub(r'\s*\+\d+$', '', s).strip() for s in skills_raw.split('•') if s.strip()]
+        job_data['skills'] = skills_list
+
+    # Extract Company Logo
+    logo_img = card.find('img', class_=lambda x: x and 'css-mtfjwr' in x)
+    if not logo_img:
+        logo_container = card.find('div', attrs={'data-test-id': 'company-logo'})
+        if logo_container:
+            logo_img = logo_container.find('img')
+    job_data['company_logo_url'] = logo_img.get('src', 'N/A') if logo_img else 'N/A'
+
+
+    # Extract Apply Button Text
+    apply_button = card.find('button', attrs={'data-test-id': 'apply-job'})
+    job_data['apply_button_text'] = apply_button.text.strip() if apply_button else 'N/A'
+
+    # Extract Tags (Chips)
+    tags = []
+    chip_tags = card.find_all('div', class_=lambda x: x and 'MuiChip-root' in x)
+    for chip in chip_tags:
+        label = chip.find('span', class_=lambda x: x and 'MuiChip-label' in x)
+        if label:
+            tags.append(label.text.strip())
+    job_data['tags'] = tags
+
+    if job_data['title'] != 'N/A' and job_data['company'] != 'N/A':
+        return job_data
+    return None
+
+
+def parse_job_cards(soup):
+    """Parses every job card in a BeautifulSoup document."""
+    job_cards = soup.find_all('div', attrs={'data-test-id': 'job-details'})
+    return [job for job in map(parse_job_card, job_cards) if job]
+
+
+def parse_event_card(card):
+    """Extracts one event dict from a `div.event-details-card`, or None if it has neither title nor id."""
+    event_data = {}
+
+    # Extract Event ID (from the span id inside the card)
+    id_span = card.find('span', id=True)
+    event_data['id'] = id_span.get('id', 'N/A') if id_span else 'N/A'
+
+    # Extract Event Image/Logo
+    logo_img = card.find('img', class_='card-logo-img')
+    event_data['image_url'] = logo_img.get('src', 'N/A') if logo_img else 'N/A'
+
+    # Extract Event Title and URL
+    title_link = card.find('a', class_='card-heading')
+    if title_link:
+        # Clean title text (remove potential featured icon text if needed, although .text usually handles it)
+        title_text = title_link.text.strip()
+        # Remove trailing whitespace potentially left by removed elements
+        event_data['title'] = re.sub(r'\s+', ' ', title_text).strip()
+        event_data['event_url'] = title_link.get('href', 'N/A')
+    else:
+        event_data['title'] = 'N/A'
+        event_data['event_url'] = 'N/A'
+
+    # Extract Categories
+    categories = []
+    category_div = card.find('div', class_='card-body-data', style=lambda s: s and 'padding-left: 15px' in s)
+    if category_div:
+         # Find the image with tag.png to be more specific
+         tag_img = category_div.find('img', src=lambda s: s and 'tag.png' in s)
+         if tag_img and tag_img.parent:
+             category_links = tag_img.parent.find_all('a')
+             categories = [a.text.strip() for a in category_links if a.text]
+    event_data['categories'] = categories
+
+    # --- Extract Details from the left column (col-8) ---
+    details_col = card.find('div', class_='col-8')
+    event_data['mode'] = 'N/A'
+    event_data['date'] = 'N/A'
+    event_data['time'] = 'N/A'
+    event_data['venue'] = 'N/A'
+
+    if details_col:
+        # Mode (Online/Offline) - Look for the bullseye icon
+        mode_span = details_col.find('span', class_='mr-1')
+        if mode_span and mode_span.find('i', class_='fa-bullseye'):
+            event_data['mode'] = mode_span.text.strip()
+
+        # Date - Look for calendar icon
+        date_img = details_col.find('img', src=lambda s: s and 'calendar' in s)
+        if date_img and date_img.parent:
+             # Get text from the parent div, strip whitespace and the implicit image alt text/nbsp
+             date_text = date_img.parent.text.strip()
+             event_data['date'] = re.sub(r'\s+', ' ', date_text).strip()
+
+
+        # Time - Look for clock icon
+        time_img = details_col.find('img', src=lambda s: s and 'clock.png' in s)
+        if time_img and time_img.parent:
+             time_text = time_img.parent.text.strip()
+             event_data['time'] = re.sub(r'\s+', ' ', time_text).strip()
+
+        # Venue/Location - Look for placeholder icon
+        venue_img = details_col.find('img', src=lambda s: s and 'placeholder.svg' in s)
+        if venue_img and venue_img.parent:
+             venue_text = venue_img.parent.text.strip()
+             event_data['venue'] = re.sub(r'\s+', ' ', venue_text).strip()
+
+
+    # --- Extract Details from the right column (col-4) ---
+    action_col = card.find('div', class_='col-4')
+    event_data['price'] = 'N/A'
+    event_data['original_price'] = 'N/A'
+    event_data['register_url'] = 'N/A'
+    event_data['interested_url'] = 'N/A' # Optional
+
+    if action_col:
+        # Price
+        price_tag = action_col.find('p', class_='free-btn semibold')
+        if price_tag and '₹' in price_tag.text: # Check for currency symbol
+            event_data['price'] = price_tag.text.strip()
+
+        # Original Price (Strikethrough)
+        original_price_tag = action_col.find('p', class_='free-btn', style=lambda s: s and 'line-through' in s)
+        if original_price_tag and '₹' in original_price_tag.text:
+            event_data['original_price'] = original_price_tag.text.strip()
+
+        # If no price found, check if it might be implicitly free (e.g., only Register button)
+        if event_data['price'] == 'N/A' and action_col.find('button', class_='register'):
+             # Check if any text like "Free" exists explicitly
+             free_text_tag = action_col.find(lambda tag: tag.name == 'p' and 'free' in tag.text.lower())
+             if free_text_tag:
+                 event_data['price'] = 'Free'
+             # else: remain N/A or assume Free? Let's keep N/A for now unless specified.
+
+        # Register Button URL
+        register_button = action_col.find('button', class_='register')
+        if register_button:
+            register_link_tag = register_button.find_parent('a')
+            if register_link_tag:
+                event_data['register_url'] = register_link_tag.get('href', 'N/A')
+
+        # Interested Button URL (Optional)
+        interested_button = action_col.find('button', class_='interested-btn')
+        if interested_button:
+            interested_link_tag = interested_button.find_parent('a')
+            if interested_link_tag:
+                event_data['interested_url'] = interested_link_tag.get('href', 'N/A')
+
+
+    # Basic validation: Ensure at least a title or ID was found
+    if event_data['title'] != 'N/A' or event_data['id'] != 'N/A':
+        return event_data
+    return None
+
+
+def parse_event_cards(soup):
+    """Parses every event card in a BeautifulSoup document."""
+    event_cards = soup.find_all('div', class_='event-details-card')
+    return [event for event in map(parse_event_card, event_cards) if event]
+
+
+# --- Structured (JSON / embedded page state) records ---
+
+def _first(record, keys, default='N/A'):
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, dict):
+            value = value.get('name') or value.get('title') or value.get('label')
+        if isinstance(value, list):
+            value = ', '.join(str(v.get('name', v) if isinstance(v, dict) else v) for v in value if v)
+        if value not in (None, ''):
+            return str(value).strip()
+    return default
+
+
+def _names(value):
+    if isinstance(value, str):
+        return [v.strip() for v in re.split(r'[,•]', value) if v.strip()]
+    if isinstance(value, list):
+        return [str((v.get('name') or v.get('label') or '') if isinstance(v, dict) else v).strip() for v in value if v]
+    return []
+
+
+def job_from_record(record):
+    """Maps a job object from HerKey's JSON/page state onto the dict shape parse_job_card produces."""
+    experience = _first(record, ['experience', 'experience_range', 'experienceRange'])
+    if experience == 'N/A':
+        low = record.get('min_experience', record.get('minExperience'))
+        high = record.get('max_experience', record.get('maxExperience'))
+        if low is not None and high is not None:
+            experience = f"{low} - {high} Yrs"
+        elif low is not None:
+            experience = f"{low}+ Yrs"
+    job_data = {
+        'source': "HerKey",
+        'title': _first(record, ['title', 'job_title', 'jobTitle', 'designation']),
+        'company': re.sub(r'^Client of\s*', '', _first(record, ['company_name', 'companyName', 'company', 'organisation', 'organization'])).strip(),
+        'location': _first(record, ['location', 'locations', 'location_name', 'city', 'cities']),
+        'work_mode': _first(record, ['work_mode', 'workMode', 'work_mode_name', 'work_type', 'workType']),
+        'experience': experience,
+        'skills': _names(record.get('skills') or record.get('skill_names') or record.get('keySkills') or []),
+        'company_logo_url': _first(record, ['company_logo', 'companyLogo', 'company_logo_url', 'logo']),
+        'apply_button_text': 'Apply',
+        'tags': _names(record.get('tags') or record.get('job_types') or record.get('jobTypes') or []),
+    }
+    if job_data['title'] != 'N/A' and job_data['company'] != 'N/A':
+        return job_data
+    return None
+
+
+def find_job_records(data):
+    """
+    Walks a decoded JSON document and returns the first list of objects that look like jobs
+    (every item has a title-like and a company-like key), wherever the page nests it.
+    """
+    title_keys = {'title', 'job_title', 'jobTitle', 'designation'}
+    company_keys = {'company_name', 'companyName', 'company', 'organisation', 'organization'}
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            if node and all(isinstance(i, dict) and title_keys & i.keys() and company_keys & i.keys() for i in node):
+                return node
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+    return []
+
+
+_DATE_RE = re.compile(
+    r'(?:(\d{1,2})(?:st|nd|rd|th)?\s+)?([A-Za-z]{3,9})\.?\s+(?:(\d{1,2})(?!\d)(?:st|nd|rd|th)?,?\s*)?(\d{4})?')
+_MONTHS = {m: i for i, m in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+
+def parse_event_dates(text):
+    """
+    Parses an event card's date text ("Apr 25, 2025", "25 April 2025",
+    "May 03, 2025 - May 04, 2025") into (start, end) datetimes, or (None, None).
+    A missing year on the first date is taken from the second.
+    """
+
+    dates = []
+    for day_before, month, day_after, year in _DATE_RE.findall(text or ''):
+        month_number = _MONTHS.get(month[:3].lower())
+        day = day_before or day_after
+        if month_number and day:
+            dates.append([int(year) if year else None, month_number, int(day)])
+    if not dates:
+        return None, None
+    known_year = next((d[0] for d in reversed(dates) if d[0]), None)
+    if known_year is None:
+        return None, None
+    parsed = []
+    for year, month, day in dates[:2]:
+        try:
+            parsed.append(datetime(year or known_year, month, day))
+        except ValueError:
+            return None, None
+    start, end = parsed[0], parsed[-1]
+    if start > end and not dates[0][0]:  # "Dec 30 - Jan 02, 2026" spans the new year
+        start = start.replace(year=start.year - 1)
+    return start, end
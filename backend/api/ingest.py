@@ -0,0 +1,217 @@
+import hashlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+def _normalize(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def job_fingerprint(job: Dict) -> str:
+    """
+    Deterministic vector ID for a job posting: a hash of its normalized title, company,
+    location and apply URL, so the same posting always maps to the same vector.
+    """
+    parts = [_normalize(job.get(field)) for field in ("title", "company", "location", "url")]
+    return "job-" + hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def content_hash(text: str) -> str:
+    """Hash of the embedded text, stored in metadata to detect changed postings."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class IngestReport:
+    """Counters for one ingestion run."""
+    submitted: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    embed_calls: int = 0
+    upsert_calls: int = 0
+    retries: int = 0
+    failed_ids: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Upserted records per second."""
+        return self.upserted / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.upserted}/{self.submitted} upserted, {self.unchanged} unchanged, {self.duplicates} duplicates "
+            f"in {self.elapsed:.2f}s "
+            f"({self.throughput:.1f}/s, {self.embed_calls} embed calls, {self.upsert_calls} upsert calls, "
+            f"{self.retries} retries, {len(self.failed_ids)} failed)"
+        )
+
+
+class IngestionEngine:
+    """
+    Two-stage embed -> upsert pipeline.
+
+    Records are grouped into multi-text embedding requests; the resulting vectors are
+    buffered and written to the vector store in chunks. Both stages run on their own bounded
+    thread pools, so upserts of finished batches overlap with embedding of later ones. A
+    failing batch is retried with exponential backoff; if it still fails, its record IDs are
+    reported in IngestReport.failed_ids and the rest of the run carries on.
+
+    When existing is given, each batch first looks up the content hashes already stored for
+    its IDs, and records whose metadata["content_hash"] matches are skipped before any
+    embedding call. Records repeating an ID already seen in the same run are dropped.
+
+    Args:
+        embed_batch: Callable embedding a list of texts into a list of vectors, in order.
+        upsert: Callable writing a list of {"id", "values", "metadata"} vectors.
+        embed_batch_size: Texts per embedding request.
+        upsert_batch_size: Vectors per upsert request.
+        embed_concurrency: Embedding requests in flight at once.
+        upsert_concurrency: Upsert requests in flight at once.
+        max_retries: Retries per batch after the first attempt.
+        backoff: Seconds before the first retry; doubled on every further attempt.
+        existing: Optional callable mapping a list of IDs to {id: content_hash} for the IDs
+            already in the vector store.
+    """
+    def __init__(
+            self,
+            embed_batch: Callable[[List[str]], List[List[float]]],
+            upsert: Callable[[List[Dict]], object],
+            embed_batch_size: int = 50,
+            upsert_batch_size: int = 100,
+            embed_concurrency: int = 4,
+            upsert_concurrency: int = 2,
+            max_retries: int = 3,
+            backoff: float = 1.0,
+            existing: Optional[Callable[[List[str]], Dict[str, str]]] = None,
+            ):
+        self.embed_batch = embed_batch
+        self.upsert = upsert
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.upsert_concurrency = upsert_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.existing = existing
+        self._lock = threading.Lock()
+
+    def _with_retries(self, report: IngestReport, counter: str, fn, *args):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._lock:
+                    setattr(report, counter, getattr(report, counter) + 1)
+                return fn(*args)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    report.retries += 1
+                delay = self.backoff * 2 ** attempt
+                print(f"  Batch failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _changed(self, batch: List[Dict]) -> List[Dict]:
+        try:
+            stored = self.existing([record["id"] for record in batch])
+        except Exception as e:
+            print(f"  Looking up {len(batch)} existing vectors failed ({e}), re-ingesting them")
+            return batch
+        return [
+            record for record in batch
+            if not stored.get(record["id"]) or stored[record["id"]] != record.get("metadata", {}).get("content_hash")
+        ]
+
+    def _embed(self, batch: List[Dict]) -> List[Dict]:
+        vectors = self.embed_batch([record["text"] for record in batch])
+        if len(vectors) != len(batch):
+            raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+        return [
+            {"id": record["id"], "values": list(values), "metadata": record.get("metadata", {})}
+            for record, values in zip(batch, vectors)
+        ]
+
+    def run(self, records: Iterable[Dict]) -> IngestReport:
+        """
+        Embeds and upserts records of the form {"id": str, "text": str, "metadata": dict}.
+        records may be a generator; at most a few batches are held in memory at a time.
+        """
+        report = IngestReport()
+        slots = threading.BoundedSemaphore(self.embed_concurrency * 2)
+        pending: List[Dict] = []
+        embed_futures, upsert_futures = [], []
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(self.embed_concurrency, thread_name_prefix="ingest-embed") as embedder, \
+                ThreadPoolExecutor(self.upsert_concurrency, thread_name_prefix="ingest-upsert") as upserter:
+
+            def upsert_chunk(chunk):
+                try:
+                    self._with_retries(report, "upsert_calls", self.upsert, chunk)
+                    with self._lock:
+                        report.upserted += len(chunk)
+                except Exception as e:
+                    print(f"  Upserting {len(chunk)} vectors failed: {e}")
+                    with self._lock:
+                        report.failed_ids.extend(vector["id"] for vector in chunk)
+
+            def flush(force=False):
+                # Caller holds self._lock
+                while len(pending) >= self.upsert_batch_size or (force and pending):
+                    chunk = pending[:self.upsert_batch_size]
+                    del pending[:self.upsert_batch_size]
+                    upsert_futures.append(upserter.submit(upsert_chunk, chunk))
+
+            def embed_chunk(batch):
+                try:
+                    if self.existing is not None:
+                        changed = self._changed(batch)
+                        with self._lock:
+                            report.unchanged += len(batch) - len(changed)
+                        batch = changed
+                        if not batch:
+                            return
+                    vectors = self._with_retries(report, "embed_calls", self._embed, batch)
+                except Exception as e:
+                    print(f"  Embedding {len(batch)} records failed: {e}")
+                    with self._lock:
+                        report.failed_ids.extend(record["id"] for record in batch)
+                    return
+                finally:
+                    slots.release()
+                with self._lock:
+                    report.embedded += len(vectors)
+                    pending.extend(vectors)
+                    flush()
+
+            def submit(batch):
+                slots.acquire()
+                embed_futures.append(embedder.submit(embed_chunk, batch))
+
+            batch, seen = [], set()
+            for record in records:
+                report.submitted += 1
+                if record["id"] in seen:
+                    report.duplicates += 1
+                    continue
+                seen.add(record["id"])
+                batch.append(record)
+                if len(batch) >= self.embed_batch_size:
+                    submit(batch)
+                    batch = []
+            if batch:
+                submit(batch)
+
+            wait(embed_futures)
+            with self._lock:
+                flush(force=True)
+            wait(upsert_futures)
+
+        report.elapsed = time.perf_counter() - start
+        return report
@@ -4,13 +4,154 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
-import re
+from api.herkey_parser import parse_job_card, parse_event_card
+from api.herkey_http import herkey_http
+import atexit
+import threading
 import time
 import os
 
+
+FALLBACK_DRIVER_PATH = '/usr/bin/chromedriver' # Common path after apt install
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def _resolve_driver_path():
+    """
+    Resolves the chromedriver binary once per process instead of on every scrape. Only a
+    successful resolution is kept; after a failure the fallback path is used and the next
+    new browser tries again. Browsers are pooled, so that is rare.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            try:
+                _driver_path = ChromeDriverManager().install()
+                print(f"Using chromedriver from ChromeDriverManager: {_driver_path}")
+            except Exception as e:
+                print(f"ChromeDriverManager failed ({e}), falling back to {FALLBACK_DRIVER_PATH}")
+                return FALLBACK_DRIVER_PATH
+        return _driver_path
+
+
+class DriverPool:
+    """
+    Bounded pool of warm headless Chrome instances.
+
+    At most `size` browsers exist at once; further scrapes block in checkout() until one is
+    checked back in. Idle drivers are liveness-checked before reuse, and a driver is quit
+    and replaced after `max_uses` scrapes or when a scrape reports it broken.
+    """
+    def __init__(self, factory, size=2, max_uses=25, checkout_timeout=90):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._uses = {}
+        self.created = 0
+        self.recycled = 0
+
+    @staticmethod
+    def _is_alive(driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _retire(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self.recycled += 1
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting WebDriver: {e}")
+
+    def checkout(self):
+        """Returns a live driver, or None if none could be started within checkout_timeout."""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            print(f"No WebDriver available after {self.checkout_timeout}s")
+            return None
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                break
+            if self._is_alive(driver):
+                return driver
+            print("Discarding dead WebDriver from pool")
+            self._retire(driver)
+        driver = self.factory()
+        if driver is None:
+            self._slots.release()
+            return None
+        with self._lock:
+            self.created += 1
+            self._uses[id(driver)] = 0
+        return driver
+
+    def checkin(self, driver, broken=False):
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        try:
+            if broken or uses >= self.max_uses:
+                self._retire(driver)
+                return
+            try:
+                driver.get("about:blank")  # drop the previous page's DOM and scripts
+                driver.delete_all_cookies()
+            except Exception:
+                self._retire(driver)
+                return
+            with self._lock:
+                self._idle.append(driver)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._retire(driver)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "created": self.created,
+            "recycled": self.recycled,
+            "max_uses": self.max_uses,
+        }
+
+
+FETCH_MODES = ("auto", "http", "selenium")
+
+
 class Scraper:
+    # "auto" tries the HTTP client first and renders with Selenium only if that finds nothing.
+    # Selenium stays the default until the HTTP parser has been checked against live HerKey pages.
+    fetch_mode = os.getenv("HERKEY_FETCH_MODE", "selenium")
+
+    @staticmethod
+    def _fetch(url, wait_time, mode, http_fetch, selenium_fetch):
+        mode = mode or Scraper.fetch_mode
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{mode}', expected one of {FETCH_MODES}")
+        if mode in ("auto", "http"):
+            results = http_fetch(url)
+            if results is not None or mode == "http":
+                return results or []
+            print("Falling back to Selenium...")
+        return selenium_fetch(url, wait_time)
 
     @staticmethod
     def _initialize_driver():
@@ -23,28 +164,62 @@ class Scraper:
         chrome_options.add_argument(
             "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36")
 
-        driver = None
-        print("Initializing WebDriver for Colab...")
+        print("Initializing WebDriver...")
+        driver_path = _resolve_driver_path()
         try:
-            service = Service(ChromeDriverManager().install())
+            service = Service(driver_path)
             driver = webdriver.Chrome(service=service, options=chrome_options)
-            print("WebDriver initialized successfully via ChromeDriverManager.")
+            print("WebDriver initialized successfully.")
             return driver
         except Exception as webdriver_init_error:
-            print(f"Error initializing WebDriver via ChromeDriverManager: {webdriver_init_error}")
-            print("Attempting fallback using default chromedriver path...")
-            try:
-                service = Service('/usr/bin/chromedriver') # Common path after apt install
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                print("WebDriver initialized successfully using fallback path.")
-                return driver
-            except Exception as fallback_error:
-                print(f"Fallback WebDriver initialization failed: {fallback_error}")
+            print(f"WebDriver initialization failed: {webdriver_init_error}")
+            if driver_path == FALLBACK_DRIVER_PATH:
                 print("Cannot start Selenium driver.")
                 return None
+        # The cached ChromeDriverManager driver may not match the installed Chrome; the system driver might
+        print("Attempting fallback using default chromedriver path...")
+        try:
+            service = Service(FALLBACK_DRIVER_PATH)
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            print("WebDriver initialized successfully using fallback path.")
+            return driver
+        except Exception as fallback_error:
+            print(f"Fallback WebDriver initialization failed: {fallback_error}")
+            print("Cannot start Selenium driver.")
+            return None
+
+    @staticmethod
+    def scrape_herkey_jobs(url="https://www.herkey.com/jobs", wait_time=30, mode=None):
+        """
+        Fetches job listings from a HerKey jobs page.
+
+        Args:
+            url (str): The URL of the HerKey jobs page.
+            wait_time (int): Maximum time in seconds to wait for job cards when rendering with Selenium.
+            mode (str): "auto", "http" or "selenium"; defaults to HERKEY_FETCH_MODE.
+
+        Returns:
+            list: A list of job dictionaries, empty if the page cannot be fetched or parsed.
+        """
+        return Scraper._fetch(url, wait_time, mode, herkey_http.fetch_jobs, Scraper._scrape_jobs_selenium)
 
     @staticmethod
-    def scrape_herkey_jobs(url="https://www.herkey.com/jobs", wait_time=30):
+    def scrape_herkey_events(url="https://events.herkey.com/events", wait_time=30, mode=None):
+        """
+        Fetches event listings from the HerKey events page.
+
+        Args:
+            url (str): The URL of the HerKey events page.
+            wait_time (int): Maximum time in seconds to wait for event cards when rendering with Selenium.
+            mode (str): "auto", "http" or "selenium"; defaults to HERKEY_FETCH_MODE.
+
+        Returns:
+            list: A list of event dictionaries, empty if the page cannot be fetched or parsed.
+        """
+        return Scraper._fetch(url, wait_time, mode, herkey_http.fetch_events, Scraper._scrape_events_selenium)
+
+    @staticmethod
+    def _scrape_jobs_selenium(url="https://www.herkey.com/jobs", wait_time=30):
         """
         Scrapes job listings from the HerKey jobs page using Selenium in Colab.
 
@@ -57,9 +232,10 @@ class Scraper:
                 Returns an empty list if the page cannot be fetched or parsed.
         """
         jobs_list = []
-        driver = Scraper._initialize_driver()
+        driver = Scraper.pool.checkout()
         if not driver:
             return []
+        broken = False
 
         try:
             print(f"Navigating to {url}...")
@@ -98,100 +274,19 @@ class Scraper:
 
             print(f"Found {len(job_cards)} job cards in rendered source.")
 
-            for card in job_cards:
-                job_data = {}
-                job_data['source'] = "HerKey"  
-
-                # Extract Title
-                title_tag = card.find('p', attrs={'data-test-id': 'job-title'})
-                job_data['title'] = title_tag.text.strip() if title_tag else 'N/A'
-
-                # Extract Company
-                company_tag = card.find('p', attrs={'data-test-id': 'company-name'})
-                company_name_raw = company_tag.text.strip() if company_tag else 'N/A'
-                job_data['company'] = re.sub(r'^Client of\s*', '', company_name_raw).strip()
-
-                # --- Extract Details (Location, Mode, Experience) ---
-                # Re-evaluating selectors based on potential variations
-                location, work_mode, experience = 'N/A', 'N/A', 'N/A'
-                details_p = card.select_one('div > div > p:-soup-contains("|")') # Heuristic: look for p tag with pipe separators
-                if not details_p: # Fallback to class-based - CAREFUL, classes might change
-                    details_div = card.find('div', class_=lambda x: x and 'css-14ldegz' in x) # Example class, might need adjustment
-                    if details_div:
-                        company_div = details_div.find('div', class_=lambda x: x and 'css-70qvj9' in x)
-                        if company_div:
-                             next_div = company_div.find_next_sibling('div')
-                             if next_div:
-                                 details_p = next_div.find('p')
-
-                if details_p:
-                    details_text = details_p.text.strip()
-                    parts = [p.strip() for p in details_text.split('|')]
-                    if len(parts) >= 1: location = parts[0]
-                    if len(parts) >= 2:
-                        # Try to determine if part 2 is mode or experience
-                        if re.search(r'Yr|Year|Exp', parts[1], re.IGNORECASE):
-                            experience = parts[1]
-                        else:
-                            work_mode = parts[1]
-                    if len(parts) >= 3:
-                         # If part 2 wasn't experience, assume part 3 is
-                         if experience == 'N/A':
-                             experience = parts[2]
-                         # If part 2 wasn't work mode, assume part 3 is (less likely)
-                         elif work_mode == 'N/A':
-                             work_mode = parts[2]
-
-
-                job_data['location'] = location
-                job_data['work_mode'] = work_mode
-                job_data['experience'] = experience
-
-                # Extract Skills
-                skills_tag = card.select_one('span:-soup-contains("•")') # Heuristic: Look for span with bullet separators
-                job_data['skills'] = []
-                if skills_tag:
-                    skills_raw = skills_tag.text.strip()
-                    skills_list = [re.sub(r'\s*\+\d+$', '', s).strip() for s in skills_raw.split('•') if s.strip()]
-                    job_data['skills'] = skills_list
-
-                # Extract Company Logo
-                logo_img = card.find('img', class_=lambda x: x and 'css-mtfjwr' in x)
-                if not logo_img:
-                    logo_container = card.find('div', attrs={'data-test-id': 'company-logo'})
-                    if logo_container:
-                        logo_img = logo_container.find('img')
-                job_data['company_logo_url'] = logo_img.get('src', 'N/A') if logo_img else 'N/A'
-
-
-                # Extract Apply Button Text
-                apply_button = card.find('button', attrs={'data-test-id': 'apply-job'})
-                job_data['apply_button_text'] = apply_button.text.strip() if apply_button else 'N/A'
-
-                # Extract Tags (Chips)
-                tags = []
-                chip_tags = card.find_all('div', class_=lambda x: x and 'MuiChip-root' in x)
-                for chip in chip_tags:
-                    label = chip.find('span', class_=lambda x: x and 'MuiChip-label' in x)
-                    if label:
-                        tags.append(label.text.strip())
-                job_data['tags'] = tags
-
-                if job_data['title'] != 'N/A' and job_data['company'] != 'N/A':
-                    jobs_list.append(job_data)
+            jobs_list = [job for job in map(parse_job_card, job_cards) if job]
 
         except Exception as e:
             print(f"An error occurred during job scraping: {e}")
             import traceback
             traceback.print_exc() # Print full traceback for debugging
+            broken = isinstance(e, WebDriverException)
         finally:
-            if driver:
-                print("Closing WebDriver for jobs...")
-                driver.quit()
+            Scraper.pool.checkin(driver, broken=broken)
         return jobs_list
 
     @staticmethod
-    def scrape_herkey_events(url="https://events.herkey.com/events", wait_time=30):
+    def _scrape_events_selenium(url="https://events.herkey.com/events", wait_time=30):
         """
         Scrapes event listings from the HerKey events page using Selenium in Colab.
 
@@ -204,9 +299,10 @@ class Scraper:
                 Returns an empty list if the page cannot be fetched or parsed.
         """
         events_list = []
-        driver = Scraper._initialize_driver()
+        driver = Scraper.pool.checkout()
         if not driver:
             return []
+        broken = False
 
         try:
             print(f"Navigating to {url}...")
@@ -248,127 +344,22 @@ class Scraper:
 
             print(f"Found {len(event_cards)} event cards in rendered source.")
 
-            for card in event_cards:
-                event_data = {}
-
-                # Extract Event ID (from the span id inside the card)
-                id_span = card.find('span', id=True)
-                event_data['id'] = id_span.get('id', 'N/A') if id_span else 'N/A'
-
-                # Extract Event Image/Logo
-                logo_img = card.find('img', class_='card-logo-img')
-                event_data['image_url'] = logo_img.get('src', 'N/A') if logo_img else 'N/A'
-
-                # Extract Event Title and URL
-                title_link = card.find('a', class_='card-heading')
-                if title_link:
-                    # Clean title text (remove potential featured icon text if needed, although .text usually handles it)
-                    title_text = title_link.text.strip()
-                    # Remove trailing whitespace potentially left by removed elements
-                    event_data['title'] = re.sub(r'\s+', ' ', title_text).strip()
-                    event_data['event_url'] = title_link.get('href', 'N/A')
-                else:
-                    event_data['title'] = 'N/A'
-                    event_data['event_url'] = 'N/A'
-
-                # Extract Categories
-                categories = []
-                category_div = card.find('div', class_='card-body-data', style=lambda s: s and 'padding-left: 15px' in s)
-                if category_div:
-                     # Find the image with tag.png to be more specific
-                     tag_img = category_div.find('img', src=lambda s: s and 'tag.png' in s)
-                     if tag_img and tag_img.parent:
-                         category_links = tag_img.parent.find_all('a')
-                         categories = [a.text.strip() for a in category_links if a.text]
-                event_data['categories'] = categories
-
-                # --- Extract Details from the left column (col-8) ---
-                details_col = card.find('div', class_='col-8')
-                event_data['mode'] = 'N/A'
-                event_data['date'] = 'N/A'
-                event_data['time'] = 'N/A'
-                event_data['venue'] = 'N/A'
-
-                if details_col:
-                    # Mode (Online/Offline) - Look for the bullseye icon
-                    mode_span = details_col.find('span', class_='mr-1')
-                    if mode_span and mode_span.find('i', class_='fa-bullseye'):
-                        event_data['mode'] = mode_span.text.strip()
-
-                    # Date - Look for calendar icon
-                    date_img = details_col.find('img', src=lambda s: s and 'calendar' in s)
-                    if date_img and date_img.parent:
-                         # Get text from the parent div, strip whitespace and the implicit image alt text/nbsp
-                         date_text = date_img.parent.text.strip()
-                         event_data['date'] = re.sub(r'\s+', ' ', date_text).strip()
-
-
-                    # Time - Look for clock icon
-                    time_img = details_col.find('img', src=lambda s: s and 'clock.png' in s)
-                    if time_img and time_img.parent:
-                         time_text = time_img.parent.text.strip()
-                         event_data['time'] = re.sub(r'\s+', ' ', time_text).strip()
-
-                    # Venue/Location - Look for placeholder icon
-                    venue_img = details_col.find('img', src=lambda s: s and 'placeholder.svg' in s)
-                    if venue_img and venue_img.parent:
-                         venue_text = venue_img.parent.text.strip()
-                         event_data['venue'] = re.sub(r'\s+', ' ', venue_text).strip()
-
-
-                # --- Extract Details from the right column (col-4) ---
-                action_col = card.find('div', class_='col-4')
-                event_data['price'] = 'N/A'
-                event_data['original_price'] = 'N/A'
-                event_data['register_url'] = 'N/A'
-                event_data['interested_url'] = 'N/A' # Optional
-
-                if action_col:
-                    # Price
-                    price_tag = action_col.find('p', class_='free-btn semibold')
-                    if price_tag and '₹' in price_tag.text: # Check for currency symbol
-                        event_data['price'] = price_tag.text.strip()
-
-                    # Original Price (Strikethrough)
-                    original_price_tag = action_col.find('p', class_='free-btn', style=lambda s: s and 'line-through' in s)
-                    if original_price_tag and '₹' in original_price_tag.text:
-                        event_data['original_price'] = original_price_tag.text.strip()
-
-                    # If no price found, check if it might be implicitly free (e.g., only Register button)
-                    if event_data['price'] == 'N/A' and action_col.find('button', class_='register'):
-                         # Check if any text like "Free" exists explicitly
-                         free_text_tag = action_col.find(lambda tag: tag.name == 'p' and 'free' in tag.text.lower())
-                         if free_text_tag:
-                             event_data['price'] = 'Free'
-                         # else: remain N/A or assume Free? Let's keep N/A for now unless specified.
-
-                    # Register Button URL
-                    register_button = action_col.find('button', class_='register')
-                    if register_button:
-                        register_link_tag = register_button.find_parent('a')
-                        if register_link_tag:
-                            event_data['register_url'] = register_link_tag.get('href', 'N/A')
-
-                    # Interested Button URL (Optional)
-                    interested_button = action_col.find('button', class_='interested-btn')
-                    if interested_button:
-                        interested_link_tag = interested_button.find_parent('a')
-                        if interested_link_tag:
-                            event_data['interested_url'] = interested_link_tag.get('href', 'N/A')
-
-
-                # Add the extracted data to the list
-                # Basic validation: Ensure at least a title or ID was found
-                if event_data['title'] != 'N/A' or event_data['id'] != 'N/A':
-                    events_list.append(event_data)
+            events_list = [event for event in map(parse_event_card, event_cards) if event]
 
         except Exception as e:
             print(f"An error occurred during event scraping: {e}")
             import traceback
             traceback.print_exc() # Print full traceback for debugging
+            broken = isinstance(e, WebDriverException)
         finally:
-            if driver:
-                print("Closing WebDriver for events...")
-                driver.quit()
+            Scraper.pool.checkin(driver, broken=broken)
         print(events_list)        
         return events_list
+
+
+Scraper.pool = DriverPool(
+    Scraper._initialize_driver,
+    size=int(os.getenv("SCRAPER_POOL_SIZE", "2")),
+    max_uses=int(os.getenv("SCRAPER_DRIVER_MAX_USES", "25")),
+)
+atexit.register(Scraper.pool.shutdown)
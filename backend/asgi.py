@@ -0,0 +1,4 @@
+from server.asgi import create_asgi_app
+app = create_asgi_app()
+
+# Run with: hypercorn asgi:app --bind 0.0.0.0:5000
@@ -0,0 +1,122 @@
+"""
+Ingestion throughput: the old one-job-at-a-time loop against the batched IngestionEngine.
+
+Both run against local stand-ins that sleep like the Gemini embedding API and a Pinecone
+index would (a fixed round-trip cost plus a small per-item cost), so no keys or network are
+needed. Run from the backend directory:
+    python -m benchmarks.ingest_benchmark
+    python -m benchmarks.ingest_benchmark --jobs 2000 --failure-rate 0.05
+"""
+import argparse
+import random
+import threading
+import time
+
+from api.ingest import IngestionEngine
+
+DIMENSION = 768
+
+
+class FakeEmbedder:
+    def __init__(self, round_trip, per_item, failure_rate):
+        self.round_trip = round_trip
+        self.per_item = per_item
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.round_trip + self.per_item * len(texts))
+        if random.random() < self.failure_rate:
+            raise ConnectionError("simulated 503 from the embedding API")
+        return [[(hash(text) % 1000) / 1000.0] * DIMENSION for text in texts]
+
+    def embed_one(self, text):
+        return self([text])[0]
+
+
+class FakeIndex:
+    def __init__(self, round_trip, per_item, failure_rate):
+        self.round_trip = round_trip
+        self.per_item = per_item
+        self.failure_rate = failure_rate
+        self.vectors = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.round_trip + self.per_item * len(vectors))
+        if random.random() < self.failure_rate:
+            raise ConnectionError("simulated timeout from the vector store")
+        with self._lock:
+            self.vectors.update((vector["id"], vector) for vector in vectors)
+
+
+def make_records(n):
+    return [
+        {"id": f"job-{i}", "text": f"Job {i} at Company {i % 37}, Bengaluru", "metadata": {"title": f"Job {i}"}}
+        for i in range(n)
+    ]
+
+
+def run_sequential(records, embedder, index):
+    start = time.perf_counter()
+    failed = 0
+    for record in records:
+        try:
+            values = embedder.embed_one(record["text"])
+            index.upsert(vectors=[{"id": record["id"], "values": values, "metadata": record["metadata"]}])
+        except Exception:
+            failed += 1
+    return time.perf_counter() - start, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--embed-latency", type=float, default=0.08, help="seconds per embedding request")
+    parser.add_argument("--upsert-latency", type=float, default=0.05, help="seconds per upsert request")
+    parser.add_argument("--per-item", type=float, default=0.0005, help="extra seconds per item in a request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="chance that any request fails")
+    parser.add_argument("--embed-batch-size", type=int, default=50)
+    parser.add_argument("--upsert-batch-size", type=int, default=100)
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--upsert-concurrency", type=int, default=2)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(0)
+    records = make_records(args.jobs)
+
+    if not args.skip_sequential:
+        embedder = FakeEmbedder(args.embed_latency, args.per_item, args.failure_rate)
+        index = FakeIndex(args.upsert_latency, args.per_item, args.failure_rate)
+        elapsed, failed = run_sequential(records, embedder, index)
+        print(
+            f"sequential  {len(index.vectors)}/{len(records)} upserted in {elapsed:.2f}s "
+            f"({len(index.vectors) / elapsed:.1f}/s, {embedder.calls} embed calls, {index.calls} upsert calls, "
+            f"{failed} failed)"
+        )
+
+    embedder = FakeEmbedder(args.embed_latency, args.per_item, args.failure_rate)
+    index = FakeIndex(args.upsert_latency, args.per_item, args.failure_rate)
+    engine = IngestionEngine(
+        embed_batch=embedder,
+        upsert=lambda vectors: index.upsert(vectors=vectors),
+        embed_batch_size=args.embed_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        embed_concurrency=args.embed_concurrency,
+        upsert_concurrency=args.upsert_concurrency,
+        backoff=0.05,
+    )
+    report = engine.run(iter(records))
+    print(f"batched     {report}")
+    assert len(index.vectors) == report.upserted
+
+
+if __name__ == "__main__":
+    main()
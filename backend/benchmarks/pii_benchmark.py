@@ -0,0 +1,97 @@
+"""
+Compares the tiered PII path against the all-transformer path on a fixture corpus.
+
+Run from the backend directory:
+    python -m benchmarks.pii_benchmark               # both paths, needs the presidio/transformer models
+    python -m benchmarks.pii_benchmark --screen-only # pattern tier only, no models required
+
+Recall is measured per query: a query labelled with any PII entity counts as recalled when
+the validator flags it (or, with --screen-only, when tier one escalates or catches it).
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from core.pii import TieredPIIDetector
+
+CORPUS = Path(__file__).parent / "fixtures" / "pii_corpus.jsonl"
+ENTITIES = ["PHONE_NUMBER", "EMAIL_ADDRESS", "PERSON", "CRYPTO", "ID", "IP_ADDRESS"]
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(name, latencies, flagged, corpus):
+    positives = [i for i, item in enumerate(corpus) if item["entities"]]
+    negatives = [i for i, item in enumerate(corpus) if not item["entities"]]
+    recall = sum(flagged[i] for i in positives) / len(positives) if positives else 1.0
+    false_positive_rate = sum(flagged[i] for i in negatives) / len(negatives) if negatives else 0.0
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    print(
+        f"{name:<14} mean={statistics.mean(latencies) * 1000:8.2f}ms "
+        f"p50={statistics.median(latencies) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms "
+        f"recall={recall:.2%} flagged_clean={false_positive_rate:.2%}"
+    )
+    missed = [corpus[i]["text"] for i in positives if not flagged[i]]
+    for text in missed:
+        print(f"    missed: {text}")
+
+
+def run_screen_only(corpus, repeat):
+    detector = TieredPIIDetector(ENTITIES, analyzer_provider=lambda: None)
+    latencies, flagged = [], []
+    for item in corpus:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            candidates = detector.screen(item["text"])
+            escalate = detector.transformer_entities(candidates)
+        latencies.append((time.perf_counter() - start) / repeat)
+        flagged.append(bool(candidates or escalate))
+    summarize("pattern-tier", latencies, flagged, corpus)
+    escalated = sum(flagged)
+    print(f"transformer would run on {escalated}/{len(corpus)} queries ({escalated / len(corpus):.0%})")
+
+
+def run_validators(corpus, repeat):
+    from guardrails.validators import FailResult
+    from core.guardrails import CustomDetectPII
+    from core.registry import AnalyzerRegistry
+
+    AnalyzerRegistry.warmup()
+    for detection in ("transformer", "tiered"):
+        validator = CustomDetectPII(detection=detection)
+        latencies, flagged = [], []
+        for item in corpus:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = validator.validate(item["text"], {})
+            latencies.append((time.perf_counter() - start) / repeat)
+            flagged.append(isinstance(result, FailResult))
+        summarize(detection, latencies, flagged, corpus)
+        if detection == "tiered":
+            stats = validator.detector.stats
+            print(f"transformer ran on {stats['escalated']}/{stats['screened']} screened queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--screen-only", action="store_true", help="benchmark the pattern tier without loading models")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query, latencies are averaged")
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} queries, {sum(bool(item['entities']) for item in corpus)} containing PII")
+    if args.screen_only:
+        run_screen_only(corpus, args.repeat)
+    else:
+        run_validators(corpus, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Per-mode latency of the HerKey fetchers on fixture pages.
+
+The fixtures in benchmarks/fixtures are served from a local HTTP server, so the numbers
+compare fetch + parse cost without HerKey's network latency. herkey_jobs_state.html is
+hand-written, not saved from HerKey: its __NEXT_DATA__ shape is a guess, so the embedded
+state numbers say nothing about whether the parser handles the live site. Run from the backend directory:
+    python -m benchmarks.scraper_benchmark              # HTTP mode only
+    python -m benchmarks.scraper_benchmark --selenium   # also render the same pages in headless Chrome
+"""
+import argparse
+import statistics
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from api.herkey_http import HerKeyHTTPClient
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = {
+    "jobs (rendered cards)": ("herkey_jobs.html", "jobs"),
+    "jobs (embedded state)": ("herkey_jobs_state.html", "jobs"),
+    "events": ("herkey_events.html", "events"),
+}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_fixtures():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(FIXTURES)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def measure(fn, repeat):
+    latencies, count = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(fn() or [])
+        latencies.append(time.perf_counter() - start)
+    return latencies, count
+
+
+def report(mode, page, latencies, count):
+    print(
+        f"{mode:<9} {page:<22} items={count:<3} "
+        f"mean={statistics.mean(latencies) * 1000:9.2f}ms p50={statistics.median(latencies) * 1000:9.2f}ms "
+        f"max={max(latencies) * 1000:9.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--selenium", action="store_true", help="also benchmark the Selenium path (needs Chrome)")
+    parser.add_argument("--wait-time", type=int, default=30)
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    client = HerKeyHTTPClient()
+    try:
+        for page, (filename, kind) in PAGES.items():
+            url = f"{base_url}/{filename}"
+            fetch = client.fetch_jobs if kind == "jobs" else client.fetch_events
+            report("http", page, *measure(lambda: fetch(url), args.repeat))
+
+        if args.selenium:
+            from api.scraper import Scraper
+            for page, (filename, kind) in PAGES.items():
+                if filename == "herkey_jobs_state.html":
+                    continue  # no cards in the markup; the page's own JS would render them
+                url = f"{base_url}/{filename}"
+                scrape = Scraper._scrape_jobs_selenium if kind == "jobs" else Scraper._scrape_events_selenium
+                # The first run includes starting Chrome; later runs reuse the pooled driver
+                report("selenium", page, *measure(lambda: scrape(url, args.wait_time), args.repeat))
+            Scraper.pool.shutdown()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
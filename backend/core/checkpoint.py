@@ -0,0 +1,518 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+# Every saver registers here so /admin/checkpoints can report on it
+SAVERS: Dict[str, "RetainingCheckpointSaver"] = {}
+
+
+class RetainingCheckpointSaver(BaseCheckpointSaver, ABC):
+    """
+    Persistent LangGraph checkpointer with bounded retention.
+
+    Each checkpoint is stored whole (channel values included), so a thread can be resumed by
+    any worker after a restart. Retention keeps storage bounded: after every write only the
+    newest max_checkpoints of the thread are kept, and a sweeper deletes threads that have
+    been idle for longer than idle_ttl seconds.
+
+    Subclasses provide the storage primitives (_put_row, _get_row, _list_rows, ...); the
+    async API runs the synchronous one in a worker thread so it never blocks the event loop.
+
+    Args:
+        max_checkpoints: Checkpoints kept per thread and namespace; older ones and their
+            writes are deleted. Keep it above the number of steps one turn takes (about 5
+            here), so a speculative run can still be rolled back to its pre-run checkpoint.
+        idle_ttl: Seconds without a new checkpoint after which a thread is evicted, or None.
+        sweep_interval: Seconds between idle-thread sweeps once start() is called.
+        name: Registers the saver in SAVERS under this name for metrics.
+    """
+    def __init__(
+            self,
+            max_checkpoints: Optional[int] = 20,
+            idle_ttl: Optional[float] = None,
+            sweep_interval: float = 600,
+            name: str = "checkpoints",
+            serde=None,
+            ):
+        super().__init__(serde=serde)
+        self.max_checkpoints = max_checkpoints
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.name = name
+        self.counters = {"puts": 0, "writes": 0, "trimmed_checkpoints": 0, "evicted_threads": 0}
+        self._stop = threading.Event()
+        self._thread = None
+        SAVERS[name] = self
+
+    # --- storage primitives ---
+
+    @abstractmethod
+    def _put_row(self, row: Dict):
+        """Inserts or replaces a checkpoint row."""
+
+    @abstractmethod
+    def _get_row(self, thread_id: str, ns: str, checkpoint_id: Optional[str]) -> Optional[Dict]:
+        """The checkpoint with checkpoint_id, or the thread's newest one when it is None."""
+
+    @abstractmethod
+    def _list_rows(self, thread_id: Optional[str], ns: Optional[str], before: Optional[str], limit: Optional[int]) -> Iterator[Dict]:
+        """Checkpoint rows matching the given (non-None) fields, newest first."""
+
+    @abstractmethod
+    def _put_write_rows(self, rows: List[Dict]):
+        """Stores pending writes; rows with a negative idx replace, the others are kept once."""
+
+    @abstractmethod
+    def _get_write_rows(self, thread_id: str, ns: str, checkpoint_id: str) -> List[Dict]:
+        """The pending writes of one checkpoint."""
+
+    @abstractmethod
+    def _delete_thread(self, thread_id: str):
+        """Deletes every checkpoint and write of the thread."""
+
+    @abstractmethod
+    def _trim(self, thread_id: str, ns: str, keep: int) -> int:
+        """Deletes all but the newest keep checkpoints (and their writes); returns how many were deleted."""
+
+    @abstractmethod
+    def _idle_threads(self, cutoff: float) -> List[str]:
+        """Threads whose newest checkpoint was written before cutoff (a Unix timestamp)."""
+
+    @abstractmethod
+    def _storage_stats(self) -> Dict:
+        """Backend-specific size figures for stats()."""
+
+    # --- BaseCheckpointSaver API ---
+
+    def _to_tuple(self, row: Dict) -> CheckpointTuple:
+        writes = sorted(
+            self._get_write_rows(row["thread_id"], row["checkpoint_ns"], row["checkpoint_id"]),
+            key=lambda w: writes_sort_key(w["task_path"], w["task_id"], w["idx"]),
+        )
+        configurable = {
+            "thread_id": row["thread_id"],
+            "checkpoint_ns": row["checkpoint_ns"],
+        }
+        return CheckpointTuple(
+            config={"configurable": {**configurable, "checkpoint_id": row["checkpoint_id"]}},
+            checkpoint=self.serde.loads_typed((row["type"], row["checkpoint"])),
+            metadata=self.serde.loads_typed((row["metadata_type"], row["metadata"])),
+            parent_config=(
+                {"configurable": {**configurable, "checkpoint_id": row["parent_checkpoint_id"]}}
+                if row["parent_checkpoint_id"] else None
+            ),
+            pending_writes=[
+                (w["task_id"], w["channel"], self.serde.loads_typed((w["type"], w["value"]))) for w in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        row = self._get_row(configurable["thread_id"], configurable.get("checkpoint_ns", ""), get_checkpoint_id(config))
+        return self._to_tuple(row) if row else None
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+            ) -> Iterator[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"] if config else None
+        ns = config["configurable"].get("checkpoint_ns") if config else None
+        checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+        # Metadata filters are applied after decoding, so the row limit only applies without them
+        for row in self._list_rows(thread_id, ns, before_id, None if filter else limit):
+            if checkpoint_id and row["checkpoint_id"] != checkpoint_id:
+                continue
+            checkpoint_tuple = self._to_tuple(row)
+            if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+            ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        self._put_row({
+            "thread_id": thread_id,
+            "checkpoint_ns": ns,
+            "checkpoint_id": checkpoint["id"],
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+            "type": checkpoint_type,
+            "checkpoint": checkpoint_blob,
+            "metadata_type": metadata_type,
+            "metadata": metadata_blob,
+            "updated_at": time.time(),
+        })
+        self.counters["puts"] += 1
+        if self.max_checkpoints:
+            self.counters["trimmed_checkpoints"] += self._trim(thread_id, ns, self.max_checkpoints)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+            ) -> None:
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_blob = self.serde.dumps_typed(value)
+            rows.append({
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": configurable["checkpoint_id"],
+                "task_id": task_id,
+                "task_path": task_path,
+                # Special channels (errors, interrupts) use negative indexes and overwrite; regular writes are kept once
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+                "channel": channel,
+                "type": value_type,
+                "value": value_blob,
+            })
+        self._put_write_rows(rows)
+        self.counters["writes"] += len(rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- retention ---
+
+    def evict_idle(self) -> int:
+        """Deletes threads idle for longer than idle_ttl; returns how many were evicted."""
+        if not self.idle_ttl:
+            return 0
+        evicted = self._idle_threads(time.time() - self.idle_ttl)
+        for thread_id in evicted:
+            self._delete_thread(thread_id)
+        self.counters["evicted_threads"] += len(evicted)
+        return len(evicted)
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                evicted = self.evict_idle()
+                if evicted:
+                    print(f"Evicted {evicted} idle conversation thread(s)")
+            except Exception as e:
+                print(f"Checkpoint sweep failed: {e}")
+
+    def start(self):
+        if self._thread is None and self.idle_ttl:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        return {
+            "backend": type(self).__name__,
+            "max_checkpoints": self.max_checkpoints,
+            "idle_ttl": self.idle_ttl,
+            **self._storage_stats(),
+            **self.counters,
+        }
+
+
+class SQLiteCheckpointSaver(RetainingCheckpointSaver):
+    """RetainingCheckpointSaver on a local SQLite file (WAL mode, one connection guarded by a lock)."""
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));
+                CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at);
+                CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL, task_path TEXT NOT NULL DEFAULT '', idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL, type TEXT, value BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));
+            """)
+            self._conn.commit()
+
+    def _put_row(self, row):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (:thread_id, :checkpoint_ns, :checkpoint_id,"
+                " :parent_checkpoint_id, :type, :checkpoint, :metadata_type, :metadata, :updated_at)", row)
+            self._conn.commit()
+
+    def _get_row(self, thread_id, ns, checkpoint_id):
+        with self._lock:
+            if checkpoint_id:
+                cursor = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, ns, checkpoint_id))
+            else:
+                cursor = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, ns))
+            row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def _list_rows(self, thread_id, ns, before, limit):
+        clauses, params = [], []
+        for column, value, op in (("thread_id", thread_id, "="), ("checkpoint_ns", ns, "="), ("checkpoint_id", before, "<")):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        query = "SELECT * FROM checkpoints"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(query, params).fetchall()]
+        return iter(rows)
+
+    def _put_write_rows(self, rows):
+        with self._lock:
+            for row in rows:
+                verb = "INSERT OR REPLACE" if row["idx"] < 0 else "INSERT OR IGNORE"
+                self._conn.execute(
+                    f"{verb} INTO writes VALUES (:thread_id, :checkpoint_ns, :checkpoint_id, :task_id, :task_path,"
+                    " :idx, :channel, :type, :value)", row)
+            self._conn.commit()
+
+    def _get_write_rows(self, thread_id, ns, checkpoint_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, ns, checkpoint_id)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _delete_thread(self, thread_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    def _trim(self, thread_id, ns, keep):
+        with self._lock:
+            stale = [row[0] for row in self._conn.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?", (thread_id, ns, keep)).fetchall()]
+            for checkpoint_id in stale:
+                self._conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, ns, checkpoint_id))
+                self._conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, ns, checkpoint_id))
+            if stale:
+                self._conn.commit()
+        return len(stale)
+
+    def _idle_threads(self, cutoff):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(updated_at) < ?", (cutoff,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _storage_stats(self):
+        with self._lock:
+            threads, checkpoints, checkpoint_bytes = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0)"
+                " FROM checkpoints").fetchone()
+            writes, write_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()
+        return {
+            "path": self.path,
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "pending_writes": writes,
+            "bytes": checkpoint_bytes + write_bytes,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class MongoCheckpointSaver(RetainingCheckpointSaver):
+    """RetainingCheckpointSaver on MongoDB, so every worker and instance shares the same threads."""
+    def __init__(self, db, collection: str = "checkpoints", writes_collection: str = "checkpoint_writes", **kwargs):
+        super().__init__(**kwargs)
+        self.checkpoints = db[collection]
+        self.writes = db[writes_collection]
+        self.checkpoints.create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)], unique=True)
+        self.checkpoints.create_index([("thread_id", 1), ("updated_at", -1)])
+        self.writes.create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", 1), ("task_id", 1), ("idx", 1)], unique=True)
+
+    @staticmethod
+    def _key(row):
+        return {k: row[k] for k in ("thread_id", "checkpoint_ns", "checkpoint_id")}
+
+    def _put_row(self, row):
+        self.checkpoints.replace_one(self._key(row), row, upsert=True)
+
+    def _get_row(self, thread_id, ns, checkpoint_id):
+        query = {"thread_id": thread_id, "checkpoint_ns": ns}
+        if checkpoint_id:
+            query["checkpoint_id"] = checkpoint_id
+            return self.checkpoints.find_one(query, {"_id": 0})
+        return next(iter(self.checkpoints.find(query, {"_id": 0}).sort("checkpoint_id", -1).limit(1)), None)
+
+    def _list_rows(self, thread_id, ns, before, limit):
+        query = {}
+        if thread_id is not None:
+            query["thread_id"] = thread_id
+        if ns is not None:
+            query["checkpoint_ns"] = ns
+        if before is not None:
+            query["checkpoint_id"] = {"$lt": before}
+        cursor = self.checkpoints.find(query, {"_id": 0}).sort("checkpoint_id", -1)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return iter(cursor)
+
+    def _put_write_rows(self, rows):
+        from pymongo import ReplaceOne, UpdateOne
+
+        if not rows:
+            return
+        operations = []
+        for row in rows:
+            key = {**self._key(row), "task_id": row["task_id"], "idx": row["idx"]}
+            if row["idx"] < 0:
+                operations.append(ReplaceOne(key, row, upsert=True))
+            else:
+                operations.append(UpdateOne(key, {"$setOnInsert": row}, upsert=True))
+        self.writes.bulk_write(operations, ordered=False)
+
+    def _get_write_rows(self, thread_id, ns, checkpoint_id):
+        return list(self.writes.find(
+            {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}, {"_id": 0}))
+
+    def _delete_thread(self, thread_id):
+        self.checkpoints.delete_many({"thread_id": thread_id})
+        self.writes.delete_many({"thread_id": thread_id})
+
+    def _trim(self, thread_id, ns, keep):
+        stale = [row["checkpoint_id"] for row in self.checkpoints.find(
+            {"thread_id": thread_id, "checkpoint_ns": ns}, {"checkpoint_id": 1}
+        ).sort("checkpoint_id", -1).skip(keep)]
+        if stale:
+            query = {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": {"$in": stale}}
+            self.checkpoints.delete_many(query)
+            self.writes.delete_many(query)
+        return len(stale)
+
+    def _idle_threads(self, cutoff):
+        return [row["_id"] for row in self.checkpoints.aggregate([
+            {"$group": {"_id": "$thread_id", "last": {"$max": "$updated_at"}}},
+            {"$match": {"last": {"$lt": cutoff}}},
+        ])]
+
+    def _storage_stats(self):
+        db = self.checkpoints.database
+        sizes = {}
+        for collection in (self.checkpoints, self.writes):
+            try:
+                sizes[collection.name] = db.command("collStats", collection.name).get("size", 0)
+            except Exception:
+                sizes[collection.name] = None
+        return {
+            "threads": len(self.checkpoints.distinct("thread_id")),
+            "checkpoints": self.checkpoints.estimated_document_count(),
+            "pending_writes": self.writes.estimated_document_count(),
+            "bytes": sum(size for size in sizes.values() if size),
+        }
+
+
+CHECKPOINT_BACKENDS = ("sqlite", "mongo", "memory")
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "checkpoints.sqlite3")
+
+
+def create_checkpointer(backend: Optional[str] = None):
+    """
+    Builds the graph checkpointer from CHECKPOINT_BACKEND ("sqlite" by default, "mongo" for
+    shared production storage, "memory" for the old in-process MemorySaver).
+    """
+    backend = (backend or os.getenv("CHECKPOINT_BACKEND", "sqlite")).lower()
+    if backend not in CHECKPOINT_BACKENDS:
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND '{backend}', expected one of {CHECKPOINT_BACKENDS}")
+    if backend == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+
+    idle_hours = float(os.getenv("CHECKPOINT_IDLE_TTL_HOURS", "72"))
+    kwargs = {
+        "max_checkpoints": int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20")) or None,
+        "idle_ttl": idle_hours * 3600 if idle_hours > 0 else None,
+        "sweep_interval": float(os.getenv("CHECKPOINT_SWEEP_INTERVAL_SECONDS", "600")),
+    }
+    if backend == "mongo":
+        from pymongo import MongoClient
+        saver = MongoCheckpointSaver(MongoClient(os.getenv("MONGODB_URI"))["asha_ai_db"], **kwargs)
+    else:
+        # An empty CHECKPOINT_SQLITE_PATH= means the default too; sqlite3 would open a private temp database for ""
+        path = os.getenv("CHECKPOINT_SQLITE_PATH") or DEFAULT_SQLITE_PATH
+        saver = SQLiteCheckpointSaver(path, **kwargs)
+    saver.start()
+    return saver
+
+
+def checkpoint_stats() -> Dict[str, Dict]:
+    return {name: saver.stats() for name, saver in SAVERS.items()}
@@ -0,0 +1,279 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Every context window registers here so /admin/context can report on it
+CONTEXT_WINDOWS: Dict[str, "ContextWindow"] = {}
+
+SUMMARY_PROMPT = """You maintain a running summary of a career-assistant conversation between a user and Asha.
+Update the summary with the new exchanges below. Keep the user's goals, stated preferences, constraints and
+any jobs, events or advice they reacted to; drop pleasantries and raw listings. At most {words} words.
+
+<Current summary>
+{summary}
+</Current summary>
+
+<New exchanges>
+{exchanges}
+</New exchanges>"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for Gemini on English text); no API round trip."""
+    return len(text) // 4 + 1
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def tool_stub(message: ToolMessage) -> ToolMessage:
+    """Replaces a tool output with a one-line note, keeping the tool_call_id so the call/response pairing stays valid."""
+    text = message_text(message)
+    return ToolMessage(
+        content=f"[{message.name or 'tool'} output from an earlier turn omitted ({len(text)} characters); "
+                f"call the tool again if it is needed]",
+        name=message.name,
+        tool_call_id=message.tool_call_id,
+        id=message.id,
+    )
+
+
+def summary_namespace(user_id: str) -> tuple:
+    return ("conversation_summary", user_id)
+
+
+class ContextWindow:
+    """
+    Builds the messages sent to the model under a per-call token budget.
+
+    The last keep_turns turns (a turn starts at a user message) are sent verbatim, except
+    that tool outputs from turns before the current one are replaced by stubs. If the window
+    is still over budget, whole turns are dropped from it until only the current turn is
+    left, and then the current turn's tool outputs are truncated.
+
+    Turns that fall out of the window are folded into a running summary, which goes into the
+    system prompt. Folding costs a model call, so it never runs on the request path: prepare()
+    uses the summary stored so far and hands the uncovered turns to a background worker,
+    which updates it incrementally (each message is summarized once). Until that finishes, the
+    turns that just left the window are covered by neither. The summary is kept in the store
+    under ("conversation_summary", user_id), keyed by thread, with the id of the last message
+    it covers; a thread rolled back past that message starts a new summary.
+
+    Args:
+        summarize: Callable taking a prompt and returning the model's text, or None to keep no summary.
+        store: BaseStore holding the summaries; required for summarize to take effect.
+        budget: Maximum estimated input tokens per call, system prompt included.
+        keep_turns: Turns kept verbatim when they fit the budget.
+        summary_words: Length cap given to the summarizer.
+        count_tokens: Token estimator for a string.
+        workers: Background summary calls that run at once.
+        name: Registers the window in CONTEXT_WINDOWS under this name for metrics.
+    """
+    def __init__(
+            self,
+            summarize: Optional[Callable[[str], str]] = None,
+            store=None,
+            budget: int = 8000,
+            keep_turns: int = 4,
+            summary_words: int = 150,
+            count_tokens: Callable[[str], int] = estimate_tokens,
+            workers: int = 2,
+            name: str = "context",
+            ):
+        self.summarize = summarize if store is not None else None
+        self.store = store
+        self.budget = budget
+        self.keep_turns = max(1, keep_turns)
+        self.summary_words = summary_words
+        self.count_tokens = count_tokens
+        self.name = name
+        self.recent = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="context-summary")
+        self._folding = set()
+        self.counters = {
+            "calls": 0, "estimated_tokens": 0, "input_tokens": 0, "output_tokens": 0, "history_tokens": 0,
+            "stubbed_tool_messages": 0, "truncated_tool_messages": 0, "summaries": 0, "summary_failures": 0,
+        }
+        CONTEXT_WINDOWS[name] = self
+
+    def _tokens(self, message: BaseMessage) -> int:
+        # A few tokens of per-message framing on top of the content
+        tokens = self.count_tokens(message_text(message)) + 4
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += self.count_tokens(str(message.tool_calls))
+        return tokens
+
+    @staticmethod
+    def _turn_starts(messages: Sequence[BaseMessage]) -> List[int]:
+        return [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)] or [0]
+
+    def _render(self, messages: Sequence[BaseMessage], start: int, current: int) -> Tuple[List[BaseMessage], int]:
+        rendered, stubbed = [], 0
+        for i in range(start, len(messages)):
+            message = messages[i]
+            if i < current and isinstance(message, ToolMessage):
+                message = tool_stub(message)
+                stubbed += 1
+            rendered.append(message)
+        return rendered, stubbed
+
+    def _fold(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        lines = []
+        for message in messages:
+            if isinstance(message, ToolMessage):
+                lines.append(f"({message.name} returned results)")
+            elif isinstance(message, HumanMessage):
+                lines.append(f"User: {message_text(message)}")
+            elif isinstance(message, AIMessage):
+                text = message_text(message)
+                if text:
+                    lines.append(f"Asha: {text[:1000]}")
+        if not lines:
+            return summary
+        prompt = SUMMARY_PROMPT.format(
+            words=self.summary_words, summary=summary or "(none yet)", exchanges="\n".join(lines)
+        )
+        return self.summarize(prompt).strip()
+
+    def _stored_summary(self, thread: Tuple[str, str], messages: Sequence[BaseMessage]) -> Tuple[str, int]:
+        """The stored summary of the thread and the index of the first message it does not cover."""
+        item = self.store.get(summary_namespace(thread[0]), thread[1])
+        if item is not None:
+            for i, message in enumerate(messages):
+                if message.id == item.value.get("through"):
+                    return item.value.get("summary", ""), i + 1
+        return "", 0
+
+    def _fold_later(self, thread: Tuple[str, str], summary: str, messages: Sequence[BaseMessage]):
+        """Folds messages into the thread's summary on the worker pool; a thread already being folded is skipped."""
+        with self._lock:
+            if thread in self._folding:
+                return
+            self._folding.add(thread)
+
+        def fold():
+            try:
+                self.store.put(summary_namespace(thread[0]), thread[1], {
+                    "summary": self._fold(summary, messages),
+                    "through": messages[-1].id,
+                })
+                with self._lock:
+                    self.counters["summaries"] += 1
+            except Exception as e:
+                # The turns stay uncovered; the next call over this thread submits them again
+                print(f"Conversation summary failed: {e}")
+                with self._lock:
+                    self.counters["summary_failures"] += 1
+            finally:
+                with self._lock:
+                    self._folding.discard(thread)
+
+        self._executor.submit(fold)
+
+    def prepare(self, state: dict, system_prompt: str, thread: Optional[Tuple[str, str]] = None) -> List[BaseMessage]:
+        """
+        Returns the messages to send for the state. thread is the (user_id, thread_id) the
+        summary is kept under; without it no summary is used or updated.
+        """
+        messages = state["messages"]
+        summarizing = self.summarize is not None and thread is not None
+        summary, summarized = self._stored_summary(thread, messages) if summarizing else ("", 0)
+        starts = [s for s in self._turn_starts(messages) if s >= summarized] or [self._turn_starts(messages)[-1]]
+        current = starts[-1]
+        window = starts[-self.keep_turns:]
+
+        # Room for the summary; a word is roughly 1.5 tokens
+        fixed = self.count_tokens(system_prompt) + (
+            max(self.count_tokens(summary), int(self.summary_words * 1.5)) if summarizing else 0)
+        rendered, stubbed = self._render(messages, window[0], current)
+        while len(window) > 1 and fixed + sum(map(self._tokens, rendered)) > self.budget:
+            window = window[1:]
+            rendered, stubbed = self._render(messages, window[0], current)
+
+        truncated = 0
+        overflow = fixed + sum(map(self._tokens, rendered)) - self.budget
+        if overflow > 0:
+            rendered, truncated = self._truncate_tools(rendered, overflow)
+
+        if summarizing and window[0] > summarized:
+            self._fold_later(thread, summary, messages[summarized:window[0]])
+
+        if summary:
+            system_prompt = f"{system_prompt}\n<Conversation summary>\n{summary}\n</Conversation summary>\n"
+        prepared = [SystemMessage(content=system_prompt), *rendered]
+
+        with self._lock:
+            self.counters["stubbed_tool_messages"] += stubbed
+            self.counters["truncated_tool_messages"] += truncated
+            self.counters["history_tokens"] += sum(map(self._tokens, messages))
+        return prepared
+
+    def flush(self, timeout: float = 30):
+        """Waits up to timeout seconds for the background summaries in flight."""
+        deadline = time.monotonic() + timeout
+        while self._folding and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _truncate_tools(self, rendered: List[BaseMessage], overflow: int) -> Tuple[List[BaseMessage], int]:
+        """Cuts the current turn's tool outputs, largest first, until the overflow is gone."""
+        rendered = list(rendered)
+        truncated = 0
+        tools = sorted(
+            (i for i, m in enumerate(rendered) if isinstance(m, ToolMessage)),
+            key=lambda i: -self._tokens(rendered[i]),
+        )
+        for i in tools:
+            if overflow <= 0:
+                break
+            text = message_text(rendered[i])
+            keep = max(0, len(text) - (overflow + 16) * 4)
+            rendered[i] = ToolMessage(
+                content=text[:keep] + "\n[... truncated to fit the context budget]",
+                name=rendered[i].name, tool_call_id=rendered[i].tool_call_id, id=rendered[i].id,
+            )
+            overflow -= self.count_tokens(text) - self.count_tokens(text[:keep])
+            truncated += 1
+        return rendered, truncated
+
+    def record(self, call: str, prepared: Sequence[BaseMessage], response=None):
+        """Records the estimated and, when the provider reports it, actual token usage of a model call."""
+        estimated = sum(map(self._tokens, prepared))
+        usage = getattr(response, "usage_metadata", None) or {}
+        entry = {
+            "call": call,
+            "messages": len(prepared),
+            "estimated_tokens": estimated,
+            "input_tokens": usage.get("input_tokens"),
+            "output_tokens": usage.get("output_tokens"),
+        }
+        with self._lock:
+            self.counters["calls"] += 1
+            self.counters["estimated_tokens"] += estimated
+            self.counters["input_tokens"] += usage.get("input_tokens") or 0
+            self.counters["output_tokens"] += usage.get("output_tokens") or 0
+            self.recent.append(entry)
+        print(f"Context {call}: {len(prepared)} messages, ~{estimated} tokens (input_tokens={entry['input_tokens']})")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self.counters["calls"]
+            return {
+                "budget": self.budget,
+                "keep_turns": self.keep_turns,
+                **self.counters,
+                "avg_estimated_tokens": round(self.counters["estimated_tokens"] / calls, 1) if calls else 0.0,
+                "recent": list(self.recent),
+            }
+
+
+def context_stats() -> Dict[str, Dict]:
+    return {name: window.stats() for name, window in CONTEXT_WINDOWS.items()}
@@ -0,0 +1,98 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+
+class EventCatalogSync:
+    """
+    Keeps the Mongo event catalog in step with the HerKey events page.
+
+    A background thread scrapes the events page every interval seconds and upserts the
+    parsed events, so current_events_tool answers from indexed Mongo queries instead of
+    launching a browser per call. Events that ended more than prune_after ago are deleted.
+
+    Args:
+        db: The MongoDB wrapper holding the events collection.
+        fetch: Zero-argument callable scraping the events page into a list of event dicts.
+        interval: Seconds between syncs.
+        prune_after: How long after an event ends it is kept in the catalog.
+        retry_after: Seconds before ensure_populated() retries a failed foreground sync; doubled
+            after every further failure, up to interval.
+    """
+    def __init__(
+            self,
+            db,
+            fetch: Callable[[], List[dict]],
+            interval: float = 3600,
+            prune_after: timedelta = timedelta(days=7),
+            retry_after: float = 60,
+            ):
+        self.db = db
+        self.fetch = fetch
+        self.interval = interval
+        self.prune_after = prune_after
+        self.retry_after = retry_after
+        self.last_synced: Optional[datetime] = None
+        self.last_attempt: Optional[datetime] = None
+        self._failures = 0
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"syncs": 0, "sync_failures": 0, "events_changed": 0, "events_pruned": 0}
+
+    def sync(self) -> int:
+        """Scrapes and upserts the events page once; returns the number of events inserted or changed."""
+        with self._lock:
+            self.last_attempt = datetime.utcnow()
+            try:
+                events = self.fetch()
+                if not events:
+                    self._failed()
+                    return 0
+                changed = self.db.upsert_events(events)
+                pruned = self.db.prune_events(datetime.utcnow() - self.prune_after)
+                self.last_synced = datetime.utcnow()
+                self._failures = 0
+                self.stats["syncs"] += 1
+                self.stats["events_changed"] += changed
+                self.stats["events_pruned"] += pruned
+                print(f"Event catalog synced: {len(events)} scraped, {changed} changed, {pruned} pruned")
+                return changed
+            except Exception as e:
+                self._failed()
+                print(f"Event catalog sync failed: {e}")
+                return 0
+
+    def _failed(self):
+        self.stats["sync_failures"] += 1
+        self._failures += 1
+        self._next_attempt = time.monotonic() + min(self.interval, self.retry_after * 2 ** (self._failures - 1))
+
+    def ensure_populated(self) -> bool:
+        """
+        Syncs in the foreground when the catalog is empty, e.g. on a fresh database; returns
+        whether the catalog has events. Chat requests do not wait on a sync that is already
+        running, and after a failed sync they skip the scrape until the retry backoff has
+        passed, leaving the catalog to the background sync.
+        """
+        if self.last_synced is not None or self.db.count_events() > 0:
+            return True
+        if self._lock.locked() or time.monotonic() < self._next_attempt:
+            return False
+        self.sync()
+        return self.last_synced is not None
+
+    def _run(self):
+        self.sync()
+        while not self._stop.wait(self.interval):
+            self.sync()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-catalog-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
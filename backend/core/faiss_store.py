@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.json"
+
+
+def default_index_path() -> str:
+    """FAISS_INDEX_PATH, or .cache/faiss/jobs-index under the backend directory."""
+    return os.environ.get(
+        "FAISS_INDEX_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "faiss", "jobs-index"),
+    )
+
+
+class LocalFaissIndex:
+    """
+    Local stand-in for the Pinecone jobs-index.
+
+    Takes the same {"id", "values", "metadata"} vectors the ingestion pipeline upserts into
+    Pinecone and writes them to a directory holding a flat inner-product FAISS index over
+    L2-normalized vectors (cosine similarity, like jobs-index) and a JSON docstore.
+    load_vectorstore() reads that directory back memory-mapped as a LangChain FAISS store.
+
+    Args:
+        path: Directory the index and docstore are saved to.
+        dimension: Embedding size; 768 for models/embedding-001.
+    """
+    def __init__(self, path: Optional[str] = None, dimension: int = 768):
+        self.path = Path(path or default_index_path())
+        self.dimension = dimension
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._metadata: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: Optional[str] = None, dimension: int = 768) -> "LocalFaissIndex":
+        """Opens the index at path for further upserts, or starts an empty one."""
+        store = cls(path, dimension)
+        index_file, docstore_file = store.path / INDEX_FILE, store.path / DOCSTORE_FILE
+        if index_file.exists() and docstore_file.exists():
+            index = faiss.read_index(str(index_file))
+            with open(docstore_file, encoding="utf-8") as f:
+                docstore = json.load(f)
+            vectors = index.reconstruct_n(0, index.ntotal)
+            for position, record in enumerate(docstore["documents"]):
+                metadata = dict(record["metadata"], text=record["page_content"])
+                store._vectors[record["id"]] = vectors[position]
+                store._metadata[record["id"]] = metadata
+            store.dimension = index.d
+        return store
+
+    def upsert(self, vectors: List[Dict]):
+        """Same call shape as the Pinecone Index.upsert used by the ingestion pipeline."""
+        with self._lock:
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype="float32")
+                if values.shape != (self.dimension,):
+                    raise ValueError(f"Vector {vector['id']} has {values.size} dimensions, expected {self.dimension}")
+                self._vectors[vector["id"]] = values
+                self._metadata[vector["id"]] = dict(vector.get("metadata") or {})
+
+    def content_hashes(self, ids: List[str]) -> Dict[str, str]:
+        with self._lock:
+            return {i: self._metadata[i].get("content_hash") for i in ids if i in self._metadata}
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._vectors)
+
+    def metadata(self, ids: List[str]) -> Dict[str, dict]:
+        with self._lock:
+            return {i: dict(self._metadata[i]) for i in ids if i in self._metadata}
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def save(self):
+        """Writes the index and docstore; files are replaced atomically so readers never see a half-written index."""
+        with self._lock:
+            ids = list(self._vectors)
+            matrix = np.vstack([self._vectors[i] for i in ids]) if ids else np.zeros((0, self.dimension), dtype="float32")
+            metadata = [dict(self._metadata[i]) for i in ids]
+        faiss.normalize_L2(matrix)
+        index = faiss.IndexFlatIP(self.dimension)
+        index.add(matrix)
+
+        documents = []
+        for vector_id, meta in zip(ids, metadata):
+            text = meta.pop("text", "")
+            documents.append({"id": vector_id, "page_content": text, "metadata": meta})
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_index, tmp_docstore = self.path / (INDEX_FILE + ".tmp"), self.path / (DOCSTORE_FILE + ".tmp")
+        faiss.write_index(index, str(tmp_index))
+        with open(tmp_docstore, "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "metric": "cosine", "documents": documents}, f)
+        os.replace(tmp_index, self.path / INDEX_FILE)
+        os.replace(tmp_docstore, self.path / DOCSTORE_FILE)
+        print(f"Saved {len(ids)} vectors to {self.path}")
+
+
+def load_vectorstore(embedding, path: Optional[str] = None) -> FAISS:
+    """
+    Loads a LocalFaissIndex directory as a LangChain FAISS vector store. The index file is
+    memory-mapped, so startup does not copy it into memory and the OS page cache is shared
+    between worker processes. Stored vectors are unit length, so ranking by inner product
+    is ranking by cosine similarity without normalizing each query.
+    """
+    path = Path(path or default_index_path())
+    index_file, docstore_file = path / INDEX_FILE, path / DOCSTORE_FILE
+    if not index_file.exists() or not docstore_file.exists():
+        raise ValueError(f"No FAISS index at '{path}'; build one with VECTOR_BACKEND=faiss python api/fetch.py")
+    try:
+        index = faiss.read_index(str(index_file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Older faiss builds cannot mmap flat indexes
+        index = faiss.read_index(str(index_file))
+    with open(docstore_file, encoding="utf-8") as f:
+        documents = json.load(f)["documents"]
+    if len(documents) != index.ntotal:
+        raise ValueError(f"FAISS index at '{path}' has {index.ntotal} vectors but {len(documents)} documents")
+
+    docstore = InMemoryDocstore({
+        record["id"]: Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+        for record in documents
+    })
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id={position: record["id"] for position, record in enumerate(documents)},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
@@ -1,11 +1,17 @@
+import asyncio
+import hashlib
 import logging
+import re
+import unicodedata
 import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from models.data_model import BiasDetection
 logging.getLogger("presidio-analyzer").setLevel(logging.ERROR)
 
 warnings.filterwarnings("ignore")
 
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, List, Optional
 from guardrails.validators import (
     FailResult,
     PassResult,
@@ -13,10 +19,10 @@ from guardrails.validators import (
     ValidationResult,
     Validator,
 )
-from presidio_analyzer import AnalyzerEngine
-from presidio_analyzer.nlp_engine import TransformersNlpEngine
-from presidio_anonymizer import AnonymizerEngine
-from langchain_google_genai import ChatGoogleGenerativeAI
+from core.registry import AnalyzerRegistry, ModelRegistry
+from core.pii import TieredPIIDetector
+from core.cache import CACHES, TTLCache
+from core.tracing import annotate, bind_context, span
 
 @register_validator(name="detect-pii", data_type="string")
 class CustomDetectPII(Validator):
@@ -26,23 +32,44 @@ class CustomDetectPII(Validator):
             entities : list = ["PHONE_NUMBER", "EMAIL_ADDRESS", "PERSON", "CRYPTO", "ID", "IP_ADDRESS"],
             spacy_model_name: str = "en_core_web_sm",
             transformer_model_name: str = "StanfordAIMI/stanford-deidentifier-base",
+            detection: str = "tiered",
+            entity_tiers: Optional[Dict[str, str]] = None,
             on_fail: Optional[Callable] = None
             ):
         super().__init__(on_fail=on_fail, score_threshold=score_threshold)
 
+        if detection not in ("tiered", "transformer"):
+            raise ValueError(f"Unknown PII detection mode '{detection}', expected 'tiered' or 'transformer'")
         self.score_threshold = score_threshold
         self.entities = entities
-        self.model_config = [{"lang_code": "en", "model_name": {
-              "spacy": spacy_model_name,
-              "transformers": transformer_model_name
-            }
-        }]
-        self.nlp_engine = TransformersNlpEngine(models=self.model_config)
-        self.analyzer = AnalyzerEngine(nlp_engine=self.nlp_engine)
-        self.anonymizer = AnonymizerEngine()
+        self.spacy_model_name = spacy_model_name
+        self.transformer_model_name = transformer_model_name
+        self.detection = detection
+        self.detector = TieredPIIDetector(
+            entities,
+            analyzer_provider=lambda: self.analyzer,
+            entity_tiers=entity_tiers,
+            score_threshold=score_threshold,
+        )
+
+    # The NLP pipeline is shared process-wide and only loaded on first use (see AnalyzerRegistry)
+    @property
+    def analyzer(self):
+        return AnalyzerRegistry.get(self.spacy_model_name, self.transformer_model_name).analyzer
+
+    @property
+    def anonymizer(self):
+        return AnalyzerRegistry.anonymizer()
+
+    def warmup(self):
+        AnalyzerRegistry.get(self.spacy_model_name, self.transformer_model_name)
 
     def _validate(self, value: str, metadata: Dict) -> ValidationResult:
-        if self.score_threshold is not None:
+        if self.detection == "tiered":
+          result = self.detector.analyze(value)
+          if not result:
+              return PassResult()
+        elif self.score_threshold is not None:
           result = self.analyzer.analyze(text=value, language='en', entities= self.entities, score_threshold=self.score_threshold)
         else:
           result = self.analyzer.analyze(text=value, language='en', entities=self.entities)
@@ -56,13 +83,93 @@ class CustomDetectPII(Validator):
             )
 
 
+def normalize_query(text: str) -> str:
+    """Folds case, punctuation and whitespace so trivially different queries share a cache key."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def query_key(text: str) -> str:
+    """SHA-256 of normalize_query(text), so cached verdicts do not keep the raw (possibly PII-bearing) query in memory."""
+    return hashlib.sha256(normalize_query(text).encode("utf-8")).hexdigest()
+
+
+class BiasVerdictCache:
+    """
+    LRU+TTL cache of BiasDetection verdicts keyed on query_key(text), a hash of the normalized query.
+
+    With an embeddings model (any langchain Embeddings) a miss on the exact key falls back
+    to the most similar cached query, reused only above similarity_threshold. That costs one
+    embedding call per miss, so it is off by default.
+    """
+    def __init__(
+            self,
+            maxsize: int = 1024,
+            ttl: float = 3600,
+            embeddings=None,
+            similarity_threshold: float = 0.97,
+            name: str = "bias_verdicts",
+            ):
+        self.verdicts = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self._vectors = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.similar_hits = 0
+        CACHES[name] = self
+
+    def _embed(self, text: str):
+        import numpy as np
+        vector = np.asarray(self.embeddings.embed_query(normalize_query(text)), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _most_similar(self, vector):
+        import numpy as np
+        keys = self._vectors.keys()
+        vectors = [self._vectors.get(k) for k in keys]
+        candidates = [(k, v) for k, v in zip(keys, vectors) if v is not None]
+        if not candidates:
+            return None, 0.0
+        scores = np.stack([v for _, v in candidates]) @ vector
+        best = int(scores.argmax())
+        return candidates[best][0], float(scores[best])
+
+    def get(self, text: str) -> Optional[BiasDetection]:
+        key = query_key(text)
+        verdict = self.verdicts.get(key)
+        if verdict is not None or self.embeddings is None:
+            return verdict
+        vector = self._embed(text)
+        similar_key, score = self._most_similar(vector)
+        self._vectors.set(key, vector)
+        if similar_key is not None and score >= self.similarity_threshold:
+            verdict = self.verdicts.get(similar_key)
+            if verdict is not None:
+                self.similar_hits += 1
+                self.verdicts.set(key, verdict)
+        return verdict
+
+    def set(self, text: str, verdict: BiasDetection):
+        key = query_key(text)
+        self.verdicts.set(key, verdict)
+        if self.embeddings is not None and key not in self._vectors:
+            self._vectors.set(key, self._embed(text))
+
+    def stats(self) -> Dict:
+        return {**self.verdicts.stats(), "similar_hits": self.similar_hits}
+
+
 @register_validator(name="detect-bias", data_type="string")
 class CustomDetectBias(Validator):
-    def __init__(self, bias_threshold: int=70, model='gemini-2.0-flash', on_fail: Optional[Callable] = None):
+    def __init__(self, bias_threshold: int=70, model='gemini-2.0-flash', cache: Optional["BiasVerdictCache"] = None, use_cache: bool = True, on_fail: Optional[Callable] = None):
         super().__init__(on_fail=on_fail, bias_threshold=bias_threshold)
-        self.llm = ChatGoogleGenerativeAI(model= model)
-        self.structured_llm = self.llm.with_structured_output(BiasDetection)
+        self.llm = ModelRegistry.chat(model)
+        self.structured_llm = ModelRegistry.structured(BiasDetection, model)
         self.bias_threshold = bias_threshold
+        if cache is None and use_cache:
+            cache = BiasVerdictCache()
+        self.cache = cache
         self.SYSTEM_PROMPT = """
             You are a bias detection expert tasked with performing tasked exclusively with identifying and analyzing gender bias within content relevant to the Asha AI Chatbot initiative. This chatbot is developed for the JobsForHer Foundation platform, which is dedicated to empowering women in their professional journeys. Your objective is to thoroughly examine any given text (e.g., user queries) to detect potential gender-based bias or insensitive language.
             Gender Bias Detection:
@@ -87,7 +194,15 @@ class CustomDetectBias(Validator):
                 "content": value,
             }
         ]
-        response = self._llm_callable(messages)
+        # metadata["bypass_cache"] forces a fresh verdict, which then replaces the cached one
+        response = None
+        if self.cache is not None and not metadata.get("bypass_cache", False):
+            response = self.cache.get(value)
+        annotate(cache="hit" if response is not None else "miss")
+        if response is None:
+            response = self._llm_callable(messages)
+            if self.cache is not None:
+                self.cache.set(value, response)
         bias_detected = response.bias_detected
         bias_score = response.bias_score
         bias_response = response.response
@@ -100,4 +215,157 @@ class CustomDetectBias(Validator):
           else:
               return PassResult()
         else:
-            return PassResult()
\ No newline at end of file
+            return PassResult()
+
+
+def _fixed_text(result: ValidationResult, value: str) -> str:
+    if isinstance(result, FailResult) and result.fix_value is not None:
+        return result.fix_value
+    return value
+
+
+@dataclass
+class GuardOutcome:
+    """Result of running the PII and bias validators over a user query."""
+    raw_output: str
+    validated_output: str
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def validation_passed(self) -> bool:
+        return not self.failures
+
+    @property
+    def failed_validators(self) -> List[str]:
+        return list(self.failures)
+
+    def to_dict(self) -> Dict:
+        """Mirrors the keys of guardrails' ValidationOutcome.to_dict() used by the frontend."""
+        return {
+            "rawLlmOutput": self.raw_output,
+            "validatedOutput": self.validated_output,
+            "validationPassed": self.validation_passed,
+            "validationSummaries": [
+                {"validatorName": name, "validatorStatus": "fail", "failureReason": reason}
+                for name, reason in self.failures.items()
+            ],
+        }
+
+
+class GuardRun:
+    """
+    Handle on an in-flight guardrail check.
+
+    The PII-fixed text is available as soon as the PII validator finishes, so callers
+    can start work on it while the bias verdict is still pending.
+    """
+    def __init__(self, value: str, pii_future, bias_future, speculative: bool):
+        self.value = value
+        self.pii_future = pii_future
+        self.bias_future = bias_future
+        self.speculative = speculative
+
+    def sanitized(self, timeout: Optional[float] = None) -> str:
+        """Returns the query with PII anonymized, waiting only on the PII validator."""
+        return _fixed_text(self.pii_future.result(timeout=timeout), self.value)
+
+    def bias_result(self, timeout: Optional[float] = None) -> ValidationResult:
+        return self.bias_future.result(timeout=timeout)
+
+    def bias_failed(self, timeout: Optional[float] = None) -> bool:
+        return isinstance(self.bias_result(timeout=timeout), FailResult)
+
+    async def asanitized(self) -> str:
+        """sanitized() for async callers: awaits the PII validator without blocking the event loop."""
+        return _fixed_text(await asyncio.wrap_future(self.pii_future), self.value)
+
+    async def abias_failed(self) -> bool:
+        return isinstance(await asyncio.wrap_future(self.bias_future), FailResult)
+
+    def add_bias_callback(self, fn: Callable[[], None]):
+        """Calls fn (with no arguments) once the bias verdict is available."""
+        self.bias_future.add_done_callback(lambda _: fn())
+
+    def outcome(self) -> GuardOutcome:
+        sanitized = self.sanitized()
+        failures = {}
+        pii_result = self.pii_future.result()
+        if isinstance(pii_result, FailResult):
+            failures["CustomDetectPII"] = pii_result.error_message
+        bias_result = self.bias_result()
+        validated_output = sanitized
+        if isinstance(bias_result, FailResult):
+            failures["CustomDetectBias"] = bias_result.error_message
+            validated_output = bias_result.fix_value
+        return GuardOutcome(raw_output=self.value, validated_output=validated_output, failures=failures)
+
+
+class GuardRunner:
+    """
+    Runs CustomDetectPII and CustomDetectBias over a query.
+
+    The bias check calls Gemini, so it only ever sees text that is free of PII. In
+    "parallel" mode a query that the tier-one PII screen clears (no candidate spans, see
+    TieredPIIDetector.may_contain_pii) is already PII-free, so both validators start at once
+    on it and the total wait is max(PII, bias). Any other query is checked PII-first, with
+    bias on the PII-fixed text; callers may still speculate on the sanitized text while bias
+    runs. "sequential" mode keeps the Guard().use_many ordering for every query, and nothing
+    should start before bias passes.
+
+    The bias check fails open: if the validator raises (e.g. the model call errors), the
+    query is treated as unbiased and the error is logged and annotated on the request's
+    trace, so a Gemini outage does not break chats mid-stream. PII errors still propagate,
+    as sanitized() is awaited before anything is sent.
+    """
+    MODES = ("parallel", "sequential")
+
+    def __init__(self, pii: CustomDetectPII, bias: CustomDetectBias, mode: str = "parallel", max_workers: int = 8):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown guardrail mode '{mode}', expected one of {self.MODES}")
+        self.pii = pii
+        self.bias = bias
+        self.mode = mode
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="guardrail")
+
+    @staticmethod
+    def _timed(name: str, validator: Validator, value: str, metadata: Dict):
+        with span(name):
+            return validator.validate(value, metadata)
+
+    def _check_bias(self, value: str, metadata: Dict) -> ValidationResult:
+        try:
+            return self._timed("guardrails.bias", self.bias, value, metadata)
+        except Exception as e:
+            print(f"Bias check failed, letting the query through: {e}")
+            annotate(bias_error=type(e).__name__)
+            return PassResult()
+
+    def _pii_free(self, value: str) -> bool:
+        """True if the query can go to the bias model as-is, before the PII validator has run."""
+        return self.pii.detection == "tiered" and not self.pii.detector.may_contain_pii(value)
+
+    def submit(self, value: str, metadata: Optional[Dict] = None) -> GuardRun:
+        metadata = metadata or {}
+        if self.mode == "parallel" and self._pii_free(value):
+            # bind_context carries the request's trace into the worker threads
+            pii_future = self.executor.submit(bind_context(self._timed), "guardrails.pii", self.pii, value, metadata)
+            bias_future = self.executor.submit(bind_context(self._check_bias), value, metadata)
+        else:
+            # A single task resolves both futures so no worker ever blocks on another.
+            pii_future, bias_future = Future(), Future()
+
+            def _run_sequential():
+                try:
+                    pii_result = self._timed("guardrails.pii", self.pii, value, metadata)
+                except BaseException as e:
+                    pii_future.set_exception(e)
+                    bias_future.set_exception(e)
+                    return
+                pii_future.set_result(pii_result)
+                bias_future.set_result(self._check_bias(_fixed_text(pii_result, value), metadata))
+
+            self.executor.submit(bind_context(_run_sequential))
+        return GuardRun(value, pii_future, bias_future, speculative=self.mode == "parallel")
+
+    def validate(self, value: str, metadata: Optional[Dict] = None) -> GuardOutcome:
+        return self.submit(value, metadata).outcome()
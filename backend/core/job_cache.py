@@ -0,0 +1,144 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+
+class JobCacheRefresher:
+    """
+    Stale-while-revalidate front for the HerKey job cache, plus a background warmer.
+
+    Reads return whatever the cache holds, fresh or stale; stale entries are re-scraped in
+    the background. A warmer thread tracks how often each URL is requested and re-scrapes
+    the most popular ones shortly before they go stale, so popular searches never wait on
+    the scraper.
+
+    Args:
+        db: The MongoDB wrapper holding the job_cache collection.
+        fetch: Callable scraping a HerKey jobs URL into a list of job dicts.
+        fresh_for: How long scraped results count as fresh.
+        stale_for: How long after that stale results may still be served.
+        refresh_ahead: Popular URLs are refreshed once they are this close to going stale.
+        max_concurrency: Maximum number of refreshes running at once.
+        budget: Maximum number of warm-up refreshes started per warmer cycle.
+        interval: Seconds between warmer cycles.
+        top_n: Number of most-requested URLs the warmer keeps warm.
+        decay: Factor applied to request counts every cycle so old searches fade out.
+    """
+    def __init__(
+            self,
+            db,
+            fetch: Callable[[str], List[dict]],
+            fresh_for: timedelta = timedelta(hours=24),
+            stale_for: timedelta = timedelta(hours=24),
+            refresh_ahead: timedelta = timedelta(hours=1),
+            max_concurrency: int = 2,
+            budget: int = 10,
+            interval: float = 300,
+            top_n: int = 50,
+            decay: float = 0.9,
+            ):
+        self.db = db
+        self.fetch = fetch
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.refresh_ahead = refresh_ahead
+        self.budget = budget
+        self.interval = interval
+        self.top_n = top_n
+        self.decay = decay
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="job-refresh")
+        self.popularity = Counter()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+    def get(self, url: str) -> Optional[List[dict]]:
+        """Returns cached jobs for url (scheduling a refresh if they are stale), or None on a miss."""
+        with self._lock:
+            self.popularity[url] += 1
+        entry = self.db.get_cached_job_entry(url)
+        if not entry or not entry.get("jobs"):
+            self._count("misses")
+            return None
+        fresh_until = entry.get("fresh_until")
+        if fresh_until is not None and fresh_until <= datetime.utcnow():
+            self._count("stale_hits")
+            print(f"Serving stale results for {url} while refreshing")
+            self.schedule_refresh(url)
+        else:
+            self._count("fresh_hits")
+        return entry["jobs"]
+
+    def _count(self, name: str):
+        # Request threads and refresh workers update the same counters
+        with self._lock:
+            self.stats[name] += 1
+
+    def store(self, url: str, jobs: List[dict]):
+        self.db.cache_job_url(url, jobs, fresh_for=self.fresh_for, stale_for=self.stale_for)
+
+    def refresh(self, url: str):
+        try:
+            jobs = self.fetch(url)
+            if jobs:
+                self.store(url, jobs)
+                self._count("refreshes")
+                print(f"Refreshed {len(jobs)} cached jobs for {url}")
+            else:
+                self._count("refresh_failures")
+        except Exception as e:
+            self._count("refresh_failures")
+            print(f"Refreshing {url} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(url)
+
+    def schedule_refresh(self, url: str) -> bool:
+        """Queues a background refresh unless one is already queued or running for url."""
+        with self._lock:
+            if url in self._in_flight:
+                return False
+            self._in_flight.add(url)
+        self.executor.submit(self.refresh, url)
+        return True
+
+    def warm(self) -> int:
+        """Runs one warmer cycle and returns the number of refreshes it started."""
+        with self._lock:
+            popular = [url for url, _ in self.popularity.most_common(self.top_n)]
+            for url in list(self.popularity):
+                self.popularity[url] *= self.decay
+                if self.popularity[url] < 0.5:
+                    del self.popularity[url]
+        deadline = datetime.utcnow() + self.refresh_ahead
+        started = 0
+        for url in popular:
+            if started >= self.budget:
+                break
+            entry = self.db.get_cached_job_entry(url)
+            fresh_until = entry.get("fresh_until") if entry else None
+            if fresh_until is None or fresh_until <= deadline:
+                started += self.schedule_refresh(url)
+        return started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                started = self.warm()
+                if started:
+                    print(f"Job cache warmer started {started} refresh(es)")
+            except Exception as e:
+                print(f"Job cache warmer cycle failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job-cache-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False)
@@ -1,31 +1,37 @@
 from langchain_core.messages import BaseMessage, ToolMessage
 from langgraph.graph.message import add_messages
 from ast import arguments
+import atexit
 import json
+import os
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from core.tools import vectorstore_retriever_tool, publicapi_retriever_tool, career_guidance_tool, current_events_tool, update_user_profile_tool
 from models.data_model import JobResponseList, CareerResponse, CurrentEvents, UserProfile
-from core.guardrails import CustomDetectPII, CustomDetectBias
-from guardrails import Guard
 from langchain_core.runnables.config import RunnableConfig
 from langgraph.store.base import BaseStore
 from langgraph.func import entrypoint
 from langgraph.config import get_config
-from langgraph.store.memory import InMemoryStore
 from langmem import create_memory_store_manager
+from core.context import ContextWindow
+from core.registry import ModelRegistry
+from core.profile import ProfileCache, ProfileExtractionQueue
+from core.store import create_store
+from core.tool_runner import ToolRunner
+from core.tracing import mark, span
 
 # feedback, preferred jobs, preferred location, preferred work mode
-guard = Guard().use_many(CustomDetectPII(on_fail="fix"), CustomDetectBias(on_fail="fix"))
-
 tools = [vectorstore_retriever_tool, publicapi_retriever_tool, career_guidance_tool, current_events_tool, update_user_profile_tool]
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
-
-STORE = InMemoryStore(
-    index={
-        "dims":3072,
-        "embed": GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-exp-03-07")
-    }
+llm = ModelRegistry.chat()
+
+# Profiles are only read by exact namespace, so nothing is embedded unless STORE_EMBED_NAMESPACES opts in
+STORE = create_store()
+PROFILES = ProfileCache(STORE)
+# Token budget per model call; turns outside the window are folded into a running summary in the background
+CONTEXT = ContextWindow(
+    summarize=(lambda prompt: llm.invoke(prompt).content) if os.getenv("CONTEXT_SUMMARY", "true").lower() == "true" else None,
+    store=STORE,
+    budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000")),
+    keep_turns=int(os.getenv("CONTEXT_KEEP_TURNS", "4")),
 )
 manager = create_memory_store_manager(
     llm,
@@ -34,6 +40,16 @@ manager = create_memory_store_manager(
     enable_inserts=False,
     store=STORE,
 )
+# Profile extraction runs off the chat path, coalescing a user's updates and sending only new messages
+PROFILE_UPDATES = ProfileExtractionQueue(
+    extract=lambda messages, config: manager.invoke({"messages": messages}, config=config),
+    store=STORE,
+    on_done=PROFILES.refresh,
+    debounce=float(os.getenv("PROFILE_EXTRACTION_DEBOUNCE_SECONDS", "10")),
+    workers=int(os.getenv("PROFILE_EXTRACTION_WORKERS", "2")),
+)
+PROFILE_UPDATES.start()
+atexit.register(PROFILE_UPDATES.stop)
 class Node:
     SYSTEM_PROMPT = """You are **Asha**, an AI chatbot developed for the **JobsForHer Foundation**, empowering women in their professional journeys. Your goal is to provide accurate, ethical, and context-aware assistance focused on careers, job listings, community events, mentorship programs, and professional networking.  
 
@@ -57,6 +73,25 @@ You have access to these tools:
 Your mission is to drive intelligent, ethical, and impactful conversations that enable women to thrive professionally.
 """
 
+    # Tools whose effects a discarded speculative run cannot roll back; they run only after the bias check passes
+    SIDE_EFFECT_TOOLS = {"update_user_profile_tool"}
+
+    STRUCTURED_OUTPUTS = {
+        "publicapi_retriever_tool": (JobResponseList, "jobs"),
+        "career_guidance_tool": (CareerResponse, "learning_path"),
+        "current_events_tool": (CurrentEvents, "events"),
+    }
+
+    @staticmethod
+    def conversation(configurable: dict) -> tuple:
+        """The (user_id, thread_id) the conversation summary is kept under."""
+        return configurable["user_id"], configurable.get("thread_id", "")
+
+    @staticmethod
+    def system_prompt(user_id: str) -> str:
+        """The shared system prompt, followed by the user's stored profile when there is one."""
+        return Node.SYSTEM_PROMPT + PROFILES.block(user_id)
+
     @entrypoint(store=STORE)
     def agent(state):
         """
@@ -71,46 +106,14 @@ Your mission is to drive intelligent, ethical, and impactful conversations that
         """
         print("---CALL AGENT---")
         configurable = get_config()["configurable"]
-        results = STORE.search(
-            ("users", configurable["user_id"], "profile")
-        )
-        profile= None
-        SYSTEM_PROMPT = """You are **Asha**, an AI chatbot developed for the **JobsForHer Foundation**, empowering women in their professional journeys. Your goal is to provide accurate, ethical, and context-aware assistance focused on careers, job listings, community events, mentorship programs, and professional networking.  
-
-You have access to these tools:
-- `vectorstore_retriever_tool` for platform-specific info (events, sessions, mentorships).
-- `publicapi_retriever_tool` for live job listings from public APIs.
-- `career_guidance_tool` for career advice sourced from the web.
-- `current_events_tool` for current event information relevant to professional development.
-- `update_user_profile_tool` for updating user profiles with feedback, preferred jobs, locations, and work modes.
-
-**Guidelines:**  
-- **Context-Awareness:** Handle multi-turn conversations coherently, using non-personalized session data.  
-- **Tool Usage:** Select tools smartly based on user needs to fetch real-time, verified information.  
-- **Bias Detection:** Identify and gently correct gender-biased queries. Maintain inclusive, respectful, and empowering language at all times.  
-- **Content Relevance:** Ensure discussions stay within JobsForHer’s domains (career growth, jobs, events, mentorship, networking). Redirect gently if a query is out of scope.  
-- **Privacy & Security:** Never request or retain personal sensitive data. Comply with ethical AI standards.  
-- **Fallback & Feedback:** If unsure, offer alternative suggestions or escalate to human support. Accept user feedback for continuous improvement.
-
-**Tone:** Professional, friendly, empathetic, encouraging, always positive toward women’s professional growth.  
-
-Your mission is to drive intelligent, ethical, and impactful conversations that enable women to thrive professionally.
-"""
-        if results:
-            profile = f"""\n<User Profile>:
-        {results[0].value}
-        </User Profile>
-        """
-            SYSTEM_PROMPT += profile 
-        model = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
-        model = model.bind_tools(tools)
-
-        response = model.invoke(
-            [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                *state["messages"]
-            ]
-        )
+        SYSTEM_PROMPT = Node.system_prompt(configurable["user_id"])
+        model = ModelRegistry.with_tools(tools)
+
+        with span("agent.context"):
+            prepared = CONTEXT.prepare(state, SYSTEM_PROMPT, Node.conversation(configurable))
+        with span("agent.llm"):
+            response = model.invoke(prepared)
+        CONTEXT.record("agent", prepared, response)
         return {"messages": [response]}
 
     @entrypoint(store=STORE)
@@ -127,161 +130,124 @@ Your mission is to drive intelligent, ethical, and impactful conversations that
         print("---GENERATE---")
         messages = state["messages"]
         configurable = get_config()["configurable"]
-        results = STORE.search(
-            ("users", configurable["user_id"], "profile")
-        )
-        profile= None
-        SYSTEM_PROMPT = """You are **Asha**, an AI chatbot developed for the **JobsForHer Foundation**, empowering women in their professional journeys. Your goal is to provide accurate, ethical, and context-aware assistance focused on careers, job listings, community events, mentorship programs, and professional networking.  
-
-You have access to these tools:
-- `vectorstore_retriever_tool` for platform-specific info (events, sessions, mentorships).
-- `publicapi_retriever_tool` for live job listings from public APIs.
-- `career_guidance_tool` for career advice sourced from the web.
-- `current_events_tool` for current event information relevant to professional development.
-- `update_user_profile_tool` for updating user profiles with feedback, preferred jobs, locations, and work modes.
+        # Structured answers only apply when the turn produced a single tool result
+        results = []
+        for message in reversed(messages):
+            if not isinstance(message, ToolMessage):
+                break
+            results.append(message)
+        if len(results) == 1 and messages[-1].name in Node.STRUCTURED_OUTPUTS:
+            schema, field = Node.STRUCTURED_OUTPUTS[messages[-1].name]
+            artifact = getattr(messages[-1], "artifact", None)
+            if isinstance(artifact, dict):
+                # Artifacts restored from a checkpoint come back as plain dicts
+                artifact = schema.model_validate(artifact)
+            if isinstance(artifact, schema):
+                # The tool already returned the typed payload, so it goes to the client without another model call.
+                # An empty payload would render as "[]"; the tool's own message (no matches, catalog not ready) is sent instead.
+                mark("generate.direct")
+                content = getattr(artifact, field) or messages[-1].content
+                return {"messages": [AIMessage(content=str(content), additional_kwargs={}, response_metadata={'prompt_feedback': {'block_reason': 0, 'safety_ratings': []}, 'finish_reason': 'STOP', 'model_name': 'gemini-2.0-flash', 'safety_ratings': []})]}
+            structured_model = ModelRegistry.structured(schema)
+            prepared = CONTEXT.prepare(state, "You are a helpful assistant.", Node.conversation(configurable))
+            with span("generate.llm", mode="structured"):
+                response = structured_model.invoke(prepared)
+            CONTEXT.record("generate", prepared)
+            if schema is CareerResponse:
+                print("CAREER RESPONSE", response)
+            return {"messages": [AIMessage(content=str(getattr(response, field)), additional_kwargs={}, response_metadata={'prompt_feedback': {'block_reason': 0, 'safety_ratings': []}, 'finish_reason': 'STOP', 'model_name': 'gemini-2.0-flash', 'safety_ratings': []})]}
+
+        SYSTEM_PROMPT = Node.system_prompt(configurable["user_id"])
+        model = ModelRegistry.chat()
+        prepared = CONTEXT.prepare(state, SYSTEM_PROMPT, Node.conversation(configurable))
+        with span("generate.llm", mode="text"):
+            response = model.invoke(prepared)
+        CONTEXT.record("generate", prepared, response)
+        return {"messages": [response]}
 
-**Guidelines:**  
-- **Context-Awareness:** Handle multi-turn conversations coherently, using non-personalized session data.  
-- **Tool Usage:** Select tools smartly based on user needs to fetch real-time, verified information.  
-- **Bias Detection:** Identify and gently correct gender-biased queries. Maintain inclusive, respectful, and empowering language at all times.  
-- **Content Relevance:** Ensure discussions stay within JobsForHer’s domains (career growth, jobs, events, mentorship, networking). Redirect gently if a query is out of scope.  
-- **Privacy & Security:** Never request or retain personal sensitive data. Comply with ethical AI standards.  
-- **Fallback & Feedback:** If unsure, offer alternative suggestions or escalate to human support. Accept user feedback for continuous improvement.
+    def tools(state):
+        """
+        Runs every tool call of the agent's last message concurrently (see ToolRunner)
 
-**Tone:** Professional, friendly, empathetic, encouraging, always positive toward women’s professional growth.  
+        Args:
+            state (messages): The current state
 
-Your mission is to drive intelligent, ethical, and impactful conversations that enable women to thrive professionally.
-"""
-        if results:
-            profile = f"""\n<User Profile>:
-        {results[0].value}
-        </User Profile>
-        """ 
-            SYSTEM_PROMPT += profile
-        model = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
-        if messages[-1].name == "publicapi_retriever_tool":
-            structured_model = model.with_structured_output(JobResponseList)
-            response = structured_model.invoke(
-                [
-                    {"role": "system", "content": f"You are a helpful assistant."},
-                    *state["messages"],
-                ]
-            )
-            return {"messages": [AIMessage(content=str(response.jobs), additional_kwargs={}, response_metadata={'prompt_feedback': {'block_reason': 0, 'safety_ratings': []}, 'finish_reason': 'STOP', 'model_name': 'gemini-2.0-flash', 'safety_ratings': []})]}
-        elif messages[-1].name == "career_guidance_tool":
-            structured_model = model.with_structured_output(CareerResponse)
-            response = structured_model.invoke(
-                [
-                    {"role": "system", "content": f"You are a helpful assistant."},
-                    *state["messages"],
-                ]
-            )
-            print("CAREER RESPONSE", response)
-            return {"messages": [AIMessage(content=str(response.learning_path), additional_kwargs={}, response_metadata={'prompt_feedback': {'block_reason': 0, 'safety_ratings': []}, 'finish_reason': 'STOP', 'model_name': 'gemini-2.0-flash', 'safety_ratings': []})]}
-        elif messages[-1].name == "current_events_tool":
-            structured_model = model.with_structured_output(CurrentEvents)
-            response = structured_model.invoke(
-                [
-                    {"role": "system", "content": f"You are a helpful assistant."},
-                    *state["messages"],
-                ]
-            )
-            return {"messages": [AIMessage(content=str(response.events), additional_kwargs={}, response_metadata={'prompt_feedback': {'block_reason': 0, 'safety_ratings': []}, 'finish_reason': 'STOP', 'model_name': 'gemini-2.0-flash', 'safety_ratings': []})]}
-        
-        response = model.invoke(
-            [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                *state["messages"],
-            ]
-        )
-        return {"messages": [response]}
+        Returns:
+            messages: The updated state with one ToolMessage per tool call, in call order
+        """
+        return {"messages": TOOL_RUNNER.run(state, state["messages"][-1].tool_calls)}
 
-    def publicapi_retrieve(state):
+    def publicapi_retrieve(state, tool_call):
         """
-        Generate answer
+        Fetch HerKey jobs
 
         Args:
             state (messages): The current state
+            tool_call: The publicapi_retriever_tool call to answer
 
         Returns:
-            messages: The updated state with the response
+            ToolMessage: The tool response, carrying the JobResponseList artifact
         """
-        messages = state["messages"][-1]
-        function_called = messages.additional_kwargs["function_call"]
-        function_name = function_called["name"]
-        function_args = json.loads(function_called["arguments"])
+        function_args = tool_call["args"]
         input_params = {
             "work_mode": function_args.get("work_mode"),
             "job_type": function_args.get("job_type"),
             "keyword": function_args.get("keyword")
         }
+        # Invoking with the tool call returns a ToolMessage that carries the artifact
+        return publicapi_retriever_tool.invoke({**tool_call, "args": input_params})
 
-        response = publicapi_retriever_tool.invoke(input=input_params)
-        return {"messages": [ToolMessage(content=response, name=function_name, tool_call_id = messages.tool_calls[0]['id'])]}
-
-    def vector_store_retrieve(state):
+    def vector_store_retrieve(state, tool_call):
         """
-        Generate answer
+        Search the job vector store
 
         Args:
             state (messages): The current state
+            tool_call: The vectorstore_retriever_tool call to answer
 
         Returns:
-            messages: The updated state with the response
+            ToolMessage: The tool response
         """
-        messages = state["messages"][-1]
-        function_called = messages.additional_kwargs["function_call"]
-        function_name = function_called["name"]
-        function_args = json.loads(function_called["arguments"])
-        if "query" in function_args:
-            response = vectorstore_retriever_tool.invoke(input={"query": function_args["query"]})
-        return {"messages": [ToolMessage(content=response, name=function_name, tool_call_id = messages.tool_calls[0]['id'])]}
+        return vectorstore_retriever_tool.invoke({**tool_call, "args": {k: v for k, v in tool_call["args"].items() if v not in (None, "")}})
     
-    def career_guidance(state):
+    def career_guidance(state, tool_call):
         """
         Generate career guidance
 
         Args:
             state (messages): The current state
+            tool_call: The career_guidance_tool call to answer
 
         Returns:
-            messages: The updated state with the response
+            ToolMessage: The tool response
         """
-        messages = state["messages"][-1]
-        function_called = messages.additional_kwargs["function_call"]
-        function_name = function_called["name"]
-        function_args = json.loads(function_called["arguments"])
-        if "query" in function_args:
-            res = career_guidance_tool.invoke(input={"query": function_args["query"]})
-        return {"messages": [ToolMessage(content=res, name=function_name, tool_call_id = messages.tool_calls[0]['id'])]}
+        return career_guidance_tool.invoke({**tool_call, "args": {"query": tool_call["args"]["query"]}})
     
-    def current_events(state):
+    def current_events(state, tool_call):
         """
-        Generate answer
+        Fetch HerKey events
 
         Args:
             state (messages): The current state
+            tool_call: The current_events_tool call to answer
 
         Returns:
-            messages: The updated state with the response
+            ToolMessage: The tool response, carrying the CurrentEvents artifact
         """
-        messages = state["messages"][-1]
-        function_called = messages.additional_kwargs["function_call"]
-        function_name = function_called["name"]
-        response = current_events_tool.invoke(input={})
-        return {"messages": [ToolMessage(content=response, name=function_name, tool_call_id = messages.tool_calls[0]['id'])]}
+        filters = {k: v for k, v in tool_call["args"].items() if v not in (None, "")}
+        return current_events_tool.invoke({**tool_call, "args": filters})
     
-    def update_user_profile(state):
+    def update_user_profile(state, tool_call):
         """
-        Update user profile
+        Queue a user profile update
 
         Args:
             state (messages): The current state
+            tool_call: The update_user_profile_tool call to answer
 
         Returns:
-            messages: The updated state with the response
+            ToolMessage: Acknowledges the update; the extraction runs in the background
         """
-        messages = state["messages"][-1]
         conversation = []
         for msg in state["messages"]:
             if isinstance(msg, HumanMessage):
@@ -290,8 +256,29 @@ Your mission is to drive intelligent, ethical, and impactful conversations that
                 role = "assistant"
             else:
                 role = "system"
-            conversation.append({"role": role, "content": msg.content})
-        function_called = messages.additional_kwargs["function_call"]
-        function_name = function_called["name"]
-        res = manager.invoke({"messages": conversation})
-        return {"messages": [ToolMessage(content=res, name=function_name, tool_call_id = messages.tool_calls[0]['id'])]}
\ No newline at end of file
+            conversation.append({"role": role, "content": msg.content, "id": msg.id})
+        configurable = get_config()["configurable"]
+        queued = PROFILE_UPDATES.submit(configurable["user_id"], configurable.get("thread_id", ""), conversation)
+        res = "User profile update queued." if queued else "User profile update skipped; please try again shortly."
+        return ToolMessage(content=res, name=tool_call["name"], tool_call_id=tool_call["id"])
+
+Node.TOOL_HANDLERS = {
+    "publicapi_retriever_tool": Node.publicapi_retrieve,
+    "vectorstore_retriever_tool": Node.vector_store_retrieve,
+    "career_guidance_tool": Node.career_guidance,
+    "current_events_tool": Node.current_events,
+    "update_user_profile_tool": Node.update_user_profile,
+}
+# Tool calls of one agent turn run concurrently; the HerKey scraper waits up to 30s for a page
+TOOL_RUNNER = ToolRunner(
+    Node.TOOL_HANDLERS,
+    timeout=float(os.getenv("TOOL_TIMEOUT_SECONDS", "45")),
+    timeouts={"publicapi_retriever_tool": 90.0, **json.loads(os.getenv("TOOL_TIMEOUTS", "{}"))},
+    side_effects=Node.SIDE_EFFECT_TOOLS,
+    workers=int(os.getenv("TOOL_CONCURRENCY", "8")),
+)
+
+# Build the runnables the nodes use at import, so the first turn does not pay for them either
+ModelRegistry.with_tools(tools)
+for schema, _ in Node.STRUCTURED_OUTPUTS.values():
+    ModelRegistry.structured(schema)
@@ -0,0 +1,251 @@
+import hashlib
+import ipaddress
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# Tier modes per entity:
+#   "auto"        - the pattern tier screens the text; the transformer runs only if it flags something
+#   "pattern"     - the pattern tier's spans are final and the transformer never sees this entity
+#   "transformer" - always analyzed by the transformer pipeline (the pre-tiering behaviour)
+TIER_MODES = ("auto", "pattern", "transformer")
+
+
+@dataclass
+class Candidate:
+    entity_type: str
+    start: int
+    end: int
+    score: float
+
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"(?<![\w.])\+?\(?\d[\d\s().-]{5,18}\d(?![\w.])")
+IPV4_RE = re.compile(r"(?<![\w.])(?:\d{1,3}\.){3}\d{1,3}(?![\w.])")
+IPV6_RE = re.compile(r"(?<![\w:])[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){2,7}(?![\w:])")
+BTC_BASE58_RE = re.compile(r"\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b")
+BTC_BECH32_RE = re.compile(r"\b(?:bc1|BC1)[02-9ac-hj-np-zAC-HJ-NP-Z]{11,71}\b")
+# Digit-bearing tokens such as PAN, Aadhaar, passport or employee IDs
+ID_RE = re.compile(r"(?<!\w)(?=[A-Za-z0-9-]*\d)[A-Za-z0-9][A-Za-z0-9-]{5,}(?!\w)")
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z'\-]*")
+INTRO_RE = re.compile(r"\b(?:my name is|i am|i'm|im|this is|call me|name\s*:)\s+([A-Za-z][A-Za-z'\-]*)", re.IGNORECASE)
+
+_BASE58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BECH32 = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+
+# Capitalized words that show up in job-search queries but are not names. Anything not
+# listed here keeps the PERSON check "open" and sends the text to the transformer.
+NON_NAME_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your yours yourself yourselves hi hello hey
+thanks thank please help show find get give list tell search looking look want need like suggest recommend
+any new latest current upcoming near nearby best top good remote hybrid onsite on-site office home online
+offline virtual free paid part-time full-time part full time internship internships intern job jobs role roles
+position positions opening openings vacancy vacancies career careers work working company companies startup
+startups event events webinar webinars session sessions workshop workshops meetup conference mentor mentors
+mentorship program programs programme course courses learning path roadmap guidance advice resume cv interview
+interviews salary skills skill experience fresher freshers returnee returnees restart women woman female
+engineer engineers engineering developer developers development data science scientist scientists analyst
+analysts analytics manager managers management product project marketing sales finance hr human resources
+designer design content writer writing teacher teaching consultant consulting operations support customer
+business software hardware cloud devops security frontend backend full-stack fullstack stack web mobile app
+apps machine deep ai ml nlp python java javascript typescript react angular node sql excel tableau power bi
+aws azure gcp docker kubernetes c go rust ruby php swift kotlin android ios linux senior junior lead principal
+associate head director intern entry level mid india bangalore bengaluru mumbai delhi pune hyderabad chennai
+kolkata noida gurgaon gurugram ahmedabad jaipur kochi usa us uk london singapore dubai january february march
+april may june july august september october november december monday tuesday wednesday thursday friday
+saturday sunday today tomorrow week month year years yr yrs interested seeking searching trying planning
+returning currently also back not really able going
+""".split())
+
+
+def _base58check_valid(address: str) -> bool:
+    num = 0
+    for ch in address:
+        num = num * 58 + _BASE58.index(ch)
+    pad = len(address) - len(address.lstrip("1"))
+    raw = b"\x00" * pad + num.to_bytes((num.bit_length() + 7) // 8, "big")
+    if len(raw) < 5:
+        return False
+    payload, checksum = raw[:-4], raw[-4:]
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] == checksum
+
+
+def _bech32_valid(address: str) -> bool:
+    address = address.lower()
+    hrp, data = address[:2], address[3:]
+    values = [_BECH32.index(ch) for ch in data]
+    generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+    chk = 1
+    for v in [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp] + values:
+        top = chk >> 25
+        chk = (chk & 0x1ffffff) << 5 ^ v
+        for i in range(5):
+            chk ^= generator[i] if ((top >> i) & 1) else 0
+    # 1 for bech32 (segwit v0), 0x2bc830a3 for bech32m (taproot)
+    return chk in (1, 0x2bc830a3)
+
+
+def find_emails(text: str) -> List[Candidate]:
+    return [Candidate("EMAIL_ADDRESS", m.start(), m.end(), 1.0) for m in EMAIL_RE.finditer(text)]
+
+
+def find_phone_numbers(text: str) -> List[Candidate]:
+    candidates = []
+    for m in PHONE_RE.finditer(text):
+        digits = re.sub(r"\D", "", m.group())
+        if 8 <= len(digits) <= 15 and not IPV4_RE.fullmatch(m.group()):
+            candidates.append(Candidate("PHONE_NUMBER", m.start(), m.end(), 0.7))
+    return candidates
+
+
+def find_ip_addresses(text: str) -> List[Candidate]:
+    candidates = []
+    for m in list(IPV4_RE.finditer(text)) + list(IPV6_RE.finditer(text)):
+        try:
+            ipaddress.ip_address(m.group())
+        except ValueError:
+            continue
+        candidates.append(Candidate("IP_ADDRESS", m.start(), m.end(), 0.95))
+    return candidates
+
+
+def find_crypto(text: str) -> List[Candidate]:
+    candidates = []
+    for m in BTC_BASE58_RE.finditer(text):
+        if _base58check_valid(m.group()):
+            candidates.append(Candidate("CRYPTO", m.start(), m.end(), 1.0))
+    for m in BTC_BECH32_RE.finditer(text):
+        if _bech32_valid(m.group()):
+            candidates.append(Candidate("CRYPTO", m.start(), m.end(), 1.0))
+    return candidates
+
+
+def find_ids(text: str) -> List[Candidate]:
+    return [
+        Candidate("ID", m.start(), m.end(), 0.4)
+        for m in ID_RE.finditer(text)
+        if sum(ch.isdigit() for ch in m.group()) >= 4
+    ]
+
+
+def find_possible_names(text: str) -> List[Candidate]:
+    """
+    Cheap PERSON screen. It cannot confirm a name, only fail to rule one out: any capitalized
+    word outside NON_NAME_WORDS, or any word following an introduction such as "my name is",
+    is returned as a low-score candidate for the transformer to decide on.
+    """
+    candidates = []
+    for m in WORD_RE.finditer(text):
+        word = m.group()
+        if not word[0].isupper() or word.lower() in NON_NAME_WORDS:
+            continue
+        if word.isupper() and len(word) <= 5:  # acronyms like SQL, UI/UX, HR
+            continue
+        candidates.append(Candidate("PERSON", m.start(), m.end(), 0.3))
+    for m in INTRO_RE.finditer(text):
+        if m.group(1).lower() not in NON_NAME_WORDS:
+            candidates.append(Candidate("PERSON", m.start(1), m.end(1), 0.3))
+    return candidates
+
+
+PATTERN_RECOGNIZERS: Dict[str, Callable[[str], List[Candidate]]] = {
+    "EMAIL_ADDRESS": find_emails,
+    "PHONE_NUMBER": find_phone_numbers,
+    "IP_ADDRESS": find_ip_addresses,
+    "CRYPTO": find_crypto,
+    "ID": find_ids,
+    "PERSON": find_possible_names,
+}
+
+
+class TieredPIIDetector:
+    """
+    Two-tier PII detection.
+
+    Tier one runs the compiled regex/checksum recognizers above. The transformer analyzer
+    (tier two) is only called when tier one finds candidate spans or cannot rule out a name. Queries like "show me remote jobs" therefore
+    never touch the NER model.
+
+    Args:
+        entities: Entity types to detect.
+        analyzer_provider: Zero-argument callable returning the presidio AnalyzerEngine, so the
+            model is only loaded once something actually needs it.
+        entity_tiers: Optional per-entity overrides of the tier mode (see TIER_MODES).
+        score_threshold: Passed through to the analyzer and applied to pattern-tier spans.
+    """
+    def __init__(
+            self,
+            entities: List[str],
+            analyzer_provider: Callable[[], object],
+            entity_tiers: Optional[Dict[str, str]] = None,
+            score_threshold: Optional[float] = None,
+            ):
+        self.entities = list(entities)
+        self.analyzer_provider = analyzer_provider
+        self.score_threshold = score_threshold
+        self.entity_tiers = {entity: "auto" for entity in self.entities}
+        for entity, mode in (entity_tiers or {}).items():
+            if mode not in TIER_MODES:
+                raise ValueError(f"Unknown tier mode '{mode}' for {entity}, expected one of {TIER_MODES}")
+            self.entity_tiers[entity] = mode
+        for entity, mode in self.entity_tiers.items():
+            if mode == "pattern" and entity not in PATTERN_RECOGNIZERS:
+                raise ValueError(f"No pattern recognizer for {entity}; use 'auto' or 'transformer'")
+        self.stats = {"screened": 0, "escalated": 0}
+
+    def screen(self, text: str) -> Dict[str, List[Candidate]]:
+        """Runs tier one and returns the candidate spans per entity type."""
+        found = {}
+        for entity in self.entities:
+            if self.entity_tiers[entity] == "transformer" or entity not in PATTERN_RECOGNIZERS:
+                continue
+            spans = PATTERN_RECOGNIZERS[entity](text)
+            if spans:
+                found[entity] = spans
+        return found
+
+    def transformer_entities(self, candidates: Dict[str, List[Candidate]]) -> List[str]:
+        """
+        Entity types tier two must analyze, given the tier-one candidates. The NER pass costs
+        the same however many entity types it reports, so once the text is escalated every
+        non-"pattern" entity is analyzed.
+        """
+        deferred = [entity for entity in self.entities if self.entity_tiers[entity] != "pattern"]
+        needs_model = any(
+            self.entity_tiers[entity] == "transformer"
+            or entity in candidates
+            or entity not in PATTERN_RECOGNIZERS
+            for entity in deferred
+        )
+        return deferred if needs_model else []
+
+    def may_contain_pii(self, text: str) -> bool:
+        """
+        False only when tier one rules PII out: no candidate spans and no entity left for the
+        transformer. The analyzer would then return nothing, so the text is already PII-free.
+        """
+        candidates = self.screen(text)
+        return bool(candidates) or bool(self.transformer_entities(candidates))
+
+    def analyze(self, text: str) -> list:
+        from presidio_analyzer import RecognizerResult
+
+        candidates = self.screen(text)
+        self.stats["screened"] += 1
+        results = [
+            RecognizerResult(c.entity_type, c.start, c.end, c.score)
+            for entity, spans in candidates.items() if self.entity_tiers[entity] == "pattern"
+            for c in spans
+            if self.score_threshold is None or c.score >= self.score_threshold
+        ]
+        escalate = self.transformer_entities(candidates)
+        if escalate:
+            self.stats["escalated"] += 1
+            kwargs = {"score_threshold": self.score_threshold} if self.score_threshold is not None else {}
+            results += self.analyzer_provider().analyze(text=text, language='en', entities=escalate, **kwargs)
+        return results
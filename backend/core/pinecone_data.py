@@ -1,7 +1,6 @@
 import os
-from pinecone import Pinecone, ServerlessSpec
+from pinecone import Pinecone
 import google.generativeai as genai
-from uuid import uuid4
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,21 +21,16 @@ def get_gemini_embedding(text: str) -> list:
     )
     return response['embedding']
 
-index_name = "jobs-index"
-
-if index_name in pc.list_indexes().names():
-    print("delete")
-    pc.delete_index(index_name)
-
-if index_name not in pc.list_indexes().names():
-    pc.create_index(
-        name=index_name,
-        dimension=768,
-        metric="cosine",
-        spec=ServerlessSpec(cloud='aws', region='us-east-1')  # adjust as needed
+def get_gemini_embeddings(texts: list) -> list:
+    """Embeds several texts in one batchEmbedContents request (at most 100 per call)."""
+    response = genai.embed_content(
+        model="models/embedding-001",
+        content=list(texts),
+        task_type="RETRIEVAL_DOCUMENT"
     )
+    return response['embedding']
 
-index = pc.Index(index_name)
+index_name = "jobs-index"
 
 sample_jobs = [
     {
@@ -57,11 +51,19 @@ sample_jobs = [
     }
 ]
 
-for job in sample_jobs:
-    text = f"{job['title']} at {job['company']}, {job['location']}, Mode: {job['work_mode']}, Experience: {job['experience']}, Skills: {job['skills']}"
-    embedding = get_gemini_embedding(text)
-    vector_id = str(uuid4())
-    print(text)
-    metadata = job.copy()
-    metadata["text"] = text
-    index.upsert(vectors=[{"id": vector_id, "values": embedding, "metadata": metadata}])
+
+def seed_sample_jobs():
+    """
+    Ingests sample_jobs through the same path as api/fetch.py (job text, content hashes,
+    embedding cache, job corpus) into the configured vector backend, jobs-index by default.
+    IDs are job fingerprints, so re-running this overwrites the same vectors instead of
+    adding duplicates, and unchanged jobs are skipped.
+    Run from the backend directory with `python -m core.pinecone_data`.
+    """
+    from api.fetch import store_jobs_in_pinecone
+
+    store_jobs_in_pinecone(sample_jobs)
+
+
+if __name__ == "__main__":
+    seed_sample_jobs()
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from core.cache import TTLCache
+
+PROFILE_BLOCK = """\n<User Profile>:
+        {profile}
+        </User Profile>
+        """
+
+
+def profile_namespace(user_id: str) -> tuple:
+    return ("users", user_id, "profile")
+
+
+def offset_namespace(user_id: str) -> tuple:
+    return ("profile_extraction", user_id)
+
+
+class ProfileCache:
+    """
+    Rendered <User Profile> prompt blocks, cached per user.
+
+    Node.agent and Node.generate both need the block on every turn; with the cache the store
+    is searched and the block formatted once per profile change instead of twice per turn.
+    Users without a profile are cached too, as an empty block. Whoever writes a profile
+    calls refresh() (or invalidate()). Another worker's write is seen once this cache's TTL
+    and then the store's hot cache TTL have passed, so the two TTLs add up.
+
+    Args:
+        store: The BaseStore holding profiles under ("users", user_id, "profile").
+        cache: TTLCache holding the blocks; by default a "profile_blocks" cache sized by PROFILE_CACHE_SIZE.
+    """
+    def __init__(self, store, cache: Optional[TTLCache] = None):
+        self.store = store
+        self.cache = cache if cache is not None else TTLCache(
+            maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "4096")),
+            ttl=float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300")),
+            name="profile_blocks",
+        )
+
+    def _render(self, user_id: str) -> str:
+        results = self.store.search(profile_namespace(user_id))
+        return PROFILE_BLOCK.format(profile=results[0].value) if results else ""
+
+    def block(self, user_id: str) -> str:
+        """The user's profile block, or "" when no profile is stored."""
+        block = self.cache.get(user_id)
+        if block is None:
+            block = self._render(user_id)
+            self.cache.set(user_id, block)
+        return block
+
+    def invalidate(self, user_id: str):
+        self.cache.invalidate(user_id)
+
+    def refresh(self, user_id: str) -> str:
+        """Re-reads the profile after a write, so the next turn starts from a warm cache."""
+        block = self._render(user_id)
+        self.cache.set(user_id, block)
+        return block
+
+
+class ProfileExtractionQueue:
+    """
+    Runs profile extraction in the background, off the chat's critical path.
+
+    submit() records the latest conversation of a (user, thread) and returns at once.
+    Submissions for the same pair within the debounce window coalesce into one extraction,
+    which runs on a worker pool and only receives the messages after the last one the
+    previous extraction of that thread saw; the extractor merges them into the stored
+    profile. At most one extraction per pair runs at a time, and on_done(user_id) is called
+    after each one.
+
+    The id of the last extracted message is kept in the store under
+    ("profile_extraction", user_id), keyed by thread, so it survives restarts and is shared
+    by every worker. If that message is no longer in the conversation (the thread was rolled
+    back past it), the whole conversation is sent again.
+
+    Args:
+        extract: Callable(messages, config) that updates the profile, e.g. a langmem manager's invoke.
+        store: BaseStore holding the extraction offsets; an InMemoryStore if None.
+        on_done: Callable(user_id) run after a successful extraction, e.g. ProfileCache.refresh.
+        debounce: Seconds from the first submission of a pair until its extraction runs.
+        workers: Concurrent extractions.
+        max_pending: Pairs that can wait at once; further submissions for new pairs are dropped.
+    """
+    def __init__(self, extract, store=None, on_done=None, debounce: float = 10.0, workers: int = 2, max_pending: int = 1000):
+        if store is None:
+            from langgraph.store.memory import InMemoryStore
+            store = InMemoryStore()
+        self.extract = extract
+        self.store = store
+        self.on_done = on_done
+        self.debounce = debounce
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile-extract")
+        self._pending: Dict[Tuple[str, str], Tuple[float, List[dict]]] = {}
+        self._running = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"submitted": 0, "coalesced": 0, "dropped": 0, "extractions": 0, "failures": 0, "messages_sent": 0}
+
+    def submit(self, user_id: str, thread_id: str, messages: List[dict]) -> bool:
+        """
+        Queues the conversation (message dicts with role, content and the message id) for
+        extraction; returns False if it was dropped under backpressure.
+        """
+        key = (user_id, thread_id)
+        with self._cond:
+            self.stats["submitted"] += 1
+            if key in self._pending:
+                self.stats["coalesced"] += 1
+                due = self._pending[key][0]
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+            else:
+                due = time.monotonic() + self.debounce
+            self._pending[key] = (due, list(messages))
+            self._cond.notify()
+        return True
+
+    def _start(self, user_id: str, thread_id: str, messages: List[dict]) -> int:
+        """Index of the first message after the last extracted one; 0 if it is unknown or no longer in the thread."""
+        item = self.store.get(offset_namespace(user_id), thread_id)
+        last_id = item.value.get("last_message_id") if item else None
+        if last_id is not None:
+            for i, message in enumerate(messages):
+                if message.get("id") == last_id:
+                    return i + 1
+        return 0
+
+    def _due(self, flush: bool = False) -> List[Tuple[Tuple[str, str], List[dict]]]:
+        now = time.monotonic()
+        ready = [key for key, (due, _) in self._pending.items() if (flush or due <= now) and key not in self._running]
+        batch = []
+        for key in ready:
+            batch.append((key, self._pending.pop(key)[1]))
+            self._running.add(key)
+        return batch
+
+    def _extract(self, key: Tuple[str, str], messages: List[dict]):
+        user_id, thread_id = key
+        try:
+            new_messages = messages[self._start(user_id, thread_id, messages):]
+            if new_messages:
+                self.extract(new_messages, {"configurable": {"user_id": user_id, "thread_id": thread_id}})
+                self.store.put(offset_namespace(user_id), thread_id, {"last_message_id": messages[-1].get("id")})
+                self.stats["extractions"] += 1
+                self.stats["messages_sent"] += len(new_messages)
+                if self.on_done is not None:
+                    self.on_done(user_id)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"Profile extraction failed for {user_id}: {e}")
+        finally:
+            with self._cond:
+                self._running.discard(key)
+                self._cond.notify()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                batch = self._due()
+                if not batch:
+                    waits = [due - time.monotonic() for key, (due, _) in self._pending.items() if key not in self._running]
+                    self._cond.wait(timeout=max(0.05, min(waits)) if waits else None)
+                    continue
+            for key, messages in batch:
+                self._executor.submit(self._extract, key, messages)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Runs every pending extraction now and waits for the workers; used on shutdown."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._running:
+                for key, messages in self._due(flush=True):
+                    self._executor.submit(self._extract, key, messages)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(timeout=0.1 if remaining is None else min(0.1, remaining))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="profile-extraction", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True):
+        if flush:
+            self.flush(timeout=30)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
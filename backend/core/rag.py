@@ -11,12 +11,37 @@ from pinecone import Pinecone
 from dotenv import load_dotenv
 from langchain_community.vectorstores import Pinecone as LangchainPinecone
 from langchain_pinecone import PineconeVectorStore
+from core.retrieval import CachedEmbeddings
 
 load_dotenv()
 
+VECTOR_BACKENDS = ("pinecone", "faiss")
+
 class Rag:
     @staticmethod
-    def create_vectordb_retriever():
+    def create_vectordb_retriever(backend=None, index_path=None):
+        """
+        Builds the job retriever on the configured vector store.
+
+        Args:
+            backend: "pinecone" (remote jobs-index) or "faiss" (local, memory-mapped index
+                built by the ingestion scripts). Defaults to the VECTOR_BACKEND env var, then pinecone.
+            index_path: FAISS index directory, defaults to FAISS_INDEX_PATH.
+        """
+        backend = (backend or os.environ.get("VECTOR_BACKEND", "pinecone")).lower()
+        if backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown VECTOR_BACKEND '{backend}', expected one of {VECTOR_BACKENDS}")
+
+        # Setup embedding model (same as used while populating the index); repeated queries reuse their vector
+        embedding = CachedEmbeddings(GoogleGenerativeAIEmbeddings(model="models/embedding-001"))
+
+        if backend == "faiss":
+            from core.faiss_store import load_vectorstore
+
+            docsearch = load_vectorstore(embedding, index_path)
+            print(f"Loaded FAISS index with {docsearch.index.ntotal} vectors")
+            return docsearch.as_retriever()
+
         # Load environment variables
         # Load credentials
         pinecone_api_key = os.environ.get('PINECONE_API_KEY')
@@ -32,9 +57,6 @@ class Rag:
         # Check if index exists (optional safety)
         if index_name not in pc.list_indexes().names():
             raise ValueError(f"Pinecone index '{index_name}' does not exist")
-        
-        # Setup embedding model (same as used while populating Pinecone)
-        embedding = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
 
         docsearch = PineconeVectorStore(
             index=index,
@@ -43,4 +65,4 @@ class Rag:
             embedding=embedding
         )
 
-        return docsearch.as_retriever()
\ No newline at end of file
+        return docsearch.as_retriever()
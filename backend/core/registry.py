@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, falling back to the peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class AnalyzerEntry:
+    analyzer: object
+    load_seconds: float
+    rss_delta_bytes: int
+    loaded_at: float
+
+
+class AnalyzerRegistry:
+    """
+    Process-wide cache of presidio analyzers, one per (spacy model, transformer model) pair.
+
+    Loading the transformer NER pipeline is the most expensive thing the backend does at
+    startup, so every CustomDetectPII shares the entry for its model pair. Entries load
+    lazily on first use, or up front through warmup().
+    """
+    _entries: Dict[Tuple[str, str], AnalyzerEntry] = {}
+    _anonymizer = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def anonymizer(cls):
+        """The AnonymizerEngine is model-free, so it is shared without loading any analyzer."""
+        if cls._anonymizer is None:
+            from presidio_anonymizer import AnonymizerEngine
+            cls._anonymizer = AnonymizerEngine()
+        return cls._anonymizer
+
+    @classmethod
+    def get(cls, spacy_model_name: str, transformer_model_name: str) -> AnalyzerEntry:
+        key = (spacy_model_name, transformer_model_name)
+        entry = cls._entries.get(key)
+        if entry is not None:
+            return entry
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                entry = cls._load(spacy_model_name, transformer_model_name)
+                cls._entries[key] = entry
+        return entry
+
+    @staticmethod
+    def _load(spacy_model_name: str, transformer_model_name: str) -> AnalyzerEntry:
+        from presidio_analyzer import AnalyzerEngine
+        from presidio_analyzer.nlp_engine import TransformersNlpEngine
+
+        print(f"Loading PII analyzer ({spacy_model_name}, {transformer_model_name})...")
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        model_config = [{"lang_code": "en", "model_name": {
+              "spacy": spacy_model_name,
+              "transformers": transformer_model_name
+            }
+        }]
+        nlp_engine = TransformersNlpEngine(models=model_config)
+        analyzer = AnalyzerEngine(nlp_engine=nlp_engine)
+        entry = AnalyzerEntry(
+            analyzer=analyzer,
+            load_seconds=time.perf_counter() - start,
+            rss_delta_bytes=max(current_rss_bytes() - rss_before, 0),
+            loaded_at=time.time(),
+        )
+        print(f"PII analyzer loaded in {entry.load_seconds:.2f}s (+{entry.rss_delta_bytes / 2**20:.1f} MiB RSS)")
+        return entry
+
+    @classmethod
+    def warmup(cls, pairs: Optional[List[Tuple[str, str]]] = None):
+        """Loads the given model pairs (or the CustomDetectPII defaults) ahead of the first request."""
+        for spacy_model_name, transformer_model_name in pairs or [("en_core_web_sm", "StanfordAIMI/stanford-deidentifier-base")]:
+            cls.get(spacy_model_name, transformer_model_name)
+
+    @classmethod
+    def stats(cls) -> List[Dict]:
+        return [
+            {
+                "spacy_model": spacy_model_name,
+                "transformer_model": transformer_model_name,
+                "load_seconds": round(entry.load_seconds, 3),
+                "rss_delta_bytes": entry.rss_delta_bytes,
+                "loaded_at": entry.loaded_at,
+            }
+            for (spacy_model_name, transformer_model_name), entry in cls._entries.items()
+        ]
+
+
+@dataclass
+class ModelEntry:
+    runnable: object
+    build_seconds: float
+    built_at: float
+    lookups: int = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of Gemini chat clients and the runnables derived from them.
+
+    Each model name gets one ChatGoogleGenerativeAI client, and every tool-bound or
+    structured-output runnable for that model wraps the same client, so they share its
+    HTTP connection pool. Building any of them happens once per process instead of on every
+    turn; stats() reports what was built, how long it took and how often it was reused.
+    """
+    DEFAULT_MODEL = "gemini-2.0-flash"
+    _entries: Dict[Tuple, ModelEntry] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def _get(cls, key: Tuple, build) -> object:
+        entry = cls._entries.get(key)
+        if entry is None:
+            with cls._lock:
+                entry = cls._entries.get(key)
+                if entry is None:
+                    start = time.perf_counter()
+                    runnable = build()
+                    entry = ModelEntry(runnable=runnable, build_seconds=time.perf_counter() - start, built_at=time.time())
+                    cls._entries[key] = entry
+        entry.lookups += 1
+        return entry.runnable
+
+    @classmethod
+    def chat(cls, model: str = DEFAULT_MODEL):
+        def build():
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            return ChatGoogleGenerativeAI(model=model)
+        return cls._get(("chat", model, None), build)
+
+    @classmethod
+    def with_tools(cls, tools: List, model: str = DEFAULT_MODEL):
+        """The client for model with tools bound; keyed on the tool names."""
+        names = tuple(getattr(tool, "name", getattr(tool, "__name__", repr(tool))) for tool in tools)
+        return cls._get(("tools", model, names), lambda: cls.chat(model).bind_tools(tools))
+
+    @classmethod
+    def structured(cls, schema, model: str = DEFAULT_MODEL):
+        """The client for model wrapped by with_structured_output(schema)."""
+        key = ("structured", model, f"{schema.__module__}.{schema.__qualname__}")
+        return cls._get(key, lambda: cls.chat(model).with_structured_output(schema))
+
+    @classmethod
+    def stats(cls) -> List[Dict]:
+        stats = []
+        for key, entry in list(cls._entries.items()):
+            kind, model, variant = key
+            stats.append({
+                "kind": kind,
+                "model": model,
+                "variant": list(variant) if isinstance(variant, tuple) else variant,
+                "build_seconds": round(entry.build_seconds, 4),
+                "lookups": entry.lookups,
+                "built_at": entry.built_at,
+            })
+        return stats
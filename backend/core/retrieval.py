@@ -0,0 +1,370 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.cache import TTLCache
+
+
+def _query_key(text: str) -> str:
+    # Only whitespace and unicode form are folded: case and punctuation ("C++", "C#") can change the embedding
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model with an LRU cache for query embeddings.
+
+    The agent keeps issuing the same few search strings, and each one otherwise costs an
+    embedding API round trip. Document embeddings are passed straight through, since
+    ingestion has its own on-disk cache.
+
+    Args:
+        embeddings: The underlying model, e.g. GoogleGenerativeAIEmbeddings.
+        cache: TTLCache holding the vectors; by default a 1024-entry "query_embeddings" cache.
+    """
+    def __init__(self, embeddings: Embeddings, cache: Optional[TTLCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache if cache is not None else TTLCache(
+            maxsize=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024")), name="query_embeddings"
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        key = _query_key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = _query_key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+
+# --- Structured job filters ---
+
+WORK_MODE_ALIASES = {
+    "remote": "remote", "work from home": "remote", "work-from-home": "remote", "wfh": "remote",
+    "hybrid": "hybrid",
+    "on-site": "onsite", "onsite": "onsite", "on site": "onsite", "work from office": "onsite",
+    "work-from-office": "onsite", "office": "onsite", "in-office": "onsite",
+}
+LOCATION_ALIASES = {
+    "bangalore": "bengaluru", "bengaluru": "bangalore", "gurgaon": "gurugram", "gurugram": "gurgaon",
+    "bombay": "mumbai", "mumbai": "bombay", "madras": "chennai", "chennai": "madras",
+}
+
+
+def normalize_work_mode(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip().lower()
+    if not value or value == "n/a":
+        return None
+    if value in WORK_MODE_ALIASES:
+        return WORK_MODE_ALIASES[value]
+    return next((norm for alias, norm in WORK_MODE_ALIASES.items() if alias in value), value)
+
+
+def location_terms(value: Optional[str]) -> List[str]:
+    """Lower-cased location parts ("Bangalore, IN" -> bangalore, bengaluru, in)."""
+    terms = []
+    for part in re.split(r"[,/|;]", value or ""):
+        part = part.strip().lower()
+        if part and part != "n/a":
+            terms.append(part)
+            if part in LOCATION_ALIASES:
+                terms.append(LOCATION_ALIASES[part])
+    return sorted(set(terms))
+
+
+def parse_experience(value: Optional[str]) -> tuple:
+    """Years range from "1-3 years", "5+ yrs", "2 years" or "Fresher"; (0, None) when unknown."""
+    value = (value or "").strip().lower()
+    if "fresher" in value or "entry" in value:
+        return 0, 1
+    numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", value)]
+    if not numbers:
+        return 0, None
+    if len(numbers) == 1:
+        return numbers[0], None if "+" in value else numbers[0]
+    return min(numbers[:2]), max(numbers[:2])
+
+
+def skill_list(value) -> List[str]:
+    items = value if isinstance(value, list) else re.split(r"[,;|]", value or "")
+    return sorted({item.strip().lower() for item in items if item and item.strip() and item.strip().lower() != "n/a"})
+
+
+def job_filter_fields(job: Dict) -> Dict:
+    """
+    Normalized metadata stored next to each job vector so structured filters can be pushed
+    down into the vector query (Pinecone metadata filters only match exact values).
+    """
+    experience_min, experience_max = parse_experience(job.get("experience"))
+    fields = {
+        "work_mode_norm": normalize_work_mode(job.get("work_mode")) or "unknown",
+        "location_terms": location_terms(job.get("location")),
+        "skills_list": skill_list(job.get("skills")),
+        "experience_min": experience_min,
+    }
+    if experience_max is not None:
+        fields["experience_max"] = experience_max
+    return fields
+
+
+def normalize_filters(work_mode=None, location=None, skills=None, experience_years=None) -> Dict:
+    """Turns the tool's optional arguments into the canonical filter dict used for caching and pushdown."""
+    filters = {}
+    if normalize_work_mode(work_mode):
+        filters["work_mode"] = normalize_work_mode(work_mode)
+    if location and location.strip():
+        filters["location"] = location.strip().lower()
+    if skills:
+        filters["skills"] = skill_list(skills)
+    if experience_years is not None and str(experience_years).strip() != "":
+        filters["experience_years"] = float(experience_years)
+    return filters
+
+
+def pinecone_filter(filters: Dict) -> Optional[Dict]:
+    """Pinecone metadata filter for normalize_filters() output."""
+    clauses = []
+    if "work_mode" in filters:
+        clauses.append({"work_mode_norm": {"$eq": filters["work_mode"]}})
+    if "location" in filters:
+        clauses.append({"location_terms": {"$in": location_terms(filters["location"])}})
+    if filters.get("skills"):
+        clauses.append({"skills_list": {"$in": filters["skills"]}})
+    if "experience_years" in filters:
+        clauses.append({"experience_min": {"$lte": filters["experience_years"]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def metadata_predicate(filters: Dict) -> Callable[[Dict], bool]:
+    """The same filter as pinecone_filter, evaluated locally against a metadata dict."""
+    wanted_locations = set(location_terms(filters.get("location")))
+    wanted_skills = set(filters.get("skills") or [])
+
+    def matches(metadata: Dict) -> bool:
+        if "work_mode" in filters and metadata.get("work_mode_norm") != filters["work_mode"]:
+            return False
+        if wanted_locations and not wanted_locations & set(metadata.get("location_terms") or []):
+            return False
+        if wanted_skills and not wanted_skills & set(metadata.get("skills_list") or []):
+            return False
+        if "experience_years" in filters and metadata.get("experience_min", 0) > filters["experience_years"]:
+            return False
+        return True
+    return matches
+
+
+# --- Lexical index ---
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.rstrip(".") for token in TOKEN_RE.findall((text or "").lower())]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over job titles and skills.
+
+    Args:
+        documents: Job documents; the title is counted twice so title matches outrank skill mentions.
+        k1, b: The usual BM25 saturation and length-normalization parameters.
+    """
+    def __init__(self, documents: Iterable[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for position, doc in enumerate(self.documents):
+            title = doc.metadata.get("title", "")
+            skills = doc.metadata.get("skills", "")
+            terms = Counter(tokenize(title) * 2 + tokenize(skills if isinstance(skills, str) else " ".join(skills)))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings[term].append((position, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int, predicate: Optional[Callable[[Dict], bool]] = None) -> List[Document]:
+        scores = defaultdict(float)
+        n = len(self.documents)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings:
+                norm = 1 - self.b + self.b * self.lengths[position] / (self.avg_length or 1)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        results = []
+        for position in ranked:
+            doc = self.documents[position]
+            if predicate is None or predicate(doc.metadata):
+                results.append(doc)
+                if len(results) == k:
+                    break
+        return results
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or doc.metadata.get("url") or f"{doc.metadata.get('title')}|{doc.metadata.get('company')}"
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, c: int = 60) -> List[Document]:
+    """Merges ranked lists by summing 1 / (c + rank); documents found by both lists rise to the top."""
+    scores, docs = defaultdict(float), {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _doc_key(doc)
+            scores[key] += 1.0 / (c + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+def corpus_document(entry: Dict) -> Document:
+    """A job corpus entry (see MongoDB.get_job_corpus) as a Document with the same ID as its vector."""
+    return Document(id=entry["key"], page_content=entry.get("text", ""), metadata=entry.get("metadata", {}))
+
+
+class JobSearch:
+    """
+    Front for the job retriever: structured filters, hybrid ranking and a short-lived result cache.
+
+    Filters (see normalize_filters) are pushed down into the vector query, as a Pinecone
+    metadata filter or a FAISS metadata predicate. With hybrid on, a BM25 index over job
+    titles and skills is searched with the same filters and fused with the vector ranking
+    by reciprocal rank, so exact title and skill matches are not lost to near neighbours.
+
+    The BM25 corpus comes from the records the ingestion job writes next to the vectors
+    (MongoDB.upsert_job_corpus), not from the vector index. A background thread loads it,
+    then polls every refresh_interval seconds for entries changed since the last poll and
+    rebuilds the index when there are any, so newly ingested jobs show up without a restart.
+    Until the first load finishes searches are vector-only.
+
+    Results are keyed on (query, k, filters), so a repeated search within ttl seconds skips
+    both the query embedding and the vector lookup. Set ttl to 0 to disable the result cache.
+
+    Args:
+        retriever: The vector-store retriever from Rag.create_vectordb_retriever.
+        ttl: Seconds a result list stays cached.
+        maxsize: Maximum number of cached result lists.
+        hybrid: Fuse BM25 results with the vector results; needs corpus.
+        candidates: How many results each ranker contributes per requested result.
+        corpus: Callable(updated_after) returning job corpus entries changed after that
+            datetime (all of them for None), e.g. MongoDB.get_job_corpus.
+        refresh_interval: Seconds between polls of the corpus.
+    """
+    def __init__(
+            self,
+            retriever,
+            ttl: float = 60,
+            maxsize: int = 256,
+            hybrid: bool = True,
+            candidates: int = 3,
+            corpus: Optional[Callable] = None,
+            refresh_interval: float = 300,
+            ):
+        self.retriever = retriever
+        self.vectorstore = retriever.vectorstore
+        self.default_k = retriever.search_kwargs.get("k", 4)
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, name="retrieval_results") if ttl > 0 else None
+        self.candidates = candidates
+        self.corpus = corpus
+        self.refresh_interval = refresh_interval
+        self.lexical: Optional[BM25Index] = None
+        self._documents: Dict[str, Document] = {}
+        self._seen: Dict[str, datetime] = {}
+        self._synced_until: Optional[datetime] = None
+        self._stop = threading.Event()
+        if hybrid and corpus is not None:
+            threading.Thread(target=self._run, name="bm25-sync", daemon=True).start()
+
+    def refresh_lexical(self) -> int:
+        """Merges corpus entries changed since the last call and rebuilds BM25 if there were any; returns how many."""
+        # The poll overlaps the previous one, so entries of a bulk write that was still running then are not missed
+        since = self._synced_until - timedelta(seconds=60) if self._synced_until else None
+        changed = [entry for entry in self.corpus(since) if self._seen.get(entry["key"]) != entry["updated_at"]]
+        if not changed and self.lexical is not None:
+            return 0
+        for entry in changed:
+            self._documents[entry["key"]] = corpus_document(entry)
+            self._seen[entry["key"]] = entry["updated_at"]
+            self._synced_until = max(self._synced_until or entry["updated_at"], entry["updated_at"])
+        self.lexical = BM25Index(self._documents.values())
+        if self.cache is not None and changed:
+            self.cache.clear()
+        print(f"BM25 index built over {len(self.lexical)} jobs ({len(changed)} new or changed)")
+        return len(changed)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_lexical()
+            except Exception as e:
+                print(f"Refreshing the BM25 index failed, {'keeping the previous one' if self.lexical else 'searches stay vector-only'}: {e}")
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+    def _vector_search(self, query: str, k: int, filters: Dict) -> List[Document]:
+        if not filters:
+            return self.vectorstore.similarity_search(query, k=k)
+        if getattr(self.vectorstore, "docstore", None) is not None:
+            # FAISS filters after the ANN lookup, so look further ahead for filtered searches
+            return self.vectorstore.similarity_search(
+                query, k=k, filter=metadata_predicate(filters), fetch_k=max(50 * k, 200)
+            )
+        return self.vectorstore.similarity_search(query, k=k, filter=pinecone_filter(filters))
+
+    def search(self, query: str, k: Optional[int] = None, filters: Optional[Dict] = None) -> List[Document]:
+        k = k or self.default_k
+        filters = filters or {}
+        key = (_query_key(query), k, json.dumps(filters, sort_keys=True, default=str))
+        if self.cache is not None:
+            docs = self.cache.get(key)
+            if docs is not None:
+                return list(docs)
+        lexical = self.lexical
+        if lexical is None:
+            docs = self._vector_search(query, k, filters)
+        else:
+            fetch = k * self.candidates
+            lexical_query = " ".join([query, *filters.get("skills", [])])
+            docs = reciprocal_rank_fusion([
+                self._vector_search(query, fetch, filters),
+                lexical.search(lexical_query, fetch, metadata_predicate(filters) if filters else None),
+            ], k)
+        if self.cache is not None:
+            self.cache.set(key, docs)
+        return list(docs)
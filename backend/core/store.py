@@ -0,0 +1,421 @@
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+from abc import abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    Item,
+    ListNamespacesOp,
+    Op,
+    PutOp,
+    Result,
+    SearchItem,
+    SearchOp,
+)
+from langgraph.store.base.embed import get_text_at_path, tokenize_path
+
+from core.cache import TTLCache
+
+# Every store registers here so /admin/store can report on it
+STORES: Dict[str, "PersistentStore"] = {}
+
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+}
+
+
+def _ns(namespace: Tuple[str, ...]) -> str:
+    # Namespace labels cannot contain periods, so the joined form is unambiguous
+    return ".".join(namespace)
+
+
+def _matches(value: Any, expected: Any) -> bool:
+    if isinstance(expected, dict) and expected and all(k in _OPERATORS for k in expected):
+        return all(_OPERATORS[op](value, operand) for op, operand in expected.items())
+    if isinstance(expected, dict):
+        return isinstance(value, dict) and all(_matches(value.get(k), v) for k, v in expected.items())
+    return value == expected
+
+
+def _pattern_matches(pattern: Sequence[str], labels: Sequence[str]) -> bool:
+    return len(labels) >= len(pattern) and all(p == "*" or p == label for p, label in zip(pattern, labels))
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class PersistentStore(BaseStore):
+    """
+    Durable LangGraph BaseStore for user profiles and other long-term memory.
+
+    Items are read by exact namespace and key; search() with a namespace prefix lists the
+    items under it without any embedding call. Embedding is opt-in: only namespaces matching
+    one of embed_namespaces ("*" matches any label, e.g. ("users", "*", "memories")) have
+    their values embedded on write and ranked by similarity when searched with a query.
+    Gets and query-less searches are served from a bounded hot cache. A write invalidates
+    the affected entries in its own process only, so entries also expire after cache_ttl
+    seconds; that bounds how long a write made by another worker can go unseen.
+
+    Subclasses provide the storage primitives (_get_row, _prefix_rows, _put_row, ...); the
+    async API runs the synchronous one in a worker thread.
+
+    Args:
+        embeddings: Embeddings model for the opted-in namespaces, or None.
+        embed_namespaces: Namespace patterns whose items are embedded.
+        embed_fields: JSON paths of the value that are embedded; "$" is the whole value.
+        cache_size: Entries kept in the hot cache.
+        cache_ttl: Seconds a hot cache entry stays valid; 0 (or a cache_size of 0) turns the cache off.
+        name: Registers the store in STORES under this name for metrics.
+    """
+    def __init__(
+            self,
+            embeddings=None,
+            embed_namespaces: Sequence[Tuple[str, ...]] = (),
+            embed_fields: Sequence[str] = ("$",),
+            cache_size: int = 1024,
+            cache_ttl: float = 30.0,
+            name: str = "store",
+            ):
+        self.embeddings = embeddings
+        self.embed_namespaces = [tuple(pattern) for pattern in embed_namespaces] if embeddings is not None else []
+        self.embed_fields = [(field, tokenize_path(field) if field != "$" else field) for field in embed_fields]
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl, name=f"{name}_hot") if cache_size > 0 and cache_ttl > 0 else None
+        self.name = name
+        self.counters = {"gets": 0, "searches": 0, "puts": 0, "deletes": 0, "embedded_texts": 0}
+        STORES[name] = self
+
+    # --- storage primitives ---
+
+    @abstractmethod
+    def _get_row(self, ns: str, key: str) -> Optional[Dict]:
+        """The row stored under (ns, key), or None."""
+
+    @abstractmethod
+    def _prefix_rows(self, prefix: str) -> List[Dict]:
+        """Every row whose namespace is prefix or lies under it; all rows for an empty prefix."""
+
+    @abstractmethod
+    def _put_row(self, ns: str, key: str, value: Dict, vectors: Optional[Dict[str, List[float]]], now: float):
+        """Inserts or replaces a row, keeping created_at of an existing one."""
+
+    @abstractmethod
+    def _delete_row(self, ns: str, key: str):
+        """Deletes the row if it exists."""
+
+    @abstractmethod
+    def _namespaces(self) -> List[str]:
+        """The distinct joined namespaces that hold at least one row."""
+
+    @abstractmethod
+    def _storage_stats(self) -> Dict:
+        """Backend-specific size figures for stats()."""
+
+    # --- BaseStore API ---
+
+    def embeds(self, namespace: Tuple[str, ...]) -> bool:
+        return any(_pattern_matches(pattern, namespace) for pattern in self.embed_namespaces)
+
+    @staticmethod
+    def _item(row: Dict, score: Optional[float] = None, search: bool = False) -> Item:
+        fields = dict(
+            namespace=tuple(row["ns"].split(".")),
+            key=row["key"],
+            value=row["value"],
+            created_at=datetime.fromtimestamp(row["created_at"], timezone.utc),
+            updated_at=datetime.fromtimestamp(row["updated_at"], timezone.utc),
+        )
+        return SearchItem(**fields, score=score) if search else Item(**fields)
+
+    def batch(self, ops: Iterable[Op]) -> List[Result]:
+        results = []
+        for op in ops:
+            if isinstance(op, GetOp):
+                results.append(self._get(op))
+            elif isinstance(op, SearchOp):
+                results.append(self._search(op))
+            elif isinstance(op, ListNamespacesOp):
+                results.append(self._list_namespaces(op))
+            elif isinstance(op, PutOp):
+                self._put(op)
+                results.append(None)
+            else:
+                raise ValueError(f"Unknown operation type: {type(op)}")
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Result]:
+        return await asyncio.to_thread(self.batch, list(ops))
+
+    def _get(self, op: GetOp) -> Optional[Item]:
+        self.counters["gets"] += 1
+        cache_key = ("get", op.namespace, op.key)
+        item = self.cache.get(cache_key) if self.cache is not None else None
+        if item is None:
+            row = self._get_row(_ns(op.namespace), op.key)
+            item = self._item(row) if row else False
+            if self.cache is not None:
+                self.cache.set(cache_key, item)
+        return item or None
+
+    def _search(self, op: SearchOp) -> List[SearchItem]:
+        self.counters["searches"] += 1
+        ranked = op.query and self.embeddings is not None and self.embeds(op.namespace_prefix)
+        cache_key = None if ranked or self.cache is None else (
+            "search", op.namespace_prefix, json.dumps(op.filter, sort_keys=True, default=str), op.limit, op.offset)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        rows = [row for row in self._prefix_rows(_ns(op.namespace_prefix))
+                if not op.filter or all(_matches(row["value"].get(k), v) for k, v in op.filter.items())]
+        if ranked:
+            query_vector = self.embeddings.embed_query(op.query)
+            scored = [
+                (max((_cosine(query_vector, vector) for vector in (row.get("vectors") or {}).values()), default=None), row)
+                for row in rows
+            ]
+            # Items without vectors rank after every scored one
+            scored.sort(key=lambda pair: (pair[0] is not None, pair[0] or 0.0), reverse=True)
+            results = [self._item(row, score, search=True) for score, row in scored[op.offset:op.offset + op.limit]]
+        else:
+            rows.sort(key=lambda row: row["updated_at"], reverse=True)
+            results = [self._item(row, search=True) for row in rows[op.offset:op.offset + op.limit]]
+        if cache_key is not None:
+            self.cache.set(cache_key, results)
+        return results
+
+    def _put(self, op: PutOp):
+        ns = _ns(op.namespace)
+        if op.value is None:
+            self._delete_row(ns, op.key)
+            self.counters["deletes"] += 1
+        else:
+            vectors = None
+            if op.index is not False and self.embeds(op.namespace):
+                vectors = self._embed(op)
+            self._put_row(ns, op.key, dict(op.value), vectors, datetime.now(timezone.utc).timestamp())
+            self.counters["puts"] += 1
+        self._invalidate(op.namespace, op.key)
+
+    def _embed(self, op: PutOp) -> Dict[str, List[float]]:
+        fields = self.embed_fields if op.index is None else [(f, tokenize_path(f) if f != "$" else f) for f in op.index]
+        paths, texts = [], []
+        for path, field in fields:
+            found = [json.dumps(op.value, sort_keys=True)] if field == "$" else get_text_at_path(op.value, field)
+            for i, text in enumerate(found):
+                paths.append(path if len(found) == 1 else f"{path}.{i}")
+                texts.append(text)
+        if not texts:
+            return {}
+        self.counters["embedded_texts"] += len(texts)
+        return dict(zip(paths, self.embeddings.embed_documents(texts)))
+
+    def _invalidate(self, namespace: Tuple[str, ...], key: str):
+        if self.cache is None:
+            return
+        self.cache.invalidate(("get", namespace, key))
+        for cache_key in self.cache.keys():
+            if cache_key[0] == "search" and namespace[:len(cache_key[1])] == cache_key[1]:
+                self.cache.invalidate(cache_key)
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> List[Tuple[str, ...]]:
+        namespaces = [tuple(ns.split(".")) for ns in self._namespaces()]
+        for condition in op.match_conditions or ():
+            if condition.match_type == "prefix":
+                namespaces = [ns for ns in namespaces if _pattern_matches(condition.path, ns)]
+            else:
+                namespaces = [ns for ns in namespaces if _pattern_matches(condition.path[::-1], ns[::-1])]
+        if op.max_depth is not None:
+            namespaces = {ns[:op.max_depth] for ns in namespaces}
+        return sorted(namespaces)[op.offset:op.offset + op.limit]
+
+    def stats(self) -> Dict:
+        storage = self._storage_stats()
+        items = storage.get("items") or 0
+        return {
+            "backend": type(self).__name__,
+            "embed_namespaces": [list(pattern) for pattern in self.embed_namespaces],
+            **storage,
+            "avg_item_bytes": round(storage.get("value_bytes", 0) / items, 1) if items else 0.0,
+            **self.counters,
+            "hot_cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+class SQLiteStore(PersistentStore):
+    """PersistentStore on a local SQLite file (WAL mode, one connection guarded by a lock)."""
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS store (
+                    ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, vectors TEXT,
+                    created_at REAL NOT NULL, updated_at REAL NOT NULL,
+                    PRIMARY KEY (ns, key));
+            """)
+            self._conn.commit()
+
+    @staticmethod
+    def _row(row) -> Dict:
+        ns, key, value, vectors, created_at, updated_at = row
+        return {
+            "ns": ns, "key": key, "value": json.loads(value), "vectors": json.loads(vectors) if vectors else None,
+            "created_at": created_at, "updated_at": updated_at,
+        }
+
+    def _get_row(self, ns, key):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM store WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        return self._row(row) if row else None
+
+    def _prefix_rows(self, prefix):
+        with self._lock:
+            if not prefix:
+                rows = self._conn.execute("SELECT * FROM store").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM store WHERE ns = ? OR substr(ns, 1, ?) = ?",
+                    (prefix, len(prefix) + 1, prefix + ".")).fetchall()
+        return [self._row(row) for row in rows]
+
+    def _put_row(self, ns, key, value, vectors, now):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO store VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (ns, key) DO UPDATE SET"
+                " value = excluded.value, vectors = excluded.vectors, updated_at = excluded.updated_at",
+                (ns, key, json.dumps(value, default=str), json.dumps(vectors) if vectors else None, now, now))
+            self._conn.commit()
+
+    def _delete_row(self, ns, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM store WHERE ns = ? AND key = ?", (ns, key))
+            self._conn.commit()
+
+    def _namespaces(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT ns FROM store").fetchall()]
+
+    def _storage_stats(self):
+        with self._lock:
+            items, namespaces, value_bytes, max_bytes, vector_bytes = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT ns), COALESCE(SUM(LENGTH(value)), 0), COALESCE(MAX(LENGTH(value)), 0),"
+                " COALESCE(SUM(LENGTH(vectors)), 0) FROM store").fetchone()
+        return {
+            "path": self.path,
+            "items": items,
+            "namespaces": namespaces,
+            "value_bytes": value_bytes,
+            "max_item_bytes": max_bytes,
+            "vector_bytes": vector_bytes,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+
+class MongoStore(PersistentStore):
+    """PersistentStore on a MongoDB collection, shared by every worker and instance."""
+    def __init__(self, db, collection: str = "store", **kwargs):
+        super().__init__(**kwargs)
+        self.collection = db[collection]
+        self.collection.create_index([("ns", 1), ("key", 1)], unique=True)
+
+    def _get_row(self, ns, key):
+        return self.collection.find_one({"ns": ns, "key": key}, {"_id": 0})
+
+    def _prefix_rows(self, prefix):
+        import re
+
+        if not prefix:
+            return list(self.collection.find({}, {"_id": 0}))
+        return list(self.collection.find({"ns": {"$regex": f"^{re.escape(prefix)}(\\.|$)"}}, {"_id": 0}))
+
+    def _put_row(self, ns, key, value, vectors, now):
+        self.collection.update_one(
+            {"ns": ns, "key": key},
+            {
+                "$set": {"value": value, "vectors": vectors, "updated_at": now,
+                         "value_bytes": len(json.dumps(value, default=str))},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
+
+    def _delete_row(self, ns, key):
+        self.collection.delete_one({"ns": ns, "key": key})
+
+    def _namespaces(self):
+        return self.collection.distinct("ns")
+
+    def _storage_stats(self):
+        totals = next(iter(self.collection.aggregate([{"$group": {
+            "_id": None,
+            "items": {"$sum": 1},
+            "value_bytes": {"$sum": "$value_bytes"},
+            "max_item_bytes": {"$max": "$value_bytes"},
+        }}])), {})
+        return {
+            "items": totals.get("items", 0),
+            "namespaces": len(self._namespaces()),
+            "value_bytes": totals.get("value_bytes", 0),
+            "max_item_bytes": totals.get("max_item_bytes", 0),
+        }
+
+
+STORE_BACKENDS = ("sqlite", "mongo", "memory")
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "store.sqlite3")
+
+
+def create_store(backend: Optional[str] = None):
+    """
+    Builds the long-term memory store from STORE_BACKEND ("sqlite" by default, "mongo" for
+    shared production storage, "memory" for a non-durable InMemoryStore). Namespaces listed
+    in STORE_EMBED_NAMESPACES (";"-separated, labels joined by "/", e.g. "users/*/memories")
+    are embedded with STORE_EMBEDDING_MODEL; nothing is embedded by default.
+    """
+    backend = (backend or os.getenv("STORE_BACKEND", "sqlite")).lower()
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown STORE_BACKEND '{backend}', expected one of {STORE_BACKENDS}")
+    if backend == "memory":
+        from langgraph.store.memory import InMemoryStore
+        return InMemoryStore()
+
+    embed_namespaces = [tuple(p.strip().split("/")) for p in os.getenv("STORE_EMBED_NAMESPACES", "").split(";") if p.strip()]
+    embeddings = None
+    if embed_namespaces:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = GoogleGenerativeAIEmbeddings(model=os.getenv("STORE_EMBEDDING_MODEL", "models/embedding-001"))
+    kwargs = {
+        "embeddings": embeddings,
+        "embed_namespaces": embed_namespaces,
+        "cache_size": int(os.getenv("STORE_CACHE_SIZE", "1024")),
+        "cache_ttl": float(os.getenv("STORE_CACHE_TTL_SECONDS", "30")),
+    }
+    if backend == "mongo":
+        from pymongo import MongoClient
+        return MongoStore(MongoClient(os.getenv("MONGODB_URI"))["asha_ai_db"], **kwargs)
+    # An empty STORE_SQLITE_PATH= means the default too; sqlite3 would open a private temp database for ""
+    path = os.getenv("STORE_SQLITE_PATH") or DEFAULT_SQLITE_PATH
+    return SQLiteStore(path, **kwargs)
+
+
+def store_stats() -> Dict[str, Dict]:
+    return {name: store.stats() for name, store in STORES.items()}
@@ -0,0 +1,91 @@
+import concurrent.futures
+import contextvars
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from langchain_core.messages import ToolMessage
+from langgraph.config import get_config
+
+from core.tracing import mark, span
+
+
+class ToolRunner:
+    """
+    Runs every tool call of an agent turn concurrently and joins the results.
+
+    Each call gets its own timeout (timeouts[name], else timeout); a call that fails, times
+    out or names an unknown tool is answered with an error ToolMessage, so generate still
+    sees one response per call. The turn costs as long as the slowest tool.
+
+    Tools in side_effects cannot be rolled back when a speculative run is discarded, so they
+    wait for the query's bias verdict (configurable["guard_run"], set by SpeculativeStream)
+    and are skipped if it failed.
+
+    Args:
+        handlers: Tool name -> callable(state, tool_call) returning a ToolMessage.
+        timeout: Default seconds a call may take.
+        timeouts: Per-tool overrides of timeout.
+        side_effects: Names of the tools gated on the bias verdict.
+        workers: Tool calls run at once, across all turns.
+    """
+    def __init__(
+            self,
+            handlers: Dict[str, Callable],
+            timeout: float = 45,
+            timeouts: Optional[Dict[str, float]] = None,
+            side_effects: Iterable[str] = (),
+            workers: int = 8,
+            ):
+        self.handlers = handlers
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.side_effects = set(side_effects)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool")
+
+    def run(self, state, tool_calls: List[dict]) -> List[ToolMessage]:
+        """Returns one ToolMessage per tool call, in call order."""
+        futures = []
+        for tool_call in tool_calls:
+            handler = self.handlers.get(tool_call["name"])
+            if handler is None:
+                futures.append(None)
+                continue
+            # Each call runs in a copy of this context, so get_config() still works inside the tool
+            futures.append(self.executor.submit(contextvars.copy_context().run, self._call, handler, state, tool_call))
+
+        deadline = time.monotonic()
+        results = []
+        for tool_call, future in zip(tool_calls, futures):
+            name = tool_call["name"]
+            if future is None:
+                results.append(ToolMessage(content=f"Unknown tool '{name}'.", name=name, tool_call_id=tool_call["id"], status="error"))
+                continue
+            timeout = self.timeouts.get(name, self.timeout)
+            try:
+                results.append(future.result(timeout=max(0.0, deadline + timeout - time.monotonic())))
+            except concurrent.futures.TimeoutError:
+                print(f"Tool {name} timed out after {timeout}s")
+                mark(f"tool.{name}.timeout")
+                results.append(ToolMessage(content=f"The {name} call timed out after {timeout:g} seconds.", name=name, tool_call_id=tool_call["id"], status="error"))
+            except Exception as e:
+                print(f"Tool {name} failed: {e}")
+                results.append(ToolMessage(content=f"The {name} call failed: {e}", name=name, tool_call_id=tool_call["id"], status="error"))
+        return results
+
+    def _call(self, handler, state, tool_call):
+        with span(f"tool.{tool_call['name']}"):
+            if tool_call["name"] in self.side_effects and self.query_rejected():
+                return ToolMessage(content="Skipped: the query did not pass the bias check.", name=tool_call["name"], tool_call_id=tool_call["id"], status="error")
+            return handler(state, tool_call)
+
+    @staticmethod
+    def query_rejected() -> bool:
+        """
+        Waits for the bias verdict of a speculative run; True if the query failed it.
+        Without a GuardRun there is nothing to wait for.
+        """
+        guard_run = get_config()["configurable"].get("guard_run")
+        if guard_run is None:
+            return False
+        with span("tool.bias_verdict_wait"):
+            return guard_run.bias_failed()
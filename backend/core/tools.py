@@ -3,24 +3,93 @@ from typing import Optional
 from core.rag import Rag
 from api.scraper import Scraper
 from langchain_community.tools.tavily_search import TavilySearchResults
-from models.data_model import MongoDB
+from models.data_model import MongoDB, JobResponse, JobResponseList, EventResponse, CurrentEvents
+from core.job_cache import JobCacheRefresher
+from core.event_catalog import EventCatalogSync
+from core.retrieval import JobSearch, normalize_filters
+from core.tracing import annotate, span
+from datetime import datetime, timedelta
 from typing import List, Dict
+import os
 
 db = MongoDB()
 
+job_refresher = JobCacheRefresher(
+  db,
+  fetch=lambda url: Scraper.scrape_herkey_jobs(url, wait_time=30),
+  fresh_for=timedelta(hours=float(os.getenv("JOB_CACHE_FRESH_HOURS", "24"))),
+  stale_for=timedelta(hours=float(os.getenv("JOB_CACHE_STALE_HOURS", "24"))),
+  refresh_ahead=timedelta(minutes=float(os.getenv("JOB_REFRESH_AHEAD_MINUTES", "60"))),
+  max_concurrency=int(os.getenv("JOB_REFRESH_CONCURRENCY", "2")),
+  budget=int(os.getenv("JOB_REFRESH_BUDGET", "10")),
+  interval=float(os.getenv("JOB_REFRESH_INTERVAL_SECONDS", "300")),
+)
+if os.getenv("JOB_CACHE_WARMER", "true").lower() == "true":
+  job_refresher.start()
+
+HERKEY_EVENTS_URL = "https://events.herkey.com/events"
+
+event_catalog = EventCatalogSync(
+  db,
+  fetch=lambda: Scraper.scrape_herkey_events(HERKEY_EVENTS_URL, wait_time=30),
+  interval=float(os.getenv("EVENT_SYNC_INTERVAL_SECONDS", "3600")),
+  prune_after=timedelta(days=float(os.getenv("EVENT_PRUNE_AFTER_DAYS", "7"))),
+)
+if os.getenv("EVENT_CATALOG_SYNC", "true").lower() == "true":
+  event_catalog.start()
+
 retriever = Rag.create_vectordb_retriever()
+job_search = JobSearch(
+  retriever,
+  ttl=float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "60")),
+  maxsize=int(os.getenv("RETRIEVAL_CACHE_SIZE", "256")),
+  hybrid=os.getenv("HYBRID_SEARCH", "true").lower() == "true",
+  corpus=db.get_job_corpus,
+  refresh_interval=float(os.getenv("HYBRID_CORPUS_REFRESH_SECONDS", "300")),
+)
 tavily = TavilySearchResults(max_results=5)
 
+
+def _text(value) -> str:
+  if isinstance(value, (list, tuple)):
+    return ", ".join(str(v) for v in value if v)
+  return "" if value is None else str(value)
+
+
+def job_response(job: Dict) -> JobResponse:
+  """A scraped job as the JobResponse the client renders; skills lists are joined into one string."""
+  return JobResponse(**{field: _text(job.get(field)) for field in JobResponse.model_fields})
+
+
+def event_response(event: Dict) -> EventResponse:
+  return EventResponse(
+    title=_text(event.get("title")),
+    image=_text(event.get("image_url")),
+    categories=[str(c) for c in event.get("categories") or []],
+    mode=_text(event.get("mode")),
+    date=_text(event.get("date")),
+    time=_text(event.get("time")),
+    venue=_text(event.get("venue")),
+    price=_text(event.get("price")),
+    event_url=_text(event.get("event_url")),
+    register_url=_text(event.get("register_url")),
+  )
+
 @tool
-def vectorstore_retriever_tool(query : str) -> str:
-  """Search and return jobs according to the given user query.
+def vectorstore_retriever_tool(query : str, work_mode: Optional[str] = None, location: Optional[str] = None, skills: Optional[str] = None, experience_years: Optional[float] = None) -> str:
+  """Search and return jobs according to the given user query, optionally narrowed by structured filters.
 
   Args:
       query: The query to use to search the vector database
+      work_mode: Optional work mode, one of remote, hybrid or onsite.
+      location: Optional city or country, for example "Bangalore".
+      skills: Optional comma-separated skills the job should list, for example "python,sql". Jobs listing any of them match.
+      experience_years: Optional years of experience the user has; jobs requiring more are excluded.
       
   Returns:
       Relevant information from the vector database"""
-  docs = retriever.get_relevant_documents(query)
+  filters = normalize_filters(work_mode=work_mode, location=location, skills=skills, experience_years=experience_years)
+  docs = job_search.search(query, filters=filters)
   if not docs:
     return "No relevant jobs found."
   def format_docs(docs):
@@ -38,7 +107,7 @@ def vectorstore_retriever_tool(query : str) -> str:
   relevant_info = format_docs(docs)
   return relevant_info
 
-@tool
+@tool(response_format="content_and_artifact")
 def publicapi_retriever_tool(work_mode: Optional[str] = None, job_type: Optional[str] = None, keyword: Optional[str]= None) -> str:
   """Fetches relevant jobs from HerKey with optional parameters like work mode and job type. Works without any parameters as well.
 
@@ -47,7 +116,7 @@ def publicapi_retriever_tool(work_mode: Optional[str] = None, job_type: Optional
         job_type : Optional string representing the type of the job. Should be one of full-time, part-time, returnee-program, freelance/projects or volunteer.
         keyword : Optional string (kebab case) representing the job title or keywords to search for. For example, "data-scientist", "ai-engineer". Can be multiple keywords separated by commas like "ai-engineer,data-analyst". 
     Returns:
-        String containing all the relevant informations from public api"""
+        String containing all the relevant informations from public api, with the jobs as a JobResponseList artifact"""
   
   base_url = "https://www.herkey.com/jobs"
   search_url = base_url + "/search"
@@ -67,22 +136,29 @@ def publicapi_retriever_tool(work_mode: Optional[str] = None, job_type: Optional
       herkey_jobs_url = base_url
 
 
-  # added code to check if jobs in cache
-  cached_jobs = db.get_cached_jobs(herkey_jobs_url)
+  # Serves fresh or stale cached jobs; stale ones are re-scraped in the background
+  cached_jobs = job_refresher.get(herkey_jobs_url)
   
   if cached_jobs:
     print(f"Using cached results for URL: {herkey_jobs_url}")
+    annotate(job_cache="hit")
     extracted_jobs = cached_jobs
   else:
     print(f"Fetching new results for URL: {herkey_jobs_url}")
+    annotate(job_cache="miss")
     # Make the API call
-    extracted_jobs = Scraper.scrape_herkey_jobs(herkey_jobs_url, wait_time=30)
+    with span("scraper.herkey_jobs"):
+      extracted_jobs = Scraper.scrape_herkey_jobs(herkey_jobs_url, wait_time=30)
     
     # Store the results in MongoDB
-    db.cache_job_url(herkey_jobs_url, extracted_jobs)
+    if extracted_jobs:
+      job_refresher.store(herkey_jobs_url, extracted_jobs)
 
 #  extracted_jobs = Scraper.scrape_herkey_jobs(herkey_jobs_url, wait_time=30)
 
+  if not extracted_jobs:
+    return "No matching jobs found on HerKey.", JobResponseList(jobs=[])
+
   relevant_jobs = ""
   for i, job in enumerate(extracted_jobs):
     relevant_jobs += f"Job {i+1}:\n"
@@ -91,8 +167,8 @@ def publicapi_retriever_tool(work_mode: Optional[str] = None, job_type: Optional
     relevant_jobs += f"Location: {job['location']}\n"
     relevant_jobs += f"Work Mode: {job['work_mode']}\n"
     relevant_jobs += f"Experience: {job['experience']}\n"
-    relevant_jobs += f"Skills: {job['skills']}\n\n"
-  return relevant_jobs
+    relevant_jobs += f"Skills: {_text(job['skills'])}\n\n"
+  return relevant_jobs, JobResponseList(jobs=[job_response(job) for job in extracted_jobs])
 
 @tool
 def career_guidance_tool(query : str) -> str:
@@ -106,17 +182,36 @@ def career_guidance_tool(query : str) -> str:
   results = tavily.invoke(input=query)
   return results
 
-@tool
-def current_events_tool():
-  """Fetching the current live events /sessions from the HerKeys
+@tool(response_format="content_and_artifact")
+def current_events_tool(start_date: Optional[str] = None, end_date: Optional[str] = None, mode: Optional[str] = None, category: Optional[str] = None, price: Optional[str] = None) -> str:
+  """Fetches the current live events / sessions from HerKey, optionally filtered. Works without any parameters as well, returning upcoming events.
 
-    Args: None
+    Args:
+        start_date : Optional date (YYYY-MM-DD); only events running on or after it are returned.
+        end_date : Optional date (YYYY-MM-DD); only events starting on or before it are returned.
+        mode : Optional string, either online or offline.
+        category : Optional category or topic of the event, for example "data science" or "leadership".
+        price : Optional string, either free or paid.
     Returns:
-        String containing all the relevant events / sessions from api"""
+        String containing the matching events / sessions, with the events as a CurrentEvents artifact"""
+
+  def parse_date(value):
+    try:
+      return datetime.strptime(value.strip()[:10], "%Y-%m-%d") if value else None
+    except ValueError:
+      return None
+
+  start, end = parse_date(start_date), parse_date(end_date)
+  if end:
+    end = end + timedelta(days=1) - timedelta(microseconds=1)
+
+  populated = event_catalog.ensure_populated()
+  extracted_events = db.query_events(start_date=start, end_date=end, mode=mode, category=category, price=price)
+  if not extracted_events:
+    if not populated:
+      return "The HerKey event catalog is not available yet; please ask again in a few minutes.", CurrentEvents(events=[])
+    return "No matching events found.", CurrentEvents(events=[])
 
-  herkey_events_url = "https://events.herkey.com/events"
-  
-  extracted_events = Scraper.scrape_herkey_events(herkey_events_url, wait_time=30)
   relevant_events = ""
   for i, event in enumerate(extracted_events):
       relevant_events += f"Event {i+1}:\n"
@@ -131,7 +226,7 @@ def current_events_tool():
       relevant_events += f"Event URL: {event['event_url']}\n"
       relevant_events += f"Register URL: {event['register_url']}\n\n"
       
-  return relevant_events
+  return relevant_events, CurrentEvents(events=[event_response(event) for event in extracted_events])
 
 @tool
 def update_user_profile_tool(messages: List[Dict]) -> str:
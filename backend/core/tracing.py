@@ -0,0 +1,103 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+_TRACE: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("asha_trace", default=None)
+_SPAN: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("asha_span", default=None)
+
+
+class Trace:
+    """
+    Timeline of one chat request: named spans (start offset, duration, attributes) and
+    one-off marks such as the first streamed token, all relative to the request start.
+
+    The active trace lives in a context variable. LangGraph and asyncio copy the context
+    into the threads and tasks they start; other thread pools need bind_context().
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _ms(self, t: float) -> float:
+        return round((t - self.started) * 1000, 1)
+
+    def record(self, name: str, start: float, end: float, **attrs):
+        with self._lock:
+            self.spans.append({"name": name, "start_ms": self._ms(start), "duration_ms": round((end - start) * 1000, 1), **attrs})
+
+    def mark(self, name: str):
+        """Records the time of the first occurrence of name; later calls are ignored."""
+        if name not in self.marks:
+            with self._lock:
+                self.marks.setdefault(name, self._ms(time.perf_counter()))
+
+    def summary(self) -> Dict:
+        """Spans in start order, marks, and the total milliseconds per span name."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+            marks = dict(self.marks)
+        stages: Dict[str, float] = {}
+        for s in spans:
+            stages[s["name"]] = round(stages.get(s["name"], 0.0) + s["duration_ms"], 1)
+        return {"spans": spans, "marks": marks, "stages": stages}
+
+
+def start_trace() -> Trace:
+    """Starts a trace and makes it the active one in the current context."""
+    trace = Trace()
+    _TRACE.set(trace)
+    return trace
+
+
+def activate(trace: Optional[Trace]):
+    """Makes an existing trace the active one, e.g. inside a streaming generator."""
+    _TRACE.set(trace)
+
+
+def current_trace() -> Optional[Trace]:
+    return _TRACE.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Times the block as a span of the active trace; a no-op without one. Yields the span's
+    attribute dict, which annotate() (or the caller) can add to while the block runs.
+    """
+    trace = _TRACE.get()
+    if trace is None:
+        yield attrs
+        return
+    token = _SPAN.set(attrs)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _SPAN.reset(token)
+        trace.record(name, start, time.perf_counter(), **attrs)
+
+
+def annotate(**attrs):
+    """Adds attributes (e.g. cache="hit") to the innermost open span."""
+    current = _SPAN.get()
+    if current is not None:
+        current.update(attrs)
+
+
+def mark(name: str):
+    trace = _TRACE.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+def bind_context(fn: Callable) -> Callable:
+    """Wraps fn to run in a copy of the caller's context, for submitting to plain thread pools."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
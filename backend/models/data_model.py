@@ -4,7 +4,10 @@ from typing import List, Optional, Dict, Any
 import os
 from dotenv import load_dotenv
 from bson import ObjectId
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import datetime
+import threading
+from core.cache import TTLCache
 load_dotenv()
 
 # Pydantic models for type validation and documentation
@@ -91,8 +94,58 @@ def dict_to_pydantic(model_class, data: Dict[str, Any]):
         del data["_id"]
     return model_class(**data)
 
+def canonical_job_url(url: str) -> str:
+    """
+    Cache key for a HerKey jobs URL: lower-cased scheme and host, no trailing slash, query
+    parameters sorted, empty ones dropped, and keyword lists lower-cased, de-duplicated and
+    sorted, so "?keyword=Data-Analyst&work_mode=hybrid" and
+    "?work_mode=hybrid&keyword=data-analyst" share one entry.
+    """
+    parts = urlsplit(url.strip())
+    params = []
+    for name, value in parse_qsl(parts.query):
+        value = value.strip()
+        if not value:
+            continue
+        if name == "keyword":
+            value = ",".join(sorted({k.strip().lower() for k in value.split(",") if k.strip()}))
+        elif name in ("work_mode", "job_type"):
+            value = value.lower()
+        params.append((name, value))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(params), safe=",/"), ""))
+
+
+def event_mode(mode):
+    """Normalizes an event mode ("Online", "Virtual", "In-person", ...) to "online"/"offline"."""
+    mode = (mode or "").strip().lower()
+    if mode in ("", "n/a"):
+        return None
+    if "online" in mode or "virtual" in mode:
+        return "online"
+    if "offline" in mode or "in-person" in mode or "in person" in mode:
+        return "offline"
+    return mode
+
+
+def event_is_free(price):
+    """True for "Free" or a zero price, False for a non-zero "₹" price, None when unknown."""
+    price = (price or "").strip().lower()
+    if "free" in price:
+        return True
+    digits = "".join(ch for ch in price if ch.isdigit() or ch == ".")
+    if not digits.strip("."):
+        return None
+    return float(digits.strip(".")) == 0
+
+
 # MongoDB connection and operations
 class MongoDB:
+    _job_cache_indexed = False
+    _events_indexed = False
+    _job_corpus_indexed = False
+    _index_lock = threading.Lock()
+
     def __init__(self):
         self.client = MongoClient(os.getenv("MONGODB_URI"))
         self.db = self.client["asha_ai_db"]
@@ -103,6 +156,15 @@ class MongoDB:
         self.mentorship_collection = self.db["mentorship_programs"]
         self.sessions_collection = self.db["user_sessions"]
         self.careers_collection = self.db["careers"]
+        self.job_cache_collection = self.db["job_cache"]
+        self.job_corpus_collection = self.db["job_corpus"]
+
+        # In-process L1 in front of job_cache so hot searches skip the Atlas round trip
+        self.job_cache_l1 = TTLCache(
+            maxsize=int(os.getenv("JOB_CACHE_L1_SIZE", "256")),
+            ttl=float(os.getenv("JOB_CACHE_L1_TTL_SECONDS", "300")),
+            name="job_cache_l1",
+        )
     
     # Job operations with Pydantic model support
     def insert_job(self, job_data):
@@ -126,7 +188,163 @@ class MongoDB:
         if query is None:
             query = {}
         return list(self.events_collection.find(query))
+
+    def _ensure_event_indexes(self):
+        """Creates the event catalog indexes once per process."""
+        if MongoDB._events_indexed:
+            return
+        with MongoDB._index_lock:
+            if MongoDB._events_indexed:
+                return
+            self.events_collection.create_index(
+                "key", unique=True, partialFilterExpression={"key": {"$exists": True}}
+            )
+            self.events_collection.create_index([("start_date", 1), ("end_date", 1)])
+            self.events_collection.create_index("mode_lc")
+            self.events_collection.create_index("categories_lc")
+            self.events_collection.create_index("is_free")
+            MongoDB._events_indexed = True
+
+    def upsert_events(self, events):
+        """
+        Upsert scraped events into the event catalog, keyed on the HerKey event id (or URL)
+        
+        Args:
+            events (list): Event dictionaries as returned by the HerKey event parser
+            
+        Returns:
+            int: Number of events inserted or changed
+        """
+        from datetime import datetime
+        from pymongo import UpdateOne
+        from api.herkey_parser import parse_event_dates
+
+        self._ensure_event_indexes()
+        now = datetime.utcnow()
+        operations = []
+        for event in events:
+            key = next((event.get(f) for f in ("id", "event_url", "title") if event.get(f) not in (None, "", "N/A")), None)
+            if key is None:
+                continue
+            start_date, end_date = parse_event_dates(event.get("date"))
+            document = dict(event)
+            document.update({
+                "key": key,
+                "start_date": start_date,
+                "end_date": end_date,
+                "mode_lc": event_mode(event.get("mode")),
+                "categories_lc": [c.strip().lower() for c in event.get("categories", []) if c.strip()],
+                "is_free": event_is_free(event.get("price")),
+                "synced_at": now,
+            })
+            operations.append(UpdateOne({"key": key}, {"$set": document}, upsert=True))
+        if not operations:
+            return 0
+        result = self.events_collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def prune_events(self, ended_before):
+        """Delete catalog events that ended before the given datetime."""
+        return self.events_collection.delete_many({"end_date": {"$lt": ended_before}}).deleted_count
+
+    def count_events(self):
+        return self.events_collection.count_documents({"key": {"$exists": True}})
+
+    def query_events(self, start_date=None, end_date=None, mode=None, category=None, price=None, limit=20):
+        """
+        Query the event catalog
+        
+        Args:
+            start_date (datetime): Only events still running on or after this date
+            end_date (datetime): Only events starting on or before this date
+            mode (str): "online" or "offline"
+            category (str): Case-insensitive category prefix, e.g. "data" matches "Data Science"
+            price (str): "free" or "paid"
+            limit (int): Maximum number of events returned
+            
+        Returns:
+            list: Matching event dictionaries ordered by start date. Without a date range only
+                upcoming events (and those whose date could not be parsed) are returned.
+        """
+        import re
+        from datetime import datetime
+
+        query = {"key": {"$exists": True}}
+        if start_date or end_date:
+            if start_date:
+                query["end_date"] = {"$gte": start_date}
+            if end_date:
+                query["start_date"] = {"$lte": end_date}
+        else:
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            query["$or"] = [{"end_date": {"$gte": today}}, {"end_date": None}]
+        if mode:
+            query["mode_lc"] = event_mode(mode)
+        if category:
+            # Anchored and case-sensitive against the lower-cased copy, so the index is used
+            query["categories_lc"] = {"$regex": "^" + re.escape(category.strip().lower())}
+        if price:
+            query["is_free"] = price.strip().lower() == "free"
+        cursor = self.events_collection.find(query, {"_id": 0}).sort("start_date", 1).limit(limit)
+        return list(cursor)
     
+    # Job corpus operations
+    def _ensure_job_corpus_indexes(self):
+        """Creates the job corpus indexes once per process."""
+        if MongoDB._job_corpus_indexed:
+            return
+        with MongoDB._index_lock:
+            if MongoDB._job_corpus_indexed:
+                return
+            self.job_corpus_collection.create_index("key", unique=True)
+            self.job_corpus_collection.create_index("updated_at")
+            MongoDB._job_corpus_indexed = True
+
+    def upsert_job_corpus(self, records):
+        """
+        Upsert ingested job records into the job corpus the BM25 index is built from
+        
+        Args:
+            records (list): Ingestion records {"id", "text", "metadata"}, keyed on the vector ID
+            
+        Returns:
+            int: Number of jobs inserted or changed
+        """
+        from datetime import datetime
+        from pymongo import UpdateOne
+
+        self._ensure_job_corpus_indexes()
+        now = datetime.utcnow()
+        operations = []
+        for record in records:
+            metadata = {k: v for k, v in record.get("metadata", {}).items() if k != "text"}
+            # An update pipeline, so unchanged jobs keep their updated_at and readers polling for changes skip them
+            operations.append(UpdateOne({"key": record["id"]}, [{"$set": {
+                "key": record["id"],
+                "text": {"$literal": record["text"]},
+                "metadata": {"$literal": metadata},
+                "updated_at": {"$cond": [
+                    {"$eq": ["$metadata.content_hash", metadata.get("content_hash")]}, "$updated_at", now,
+                ]},
+            }}], upsert=True))
+        if not operations:
+            return 0
+        result = self.job_corpus_collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def get_job_corpus(self, updated_after=None):
+        """
+        Get job corpus entries, oldest change first
+        
+        Args:
+            updated_after (datetime): Only entries inserted or changed after this time
+            
+        Returns:
+            list: Dictionaries with "key", "text", "metadata" and "updated_at"
+        """
+        query = {"updated_at": {"$gt": updated_after}} if updated_after else {}
+        return list(self.job_corpus_collection.find(query, {"_id": 0}).sort("updated_at", 1))
+
     # Mentorship operations
     def insert_mentorship(self, mentorship_data):
         return self.mentorship_collection.insert_one(mentorship_data)
@@ -172,37 +390,77 @@ class MongoDB:
             {"$set": session_data}
         )
 
-    def cache_job_url(self, url, jobs_data):
+    def _ensure_job_cache_indexes(self):
+        """Creates the job_cache indexes once per process instead of checking on every write."""
+        if MongoDB._job_cache_indexed:
+            return
+        with MongoDB._index_lock:
+            if MongoDB._job_cache_indexed:
+                return
+            # Partial so documents written before the key field existed don't collide on null
+            self.job_cache_collection.create_index(
+                "key", unique=True, partialFilterExpression={"key": {"$exists": True}}
+            )
+            # TTL index to automatically expire old entries
+            self.job_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+            MongoDB._job_cache_indexed = True
+
+    def cache_job_url(self, url, jobs_data, fresh_for=None, stale_for=None):
         """
-        Store job search results in cache with URL as the key
+        Store job search results in cache, keyed on the canonical form of the URL
         
         Args:
             url (str): The URL used to fetch the jobs
             jobs_data (list): List of job dictionaries
+            fresh_for (timedelta): How long the results count as fresh (default 24 hours)
+            stale_for (timedelta): How much longer stale results may still be served while
+                they are refreshed, before Mongo's TTL index deletes them (default 24 hours)
             
         Returns:
-            pymongo.results.InsertOneResult: Result of the insert operation
+            pymongo.results.UpdateResult: Result of the upsert
         """
         from datetime import datetime, timedelta
         
-        # Set expiration time (e.g., cache valid for 24 hours)
-        expiry_time = datetime.utcnow() + timedelta(hours=24)
+        self._ensure_job_cache_indexes()
+        key = canonical_job_url(url)
+        now = datetime.utcnow()
+        fresh_until = now + (fresh_for or timedelta(hours=24))
+        expiry_time = fresh_until + (stale_for or timedelta(hours=24))
         
         cache_data = {
+            "key": key,
             "url": url,
             "jobs": jobs_data,
-            "timestamp": datetime.utcnow(),
+            "timestamp": now,
+            "fresh_until": fresh_until,
             "expires_at": expiry_time
         }
         
-        # Create job_cache collection if not exists
-        if "job_cache" not in self.db.list_collection_names():
-            self.db.create_collection("job_cache")
-            # Create TTL index to automatically expire old entries
-            self.db["job_cache"].create_index("expires_at", expireAfterSeconds=0)
+        result = self.job_cache_collection.update_one({"key": key}, {"$set": cache_data}, upsert=True)
+        self.job_cache_l1.set(key, cache_data)
+        return result
+
+
+    def get_cached_job_entry(self, url):
+        """
+        Get the cache document for a URL, including its freshness timestamps
         
-        return self.db["job_cache"].insert_one(cache_data)
+        Args:
+            url (str): The URL used to fetch the jobs
+            
+        Returns:
+            dict: The cache document with "jobs", "timestamp" and "fresh_until", or None
+        """
+        from datetime import datetime
 
+        key = canonical_job_url(url)
+        result = self.job_cache_l1.get(key)
+        if result is not None and result["expires_at"] > datetime.utcnow():
+            return result
+        result = self.job_cache_collection.find_one({"key": key}, {"_id": 0})
+        if result:
+            self.job_cache_l1.set(key, result)
+        return result
 
     def get_cached_jobs(self, url):
         """
@@ -214,7 +472,7 @@ class MongoDB:
         Returns:
             list: List of job dictionaries if cache exists, None otherwise
         """
-        result = self.db["job_cache"].find_one({"url": url})
+        result = self.get_cached_job_entry(url)
         if result:
             return result["jobs"]
-        return None
\ No newline at end of file
+        return None
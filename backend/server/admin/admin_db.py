@@ -1,9 +1,12 @@
 from pymongo.mongo_client import MongoClient
 from pymongo.server_api import ServerApi
 import uuid
+import atexit
 from dotenv import load_dotenv
 import os
 
+from .analytics_sink import AnalyticsSink
+
 load_dotenv()
 
 uri = os.environ.get('MONGODB_URI')
@@ -20,11 +23,18 @@ except Exception as e:
 db = client["asha_admin"]
 analytics_collection = db["admin_data"]
 
+analytics_sink = AnalyticsSink(
+    analytics_collection,
+    max_queue=int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("ANALYTICS_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("ANALYTICS_FLUSH_INTERVAL_SECONDS", "2")),
+    overflow=os.getenv("ANALYTICS_OVERFLOW", "drop_oldest"),
+)
+analytics_sink.start()
+atexit.register(analytics_sink.stop)
+
+
 def insert_analytics_record(data: dict):
-    try:
-        query_id = str(uuid.uuid4())
-        data["query_id"] = query_id
-        result = analytics_collection.insert_one(data)
-        print(f"Inserted document with ID: {result.inserted_id}")
-    except Exception as e:
-        print(f"Insert failed: {e}")
+    """Queues the record for the write-behind sink; the Mongo insert happens in the background."""
+    data["query_id"] = str(uuid.uuid4())
+    analytics_sink.put(data)
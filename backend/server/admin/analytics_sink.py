@@ -0,0 +1,117 @@
+import threading
+from collections import deque
+from typing import List
+
+from pymongo.errors import BulkWriteError
+
+# Mongo's duplicate-key error code
+DUPLICATE_KEY = 11000
+
+
+class AnalyticsSink:
+    """
+    Write-behind buffer for analytics records.
+
+    put() only appends to a bounded in-memory queue; a background thread writes the queue
+    to Mongo with insert_many once batch_size records are waiting or flush_interval seconds
+    have passed, so recording analytics never adds a network round trip to a chat request.
+    When the queue is full the overflow policy decides what is lost: "drop_oldest" evicts the
+    oldest queued record, "drop_newest" rejects the new one. Records whose insert failed are
+    put back at the front of the queue (as far as they fit) and retried on the next flush;
+    duplicate-key errors on a retry mean the record was already written and are not retried. stop() flushes
+    what is left, and is registered to run at interpreter exit.
+
+    Args:
+        collection: The Mongo collection records are inserted into.
+        max_queue: Records held in memory at most.
+        batch_size: Records per insert_many, and the queue length that triggers an early flush.
+        flush_interval: Seconds between flushes of a partial batch.
+        overflow: "drop_oldest" or "drop_newest".
+    """
+    def __init__(self, collection, max_queue: int = 10000, batch_size: int = 100, flush_interval: float = 2.0, overflow: str = "drop_oldest"):
+        if overflow not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected drop_oldest or drop_newest")
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "batches": 0, "failed_batches": 0}
+
+    def put(self, record: dict) -> bool:
+        """Queues a record; returns False if it was dropped because the queue is full."""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.stats["dropped"] += 1
+                if self.overflow == "drop_newest":
+                    return False
+                self._queue.popleft()
+            self._queue.append(record)
+            self.stats["queued"] += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush(self) -> int:
+        """Writes everything queued so far; returns the number of records written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return written
+                try:
+                    self.collection.insert_many(batch, ordered=False)
+                    failed = []
+                except BulkWriteError as e:
+                    # insert_many gives every record an _id, so records that reached Mongo before
+                    # an earlier failure come back as duplicates on the retry; they are written
+                    errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+                    failed = [batch[err["index"]] for err in errors]
+                    if failed:
+                        print(f"Analytics insert failed for {len(failed)} of {len(batch)} records: {errors[0].get('errmsg')}")
+                except Exception as e:
+                    print(f"Analytics insert failed: {e}")
+                    failed = batch
+                written += len(batch) - len(failed)
+                with self._cond:
+                    self.stats["written"] += len(batch) - len(failed)
+                    self.stats["batches"] += 1
+                    if failed:
+                        self.stats["failed_batches"] += 1
+                        self._requeue(failed)
+                if failed:
+                    return written
+
+    def _requeue(self, records: List[dict]):
+        # Called with the lock held; failed records go back to the front, as far as they fit
+        room = max(self.max_queue - len(self._queue), 0)
+        self._queue.extendleft(reversed(records[:room]))
+        self.stats["dropped"] += max(len(records) - room, 0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="analytics-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._queue)
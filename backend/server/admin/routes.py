@@ -1,6 +1,11 @@
 import os
 from dotenv import load_dotenv
-from .admin_db import analytics_collection  
+from .admin_db import analytics_collection, analytics_sink
+from core.registry import AnalyzerRegistry, ModelRegistry
+from core.cache import cache_stats
+from core.checkpoint import checkpoint_stats
+from core.context import context_stats
+from core.store import store_stats
 
 load_dotenv()
 
@@ -26,3 +31,52 @@ def get_analytics():
             "success": False,
             "message": str(e)
         }), 500
+
+
+@admin.route("/models", methods=["GET"])
+def get_model_stats():
+    return jsonify({
+        "success": True,
+        "data": {"pii_analyzers": AnalyzerRegistry.stats(), "chat_models": ModelRegistry.stats()}
+    }), 200
+
+
+@admin.route("/caches", methods=["GET"])
+def get_cache_stats():
+    return jsonify({
+        "success": True,
+        "data": cache_stats()
+    }), 200
+
+
+
+@admin.route("/checkpoints", methods=["GET"])
+def get_checkpoint_stats():
+    return jsonify({
+        "success": True,
+        "data": checkpoint_stats()
+    }), 200
+
+
+@admin.route("/context", methods=["GET"])
+def get_context_stats():
+    return jsonify({
+        "success": True,
+        "data": context_stats()
+    }), 200
+
+
+@admin.route("/store", methods=["GET"])
+def get_store_stats():
+    return jsonify({
+        "success": True,
+        "data": store_stats()
+    }), 200
+
+
+@admin.route("/analytics-sink", methods=["GET"])
+def get_analytics_sink_stats():
+    return jsonify({
+        "success": True,
+        "data": {**analytics_sink.stats, "pending": len(analytics_sink)}
+    }), 200
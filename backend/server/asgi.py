@@ -0,0 +1,32 @@
+import re
+
+from quart import Quart
+from quart_cors import cors
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from server import create_app
+from server.config import Config
+
+
+def create_asgi_app():
+    """
+    ASGI entry point. /users/* is served by the async Quart blueprint, so an open chat
+    stream costs a coroutine rather than a worker thread; every other route is the
+    existing Flask app, run through hypercorn's WSGI adapter.
+    """
+    flask_app = create_app()
+    quart_app = Quart(__name__)
+    quart_app.config.from_object(Config)
+    # Same policy as flask_cors' supports_credentials=True: reflect any request origin
+    quart_app = cors(quart_app, allow_credentials=True, allow_origin=re.compile(r".*"))
+
+    from server.users.async_routes import async_users
+    quart_app.register_blueprint(async_users, url_prefix="/users")
+
+    wsgi = AsyncioWSGIMiddleware(flask_app, max_body_size=16 * 1024 * 1024)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan" or scope["path"].startswith("/users/"):
+            return await quart_app(scope, receive, send)
+        return await wsgi(scope, receive, send)
+
+    return app
@@ -0,0 +1,54 @@
+import time
+
+from quart import Blueprint, request, Response, session, current_app
+from .routes import ASHA, GUARD, build_analytics_record, conversation_config, resolve_conversation
+from .streaming import AsyncSpeculativeStream
+from core.tracing import activate, start_trace
+from ..admin.admin_db import insert_analytics_record
+
+async_users = Blueprint('users', __name__)
+
+
+@async_users.route("/chat", methods=["GET", "POST"])
+async def agent_chat():
+    start_time = time.time()
+    trace = start_trace()
+    data: dict = await request.get_json()
+    user_message = data.get("query")
+
+    if not user_message:
+        return "No message provided", 400
+
+    user_id, thread_id = resolve_conversation(session, bool(current_app.secret_key))
+    guard_run = GUARD.submit(user_message)
+    # Only PII blocks the request; the bias verdict is awaited inside the stream.
+    sanitized_query = await guard_run.asanitized()
+
+    inputs = {
+        "messages": [
+            {"role": "user", "content": sanitized_query},
+        ]
+    }
+    print("INPUT TO THE AGENT: ", inputs)
+    config = conversation_config(user_id, thread_id)
+
+    async def body():
+        activate(trace)
+        stream_start = time.perf_counter()
+        stream = AsyncSpeculativeStream(ASHA, guard_run, inputs, config)
+        try:
+            # The stream marks first_token on the trace at the first answer text
+            async for chunk in stream.stream():
+                yield chunk
+        finally:
+            # Only queues the record; the analytics sink writes it to Mongo in the background
+            trace.record("stream", stream_start, time.perf_counter())
+            insert_analytics_record(build_analytics_record(
+                user_id, user_message, sanitized_query, start_time, trace, completed=stream.completed))
+
+    response = Response(
+        body(),
+        mimetype="text/event-stream",
+    )
+    response.timeout = None  # chats outlive Quart's default response timeout
+    return response
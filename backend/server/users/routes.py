@@ -1,139 +1,129 @@
 import os
+import uuid
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 os.environ["TAVILY_API_KEY"] = os.getenv("TAVILY_API_KEY")
 
-from flask import Blueprint, request, jsonify, Response, stream_with_context
-import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context, session, current_app
 from core.agent import AshaAI
-from core.guardrails import CustomDetectPII, CustomDetectBias
-from guardrails import Guard
-from guardrails.classes import ValidationOutcome
+from core.guardrails import CustomDetectPII, CustomDetectBias, GuardRunner
+from .streaming import SpeculativeStream
 from ..admin.admin_db import insert_analytics_record
+from typing import Optional
+from core.tracing import Trace, activate, start_trace
 import time
 users = Blueprint(name='users', import_name=__name__)
 
-GUARD = Guard().use_many(CustomDetectPII(on_fail="fix"), CustomDetectBias(on_fail="fix"))
+# "parallel" overlaps the bias check with PII and agent start; "sequential" waits on both first
+GUARD = GuardRunner(
+    CustomDetectPII(on_fail="fix", detection=os.getenv("PII_DETECTION", "tiered")),
+    CustomDetectBias(on_fail="fix"),
+    mode=os.getenv("GUARDRAIL_MODE", "parallel"),
+)
+if os.getenv("PII_WARMUP", "false").lower() == "true":
+    GUARD.pii.warmup()
 ASHA = AshaAI.create_agent()
 
+
+def detect_query_type(query: str) -> str:
+    q = query.lower()
+    if "job" in q or "internship" in q:
+        return "job"
+    elif "event" in q or "webinar" in q:
+        return "events"
+    elif "career" in q or "guidance" in q:
+        return "career_guidance"
+    else:
+        return "other"
+
+
+def resolve_conversation(session, persist_session: bool):
+    """
+    Returns (user_id, thread_id) for a chat request. Resumption is cookie-based: both ids
+    live in the signed session (SECRET_KEY set), so a browser that sends its session cookie
+    keeps its conversation across requests. There is no other way to name a thread; a client
+    without the cookie, or any request when the session cannot be signed, starts a new one.
+    """
+    stored = session if persist_session else {}
+    user_id = stored.get("user_id") or f"user-{uuid.uuid4().hex}"
+    thread_id = stored.get("thread_id") or str(uuid.uuid4())
+    if persist_session:
+        session["user_id"] = user_id
+        session["thread_id"] = thread_id
+    return user_id, thread_id
+
+
+def conversation_config(user_id: str, thread_id: str) -> dict:
+    """
+    Graph config for a conversation. Checkpoints are keyed on the user as well as the thread,
+    so even a leaked session thread id cannot reach someone else's conversation.
+    """
+    return {"configurable": {"user_id": user_id, "thread_id": f"{user_id}:{thread_id}"}}
+
+
+def build_analytics_record(user_id: str, user_message: str, sanitized_query: str, start_time: float, trace: Optional[Trace] = None, completed: bool = True) -> dict:
+    """
+    Called once the stream has finished, so response_time_ms covers the whole response.
+    completed is False when the client disconnected (or the run failed) before the end; the
+    graph may still be running then, so spans that were open are missing from the record.
+    """
+    record = {
+    "user_id": user_id,  # Replace with real user ID if dynamic
+    "user_query": sanitized_query,
+    "query_type": detect_query_type(user_message),
+    "page_visited": "chatbot",
+    "response_time_ms": int((time.time() - start_time) * 1000),
+    "timestamp": datetime.utcnow().isoformat()
+    # "clicked_job_id": None,  # Update this when job click is implemented
+    }
+    if trace is not None:
+        timings = trace.summary()
+        record["ttft_ms"] = timings["marks"].get("first_token")
+        record["stages_ms"] = timings["stages"]
+        record["spans"] = timings["spans"]
+        record["marks"] = timings["marks"]
+        record["incomplete"] = not completed
+    return record
+
+
 @users.route("/chat", methods=["GET", "POST"])
 def agent_chat():
     start_time = time.time()
-    user_id = "user-321"
+    trace = start_trace()
     data: dict = request.get_json()
     user_message = data.get("query")
 
     if not user_message:
         return "No message provided", 400
 
-    validation_results: ValidationOutcome = GUARD.validate(user_message)
-
-    bias_detected = False
-    if validation_results.validation_summaries:
-        for summary in validation_results.validation_summaries:
-             if summary.validator_name == 'CustomDetectBias':
-                bias_detected = True
-                break
-    
-    def detect_query_type(query: str) -> str:
-        q = query.lower()
-        if "job" in q or "internship" in q:
-            return "job"
-        elif "event" in q or "webinar" in q:
-            return "events"
-        elif "career" in q or "guidance" in q:
-            return "career_guidance"
-        else:
-            return "other"
-    
-    def generate():
-        if bias_detected:
-            error_data = {
-                "payload_type": "validation_error",
-                "validator": "CustomDetectBias",
-                "outcome": "fail",
-                "details": validation_results.to_dict()
-            }
-            yield f"data: {json.dumps(error_data)}\n\n".encode("utf-8")
-            return
+    user_id, thread_id = resolve_conversation(session, bool(current_app.secret_key))
+    guard_run = GUARD.submit(user_message)
+    # Only PII blocks the request; the bias verdict is awaited inside the stream.
+    sanitized_query = guard_run.sanitized()
 
+    def generate():
         inputs = {
             "messages": [
-                {"role": "user", "content": validation_results.validated_output},
+                {"role": "user", "content": sanitized_query},
             ]
         }
         print("INPUT TO THE AGENT: ", inputs)
-        config = {"configurable": {"user_id": user_id, "thread_id": "1"}}
-
-        for s in ASHA.stream(
-            inputs, config=config, stream_mode=["values", "messages"]
-        ):
-            function_name = None
-            arguments = None
-            function_call = False
-            tool_call = False
-            tool_name = None
-            content = None
-
-            if s[0] == "messages":
-                message_chunk = s[1][0]
-                content = message_chunk.content
-
-                if hasattr(message_chunk, "additional_kwargs") and message_chunk.additional_kwargs.get(
-                    "function_call"
-                ):
-                    function_call = True
-                    function_name = message_chunk.additional_kwargs["function_call"]["name"]
-                    try:
-                        arguments = json.loads(message_chunk.additional_kwargs["function_call"]["arguments"])
-                    except json.JSONDecodeError:
-                         arguments = message_chunk.additional_kwargs["function_call"]["arguments"]
-                         arguments = {"raw": arguments, "status": "incomplete"}
-
-
-                elif hasattr(message_chunk, "tool_call_id"):
-                    tool_call = True
-                    tool_name = getattr(message_chunk, 'name', 'unknown_tool')
-
-                data = {
-                    "payload_type": "message",
-                    "content": content,
-                    "function_call": function_call,
-                    "function_name": function_name,
-                    "arguments": arguments,
-                    "tool_call": tool_call,
-                    "tool_name": tool_name,
-                }
-                yield f"data: {json.dumps(data)}\n\n".encode("utf-8")
-
-            elif s[0] == "values":
-                values_data = s[1]
-                data = {}
-                data["payload_type"] = "values"
-                if "action" in values_data:
-                    data["action"] = values_data["action"]
-                if "error" in values_data:
-                    data["error"] = values_data["error"]
-                if "final_answer" in values_data:
-                    data["final_answer"] = values_data["final_answer"]
-
-                if len(data) > 1:
-                     yield f"data: {json.dumps(data)}\n\n".encode("utf-8")
-    
-    response_time_ms = int((time.time() - start_time) * 1000)
-   
-    analytics_data = {
-    "user_id": user_id,  # Replace with real user ID if dynamic
-    "user_query": validation_results.validated_output,
-    "query_type": detect_query_type(user_message),
-    "page_visited": "chatbot",
-    "response_time_ms": response_time_ms,
-    "timestamp": datetime.utcnow().isoformat()
-    # "clicked_job_id": None,  # Update this when job click is implemented
-    }
-    insert_analytics_record(analytics_data)
+        config = conversation_config(user_id, thread_id)
+
+        activate(trace)
+        stream_start = time.perf_counter()
+        stream = SpeculativeStream(ASHA, guard_run, inputs, config)
+        try:
+            # The stream marks first_token on the trace at the first answer text
+            yield from stream
+        finally:
+            # Also runs when the client disconnects, so every request is recorded
+            trace.record("stream", stream_start, time.perf_counter())
+            insert_analytics_record(build_analytics_record(
+                user_id, user_message, sanitized_query, start_time, trace, completed=stream.completed))
+
     return Response(
         stream_with_context(generate()),
         mimetype="text/event-stream",
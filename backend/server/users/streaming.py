@@ -0,0 +1,279 @@
+import asyncio
+import contextvars
+import json
+import queue
+import threading
+from typing import TYPE_CHECKING
+from core.tracing import current_trace
+
+if TYPE_CHECKING:
+    # Only for annotations; the stream just calls the GuardRun's methods
+    from core.guardrails import GuardRun
+
+_BIAS_VERDICT = object()
+_STREAM_END = object()
+
+
+def sse(data: dict) -> bytes:
+    return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def format_chunk(s):
+    """
+    Converts one (mode, payload) item from graph.stream(stream_mode=["values", "messages"])
+    into the SSE payload dict sent to the frontend, or None if there is nothing to send.
+    """
+    if s[0] == "messages":
+        message_chunk = s[1][0]
+        function_name = None
+        arguments = None
+        function_call = False
+        tool_call = False
+        tool_name = None
+        content = message_chunk.content
+
+        if hasattr(message_chunk, "additional_kwargs") and message_chunk.additional_kwargs.get(
+            "function_call"
+        ):
+            function_call = True
+            function_name = message_chunk.additional_kwargs["function_call"]["name"]
+            try:
+                arguments = json.loads(message_chunk.additional_kwargs["function_call"]["arguments"])
+            except json.JSONDecodeError:
+                arguments = message_chunk.additional_kwargs["function_call"]["arguments"]
+                arguments = {"raw": arguments, "status": "incomplete"}
+
+        elif hasattr(message_chunk, "tool_call_id"):
+            tool_call = True
+            tool_name = getattr(message_chunk, 'name', 'unknown_tool')
+
+        return {
+            "payload_type": "message",
+            "content": content,
+            "function_call": function_call,
+            "function_name": function_name,
+            "arguments": arguments,
+            "tool_call": tool_call,
+            "tool_name": tool_name,
+        }
+
+    elif s[0] == "values":
+        values_data = s[1]
+        data = {}
+        data["payload_type"] = "values"
+        if "action" in values_data:
+            data["action"] = values_data["action"]
+        if "error" in values_data:
+            data["error"] = values_data["error"]
+        if "final_answer" in values_data:
+            data["final_answer"] = values_data["final_answer"]
+
+        if len(data) > 1:
+            return data
+    return None
+
+
+def is_answer_text(data: dict) -> bool:
+    """True for a payload carrying answer text, as opposed to function-call chunks, tool messages or state values."""
+    return (
+        data.get("payload_type") == "message"
+        and not data.get("function_call")
+        and not data.get("tool_call")
+        and bool(data.get("content"))
+    )
+
+
+def emit(data: dict, trace=None) -> bytes:
+    """SSE-encodes a payload, marking first_token on the request's trace at the first answer text."""
+    if trace is not None and is_answer_text(data):
+        trace.mark("first_token")
+    return sse(data)
+
+
+def bias_error_payload(guard_run: "GuardRun") -> dict:
+    return {
+        "payload_type": "validation_error",
+        "validator": "CustomDetectBias",
+        "outcome": "fail",
+        "details": guard_run.outcome().to_dict(),
+    }
+
+
+def with_guard_run(config: dict, guard_run: "GuardRun") -> dict:
+    """Adds the GuardRun to the run's configurable; LangGraph keeps non-scalar values out of checkpoint metadata."""
+    return {**config, "configurable": {**config["configurable"], "guard_run": guard_run}}
+
+
+class SpeculativeStream:
+    """
+    Streams the agent graph for a query whose bias verdict may still be pending.
+
+    The graph runs in a worker thread on the PII-fixed text as soon as it is available.
+    Its chunks are held back until the bias validator passes, then flushed. If bias
+    fails, the run is cancelled and the thread is reset to its pre-run checkpoint, so
+    the conversation looks as if the query never reached the agent. A rollback cannot undo
+    side effects, so the GuardRun is passed to the graph as configurable["guard_run"] and
+    side-effecting tools wait for the verdict before they run (see ToolRunner).
+    """
+    def __init__(self, graph, guard_run: "GuardRun", inputs: dict, config: dict):
+        self.graph = graph
+        self.guard_run = guard_run
+        self.inputs = inputs
+        self.config = with_guard_run(config, guard_run)
+        self.trace = current_trace()
+        self.cancelled = threading.Event()
+        self.events = queue.Queue()
+        # False until the whole response has been sent, e.g. when the client disconnects mid-stream
+        self.completed = False
+
+    def _discard(self, before):
+        """Makes the pre-run checkpoint the thread's latest again, dropping everything the run wrote."""
+        if before.config["configurable"].get("checkpoint_id"):
+            # Forking from the earlier checkpoint with an empty update leaves its state as the newest one
+            self.graph.update_state(before.config, {"messages": []})
+        else:
+            self.graph.checkpointer.delete_thread(self.config["configurable"]["thread_id"])
+        print("Discarded speculative run after bias failure")
+
+    def _produce(self):
+        before = self.graph.get_state(self.config)
+        try:
+            for s in self.graph.stream(self.inputs, config=self.config, stream_mode=["values", "messages"]):
+                if self.cancelled.is_set():
+                    break
+                self.events.put(s)
+        except Exception as e:
+            self.events.put(e)
+        finally:
+            self.events.put(_STREAM_END)
+            try:
+                if self.guard_run.bias_failed():
+                    self._discard(before)
+            except Exception as e:
+                print(f"Could not discard speculative run: {e}")
+
+    def __iter__(self):
+        if not self.guard_run.speculative and self.guard_run.bias_failed():
+            self.completed = True
+            yield sse(bias_error_payload(self.guard_run))
+            return
+
+        self.guard_run.add_bias_callback(lambda: self.events.put(_BIAS_VERDICT))
+        # The producer runs in a copy of this context so the request's trace follows the graph run
+        threading.Thread(target=contextvars.copy_context().run, args=(self._produce,), daemon=True).start()
+
+        pending = []
+        verdict_seen = stream_ended = False
+        try:
+            while not (verdict_seen and stream_ended):
+                item = self.events.get()
+                if item is _BIAS_VERDICT:
+                    verdict_seen = True
+                    if self.guard_run.bias_failed():
+                        self.completed = True
+                        yield sse(bias_error_payload(self.guard_run))
+                        return
+                    for data in pending:
+                        yield emit(data, self.trace)
+                    pending = []
+                elif item is _STREAM_END:
+                    stream_ended = True
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    data = format_chunk(item)
+                    if data is None:
+                        continue
+                    if verdict_seen:
+                        yield emit(data, self.trace)
+                    else:
+                        pending.append(data)
+            self.completed = True
+        finally:
+            # Also stops the worker when the client disconnects mid-stream.
+            self.cancelled.set()
+
+
+class AsyncSpeculativeStream:
+    """
+    SpeculativeStream for the ASGI app: drives the graph with astream on the event loop.
+
+    Same contract as SpeculativeStream (chunks are held until the bias verdict, a failed
+    verdict yields the validation_error payload and discards the run), but nothing here
+    blocks a thread: the guardrail futures are awaited via asyncio.wrap_future and LangGraph
+    runs the synchronous nodes in its executor.
+    """
+    def __init__(self, graph, guard_run: "GuardRun", inputs: dict, config: dict):
+        self.graph = graph
+        self.guard_run = guard_run
+        self.inputs = inputs
+        self.config = with_guard_run(config, guard_run)
+        self.trace = current_trace()
+        self.completed = False
+
+    async def _discard(self, before):
+        if before.config["configurable"].get("checkpoint_id"):
+            await self.graph.aupdate_state(before.config, {"messages": []})
+        else:
+            await self.graph.checkpointer.adelete_thread(self.config["configurable"]["thread_id"])
+        print("Discarded speculative run after bias failure")
+
+    async def _close(self, chunks, next_chunk, verdict, before):
+        """Stops the graph run and, if bias failed, rolls the thread back. Runs as its own task so it survives client disconnects."""
+        try:
+            if next_chunk is not None and not next_chunk.done():
+                next_chunk.cancel()
+                try:
+                    await next_chunk
+                except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                    pass
+            await chunks.aclose()
+            if await verdict:
+                await self._discard(before)
+        except Exception as e:
+            print(f"Could not discard speculative run: {e}")
+
+    async def stream(self):
+        if not self.guard_run.speculative and await self.guard_run.abias_failed():
+            self.completed = True
+            yield sse(bias_error_payload(self.guard_run))
+            return
+
+        verdict = asyncio.ensure_future(self.guard_run.abias_failed())
+        before = await self.graph.aget_state(self.config)
+        chunks = self.graph.astream(self.inputs, config=self.config, stream_mode=["values", "messages"])
+        next_chunk = asyncio.ensure_future(chunks.__anext__())
+        pending = []
+        try:
+            while next_chunk is not None or not verdict.done():
+                waiting = {task for task in (next_chunk, verdict) if task is not None and not task.done()}
+                if waiting:
+                    await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                if verdict.done() and pending is not None:
+                    if verdict.result():
+                        self.completed = True
+                        yield sse(bias_error_payload(self.guard_run))
+                        return
+                    for data in pending:
+                        yield emit(data, self.trace)
+                    pending = None
+
+                if next_chunk is not None and next_chunk.done():
+                    try:
+                        s = next_chunk.result()
+                    except StopAsyncIteration:
+                        next_chunk = None
+                        continue
+                    next_chunk = asyncio.ensure_future(chunks.__anext__())
+                    data = format_chunk(s)
+                    if data is None:
+                        continue
+                    if pending is None:
+                        yield emit(data, self.trace)
+                    else:
+                        pending.append(data)
+            self.completed = True
+        finally:
+            # Also stops the graph when the client disconnects mid-stream.
+            asyncio.get_running_loop().create_task(self._close(chunks, next_chunk, verdict, before))
@@ -0,0 +1,90 @@
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from server.admin.analytics_sink import AnalyticsSink
+
+
+class FakeCollection:
+    """insert_many with Mongo's unordered semantics; fail_after cuts the connection mid-batch."""
+    def __init__(self, fail_after=None, reject=()):
+        self.docs = {}
+        self.fail_after = fail_after
+        self.reject = set(reject)
+
+    def insert_many(self, documents, ordered=True):
+        errors = []
+        for index, doc in enumerate(documents):
+            doc.setdefault("_id", ObjectId())
+            if self.fail_after is not None and index == self.fail_after:
+                self.fail_after = None
+                raise AutoReconnect("connection reset")
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+            elif doc.get("n") in self.reject:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+
+def records(count):
+    return [{"n": i} for i in range(count)]
+
+
+def test_flush_writes_in_batches():
+    collection = FakeCollection()
+    sink = AnalyticsSink(collection, batch_size=4)
+    for record in records(10):
+        sink.put(record)
+    assert sink.flush() == 10
+    assert len(collection.docs) == 10
+    assert sink.stats["batches"] == 3
+    assert len(sink) == 0
+
+
+def test_partial_insert_is_not_retried_forever():
+    collection = FakeCollection(fail_after=6)
+    sink = AnalyticsSink(collection, batch_size=10)
+    for record in records(15):
+        sink.put(record)
+
+    # The connection drops after 6 of the first 10 records reached Mongo
+    assert sink.flush() == 0
+    assert len(sink) == 15
+    assert len(collection.docs) == 6
+
+    # The retry reports those 6 as duplicates; they count as written and the queue drains
+    assert sink.flush() == 15
+    assert len(sink) == 0
+    assert sorted(doc["n"] for doc in collection.docs.values()) == list(range(15))
+    assert sink.stats["written"] == 15
+    assert sink.stats["failed_batches"] == 1
+
+
+def test_only_failed_records_are_requeued():
+    collection = FakeCollection(reject={3})
+    sink = AnalyticsSink(collection, batch_size=10)
+    for record in records(5):
+        sink.put(record)
+
+    assert sink.flush() == 4
+    assert [record["n"] for record in sink._queue] == [3]
+    assert sink.stats["failed_batches"] == 1
+
+    collection.reject.clear()
+    assert sink.flush() == 1
+    assert len(collection.docs) == 5
+
+
+def test_requeue_respects_max_queue():
+    collection = FakeCollection(fail_after=0)
+    sink = AnalyticsSink(collection, max_queue=4, batch_size=4)
+    for record in records(4):
+        sink.put(record)
+    assert sink.flush() == 0
+    assert len(sink) == 4
+
+    sink.put({"n": 4})
+    assert sink.stats["dropped"] == 1
+    assert sink.flush() == 4
@@ -0,0 +1,113 @@
+import operator
+import time
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+import core.checkpoint
+from core.checkpoint import RetainingCheckpointSaver, SQLiteCheckpointSaver, create_checkpointer
+
+
+class State(TypedDict):
+    messages: Annotated[List[str], operator.add]
+
+
+def build_graph(saver):
+    def step(state):
+        return {"messages": [f"reply {len(state['messages'])}"]}
+
+    graph = StateGraph(State)
+    graph.add_node("step", step)
+    graph.add_edge(START, "step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=saver)
+
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite3")
+
+
+def test_storage_primitives_are_abstract():
+    with pytest.raises(TypeError):
+        RetainingCheckpointSaver()
+
+
+def test_round_trip_survives_a_restart(path):
+    graph = build_graph(SQLiteCheckpointSaver(path, name="test_round_trip"))
+    graph.invoke({"messages": ["hi"]}, config("t1"))
+    graph.invoke({"messages": ["again"]}, config("t1"))
+
+    restarted = build_graph(SQLiteCheckpointSaver(path, name="test_round_trip_restarted"))
+    assert restarted.get_state(config("t1")).values["messages"] == ["hi", "reply 1", "again", "reply 3"]
+    assert restarted.get_state(config("t2")).values == {}
+
+    history = list(restarted.get_state_history(config("t1")))
+    assert len(history) == 6
+    assert [s.config["configurable"]["checkpoint_id"] for s in history] == sorted(
+        (s.config["configurable"]["checkpoint_id"] for s in history), reverse=True)
+
+
+def test_trim_keeps_the_newest_checkpoints(path):
+    saver = SQLiteCheckpointSaver(path, max_checkpoints=4, name="test_trim")
+    graph = build_graph(saver)
+    for turn in range(5):
+        graph.invoke({"messages": [f"turn {turn}"]}, config("t1"))
+    graph.invoke({"messages": ["other"]}, config("t2"))
+
+    assert len(list(saver.list(config("t1")))) == 4
+    assert len(list(saver.list(config("t2")))) == 3
+    assert saver.counters["trimmed_checkpoints"] == 15 - 4
+    # The newest state is whole even though its ancestors are gone
+    assert len(graph.get_state(config("t1")).values["messages"]) == 10
+
+
+def test_idle_threads_are_evicted(path):
+    saver = SQLiteCheckpointSaver(path, idle_ttl=0.2, name="test_evict")
+    graph = build_graph(saver)
+    graph.invoke({"messages": ["hi"]}, config("idle"))
+    time.sleep(0.3)
+    graph.invoke({"messages": ["hi"]}, config("active"))
+
+    assert saver.evict_idle() == 1
+    assert graph.get_state(config("idle")).values == {}
+    assert graph.get_state(config("active")).values["messages"] == ["hi", "reply 1"]
+    assert saver.stats()["threads"] == 1
+
+
+def test_fork_from_pre_run_checkpoint_discards_the_run(path):
+    """The rollback SpeculativeStream does after a failed bias check."""
+    graph = build_graph(SQLiteCheckpointSaver(path, name="test_fork"))
+    graph.invoke({"messages": ["hi"]}, config("t1"))
+
+    before = graph.get_state(config("t1"))
+    graph.invoke({"messages": ["rejected"]}, config("t1"))
+    graph.update_state(before.config, {"messages": []})
+
+    assert graph.get_state(config("t1")).values["messages"] == ["hi", "reply 1"]
+    graph.invoke({"messages": ["next"]}, config("t1"))
+    assert graph.get_state(config("t1")).values["messages"] == ["hi", "reply 1", "next", "reply 3"]
+
+
+def test_delete_thread(path):
+    saver = SQLiteCheckpointSaver(path, name="test_delete")
+    graph = build_graph(saver)
+    graph.invoke({"messages": ["hi"]}, config("t1"))
+    saver.delete_thread("t1")
+    assert list(saver.list(config("t1"))) == []
+
+
+def test_empty_sqlite_path_uses_the_default_file(path, monkeypatch):
+    monkeypatch.setattr(core.checkpoint, "DEFAULT_SQLITE_PATH", path)
+    monkeypatch.setenv("CHECKPOINT_BACKEND", "sqlite")
+    monkeypatch.setenv("CHECKPOINT_SQLITE_PATH", "")
+    saver = create_checkpointer()
+    saver.stop()
+    assert saver.path == path
+    build_graph(saver).invoke({"messages": ["hi"]}, config("t1"))
+    assert build_graph(SQLiteCheckpointSaver(path, name="test_empty_path_reopened")).get_state(config("t1")).values["messages"] == ["hi", "reply 1"]
@@ -0,0 +1,80 @@
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.store.memory import InMemoryStore
+
+from core.context import ContextWindow, summary_namespace
+
+THREAD = ("u1", "t1")
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"question {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+
+class SlowSummarizer:
+    """Blocks until released, so a test can observe the request path while a summary is in flight."""
+    def __init__(self):
+        self.release = threading.Event()
+        self.prompts = []
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        assert self.release.wait(5)
+        return f"summary {len(self.prompts)}"
+
+
+def test_summary_is_built_off_the_request_path():
+    summarize = SlowSummarizer()
+    store = InMemoryStore()
+    window = ContextWindow(summarize=summarize, store=store, keep_turns=2, name="test_background")
+
+    # prepare() returns while the summarizer is still blocked
+    prepared = window.prepare({"messages": conversation(4)}, "system", THREAD)
+    assert [m.content for m in prepared[1:]] == ["question 2", "answer 2", "question 3", "answer 3"]
+    assert "Conversation summary" not in prepared[0].content
+
+    summarize.release.set()
+    window.flush()
+    assert store.get(summary_namespace("u1"), "t1").value == {"summary": "summary 1", "through": "a1"}
+
+    prepared = window.prepare({"messages": conversation(4)}, "system", THREAD)
+    assert "summary 1" in prepared[0].content
+    assert len(summarize.prompts) == 1
+
+
+def test_each_message_is_summarized_once():
+    summarize = SlowSummarizer()
+    summarize.release.set()
+    window = ContextWindow(summarize=summarize, store=InMemoryStore(), keep_turns=2, name="test_incremental")
+    window.prepare({"messages": conversation(4)}, "system", THREAD)
+    window.flush()
+    window.prepare({"messages": conversation(5)}, "system", THREAD)
+    window.flush()
+    assert "question 0" in summarize.prompts[0] and "question 2" not in summarize.prompts[0]
+    assert "question 2" in summarize.prompts[1] and "question 0" not in summarize.prompts[1]
+    assert "summary 1" in summarize.prompts[1]
+
+
+def test_rolled_back_thread_starts_a_new_summary():
+    store = InMemoryStore()
+    store.put(summary_namespace("u1"), "t1", {"summary": "old branch", "through": "gone"})
+    window = ContextWindow(summarize=lambda prompt: "new", store=store, keep_turns=4, name="test_rollback")
+    prepared = window.prepare({"messages": conversation(2)}, "system", THREAD)
+    assert "old branch" not in prepared[0].content
+
+
+def test_old_tool_outputs_are_stubbed():
+    messages = [
+        HumanMessage(content="find jobs", id="h0"),
+        AIMessage(content="", id="a0", tool_calls=[{"name": "publicapi_retriever_tool", "args": {}, "id": "c0"}]),
+        ToolMessage(content="x" * 4000, name="publicapi_retriever_tool", tool_call_id="c0", id="t0"),
+        AIMessage(content="Here are jobs", id="a1"),
+        HumanMessage(content="thanks", id="h1"),
+    ]
+    prepared = ContextWindow(name="test_stubs").prepare({"messages": messages}, "system")
+    assert "omitted (4000 characters)" in prepared[3].content
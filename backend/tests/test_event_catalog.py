@@ -0,0 +1,66 @@
+import time
+
+from core.event_catalog import EventCatalogSync
+
+
+class FakeDB:
+    def __init__(self):
+        self.events = []
+
+    def count_events(self):
+        return len(self.events)
+
+    def upsert_events(self, events):
+        self.events.extend(events)
+        return len(events)
+
+    def prune_events(self, ended_before):
+        return 0
+
+
+class FlakyFetch:
+    def __init__(self, fail_times):
+        self.calls = 0
+        self.fail_times = fail_times
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise RuntimeError("page did not load")
+        return [{"id": "e1", "title": "Leadership webinar"}]
+
+
+def test_failed_foreground_sync_backs_off():
+    fetch = FlakyFetch(fail_times=1)
+    catalog = EventCatalogSync(FakeDB(), fetch=fetch, retry_after=60)
+
+    assert catalog.ensure_populated() is False
+    assert catalog.last_attempt is not None
+    # Later chat requests inside the backoff window do not scrape again
+    assert catalog.ensure_populated() is False
+    assert catalog.ensure_populated() is False
+    assert fetch.calls == 1
+
+    # The background sync is not subject to the backoff and fills the catalog
+    catalog.sync()
+    assert catalog.ensure_populated() is True
+    assert fetch.calls == 2
+
+
+def test_foreground_sync_retries_after_the_backoff():
+    fetch = FlakyFetch(fail_times=2)
+    catalog = EventCatalogSync(FakeDB(), fetch=fetch, interval=600, retry_after=0)
+    assert catalog.ensure_populated() is False
+    assert catalog.ensure_populated() is False
+    assert catalog.ensure_populated() is True
+    assert fetch.calls == 3
+    assert catalog.stats["sync_failures"] == 2
+
+
+def test_backoff_doubles_up_to_the_interval():
+    catalog = EventCatalogSync(FakeDB(), fetch=FlakyFetch(fail_times=10), interval=300, retry_after=60)
+    waits = []
+    for _ in range(5):
+        catalog.sync()
+        waits.append(round(catalog._next_attempt - time.monotonic()))
+    assert waits == [60, 120, 240, 300, 300]
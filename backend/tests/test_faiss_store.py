@@ -0,0 +1,21 @@
+from core.faiss_store import LocalFaissIndex
+
+
+def vector(id, values, **metadata):
+    return {"id": id, "values": values, "metadata": {"text": f"{id} text", **metadata}}
+
+
+def test_reopened_index_lists_ids_and_metadata(tmp_path):
+    index = LocalFaissIndex(str(tmp_path / "jobs-index"), dimension=2)
+    index.upsert([
+        vector("job-1", [1.0, 0.0], title="Data Analyst", work_mode_norm="remote"),
+        vector("job-2", [0.0, 1.0], title="Content Writer"),
+    ])
+    index.save()
+
+    reopened = LocalFaissIndex.open(str(tmp_path / "jobs-index"))
+    assert sorted(reopened.ids()) == ["job-1", "job-2"]
+    metadata = reopened.metadata(["job-2", "job-3"])
+    assert list(metadata) == ["job-2"]
+    assert metadata["job-2"]["title"] == "Content Writer"
+    assert "work_mode_norm" not in metadata["job-2"]
@@ -0,0 +1,44 @@
+import threading
+from datetime import datetime, timedelta
+
+from core.job_cache import JobCacheRefresher
+
+
+class FakeDB:
+    def __init__(self):
+        self.entries = {}
+
+    def get_cached_job_entry(self, url):
+        return self.entries.get(url)
+
+    def cache_job_url(self, url, jobs, fresh_for, stale_for):
+        self.entries[url] = {"jobs": jobs, "fresh_until": datetime.utcnow() + fresh_for}
+
+
+def test_counters_are_not_lost_across_threads():
+    db = FakeDB()
+    db.entries["fresh"] = {"jobs": [{"title": "Data Analyst"}], "fresh_until": datetime.utcnow() + timedelta(hours=1)}
+    refresher = JobCacheRefresher(db, fetch=lambda url: [])
+
+    def read(url, times):
+        for _ in range(times):
+            refresher.get(url)
+
+    threads = [threading.Thread(target=read, args=(url, 500)) for url in ("fresh", "missing") for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert refresher.stats["fresh_hits"] == 2000
+    assert refresher.stats["misses"] == 2000
+
+
+def test_refresh_outcomes_are_counted():
+    db = FakeDB()
+    refresher = JobCacheRefresher(db, fetch=lambda url: [{"title": "Data Analyst"}] if url == "ok" else [])
+    refresher.refresh("ok")
+    refresher.refresh("empty")
+    assert refresher.stats["refreshes"] == 1
+    assert refresher.stats["refresh_failures"] == 1
+    assert db.entries["ok"]["jobs"] == [{"title": "Data Analyst"}]
@@ -0,0 +1,24 @@
+from core.pii import TieredPIIDetector
+
+ENTITIES = ["PHONE_NUMBER", "EMAIL_ADDRESS", "PERSON", "CRYPTO", "ID", "IP_ADDRESS"]
+
+
+def unused_analyzer():
+    raise AssertionError("the screen must not load the NER model")
+
+
+def test_clean_queries_are_ruled_out_by_tier_one():
+    detector = TieredPIIDetector(ENTITIES, analyzer_provider=unused_analyzer)
+    assert not detector.may_contain_pii("show me remote data analyst jobs")
+
+
+def test_possible_pii_is_not_ruled_out():
+    detector = TieredPIIDetector(ENTITIES, analyzer_provider=unused_analyzer)
+    assert detector.may_contain_pii("mail me at priya@example.com")
+    assert detector.may_contain_pii("my name is priya, any jobs?")
+    assert detector.may_contain_pii("call +91 98765 43210")
+
+
+def test_transformer_only_entities_are_never_ruled_out():
+    detector = TieredPIIDetector(ENTITIES, analyzer_provider=unused_analyzer, entity_tiers={"PERSON": "transformer"})
+    assert detector.may_contain_pii("show me remote data analyst jobs")
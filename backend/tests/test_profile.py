@@ -0,0 +1,53 @@
+from core.profile import ProfileExtractionQueue
+from core.store import SQLiteStore
+
+
+def conversation(*ids):
+    return [{"role": "user", "content": f"message {i}", "id": i} for i in ids]
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, messages, config):
+        self.calls.append([m["id"] for m in messages])
+
+
+def make_queue(store, extract):
+    return ProfileExtractionQueue(extract, store=store, debounce=0)
+
+
+def test_only_messages_after_the_last_extracted_one_are_sent(tmp_path):
+    extract = Recorder()
+    queue = make_queue(SQLiteStore(str(tmp_path / "store.sqlite3"), name="test_profile_offsets"), extract)
+    queue.submit("u1", "t1", conversation("a", "b"))
+    queue.flush(timeout=5)
+    queue.submit("u1", "t1", conversation("a", "b", "c", "d"))
+    queue.flush(timeout=5)
+    assert extract.calls == [["a", "b"], ["c", "d"]]
+
+
+def test_rolled_back_thread_is_sent_again_in_full(tmp_path):
+    extract = Recorder()
+    queue = make_queue(SQLiteStore(str(tmp_path / "store.sqlite3"), name="test_profile_rollback"), extract)
+    queue.submit("u1", "t1", conversation("a", "b", "c"))
+    queue.flush(timeout=5)
+    # "c" was discarded by a rollback and the thread grew past the old length since
+    queue.submit("u1", "t1", conversation("a", "b", "x", "y"))
+    queue.flush(timeout=5)
+    assert extract.calls == [["a", "b", "c"], ["a", "b", "x", "y"]]
+
+
+def test_offsets_survive_a_restart(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    first = Recorder()
+    queue = make_queue(SQLiteStore(path, name="test_profile_before_restart"), first)
+    queue.submit("u1", "t1", conversation("a", "b"))
+    queue.flush(timeout=5)
+
+    second = Recorder()
+    restarted = make_queue(SQLiteStore(path, name="test_profile_after_restart"), second)
+    restarted.submit("u1", "t1", conversation("a", "b", "c"))
+    restarted.flush(timeout=5)
+    assert second.calls == [["c"]]
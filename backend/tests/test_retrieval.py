@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from langchain_core.documents import Document
+
+from core.retrieval import JobSearch, job_filter_fields, normalize_filters
+
+
+class FakeVectorStore:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def similarity_search(self, query, k, filter=None):
+        return self.documents[:k]
+
+
+class FakeRetriever:
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+        self.search_kwargs = {"k": 2}
+
+
+class FakeCorpus:
+    """MongoDB.get_job_corpus over an in-memory list of entries."""
+    def __init__(self):
+        self.entries = {}
+        self.clock = datetime(2025, 1, 1)
+
+    def upsert(self, key, title, skills, work_mode="Remote"):
+        self.clock += timedelta(seconds=1)
+        job = {"title": title, "skills": skills, "work_mode": work_mode, "location": "Bengaluru"}
+        self.entries[key] = {"key": key, "text": title, "metadata": {**job, **job_filter_fields(job)}, "updated_at": self.clock}
+
+    def __call__(self, updated_after=None):
+        return sorted((e for e in self.entries.values() if updated_after is None or e["updated_at"] > updated_after),
+                      key=lambda e: e["updated_at"])
+
+
+def make_search(corpus, vector_docs=()):
+    search = JobSearch(FakeRetriever(FakeVectorStore(list(vector_docs))), ttl=60, hybrid=False, corpus=corpus)
+    search.refresh_lexical()
+    return search
+
+
+def test_newly_ingested_jobs_reach_the_lexical_index():
+    corpus = FakeCorpus()
+    corpus.upsert("job-1", "Data Analyst", "SQL, Tableau")
+    search = make_search(corpus)
+    assert len(search.lexical) == 1
+    assert search.search("kotlin developer") == []
+
+    corpus.upsert("job-2", "Android Developer", "Kotlin, Java")
+    assert search.refresh_lexical() == 1
+    assert [doc.id for doc in search.search("kotlin developer")] == ["job-2"]
+    # Nothing changed since, so the index is not rebuilt
+    assert search.refresh_lexical() == 0
+
+
+def test_changed_jobs_replace_their_old_version():
+    corpus = FakeCorpus()
+    corpus.upsert("job-1", "Data Analyst", "SQL")
+    search = make_search(corpus)
+    corpus.upsert("job-1", "Data Engineer", "Spark")
+    search.refresh_lexical()
+    assert len(search.lexical) == 1
+    assert [doc.id for doc in search.search("spark")] == ["job-1"]
+
+
+def test_lexical_results_are_filtered_and_fused_with_vectors():
+    corpus = FakeCorpus()
+    corpus.upsert("job-1", "Python Developer", "Python, Django", work_mode="Hybrid")
+    corpus.upsert("job-2", "Python Engineer", "Python, AWS", work_mode="Remote")
+    vector_doc = Document(id="job-3", page_content="Backend Engineer", metadata={})
+    search = make_search(corpus, [vector_doc])
+
+    docs = search.search("python", k=3, filters=normalize_filters(work_mode="remote"))
+    assert {doc.id for doc in docs} == {"job-2", "job-3"}
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+import core.store
+from core.store import PersistentStore, SQLiteStore, create_store
+
+
+class FakeEmbeddings:
+    """Two-dimensional vectors: how often "python" and "design" occur in the text."""
+    def _vector(self, text):
+        text = text.lower()
+        return [float(text.count("python")), float(text.count("design"))]
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "store.sqlite3")
+
+
+def test_storage_primitives_are_abstract():
+    with pytest.raises(TypeError):
+        PersistentStore()
+
+
+def test_put_get_search_round_trip(path):
+    store = SQLiteStore(path, name="test_round_trip")
+    store.put(("users", "u1", "profile"), "profile", {"name": "Asha", "skills": ["python"]})
+    store.put(("users", "u2", "profile"), "profile", {"name": "Meera"})
+
+    item = store.get(("users", "u1", "profile"), "profile")
+    assert item.value == {"name": "Asha", "skills": ["python"]}
+    assert item.namespace == ("users", "u1", "profile")
+    assert [i.value["name"] for i in store.search(("users", "u1"))] == ["Asha"]
+    assert len(store.search(("users",))) == 2
+    assert [i.value["name"] for i in store.search(("users",), filter={"name": "Meera"})] == ["Meera"]
+
+    # A fresh store on the same file sees the same items
+    reopened = SQLiteStore(path, name="test_round_trip_reopened")
+    assert reopened.get(("users", "u1", "profile"), "profile").value["name"] == "Asha"
+    assert sorted(reopened.list_namespaces(prefix=("users",))) == [("users", "u1", "profile"), ("users", "u2", "profile")]
+
+    store.delete(("users", "u1", "profile"), "profile")
+    assert store.get(("users", "u1", "profile"), "profile") is None
+    assert store.search(("users", "u1")) == []
+
+
+def test_write_invalidates_own_hot_cache(path):
+    store = SQLiteStore(path, name="test_invalidate")
+    namespace = ("users", "u1", "profile")
+    assert store.search(namespace) == []
+    store.put(namespace, "profile", {"name": "Asha"})
+    assert [i.value["name"] for i in store.search(namespace)] == ["Asha"]
+    store.put(namespace, "profile", {"name": "Asha R"})
+    assert store.get(namespace, "profile").value["name"] == "Asha R"
+
+
+def test_other_workers_writes_are_seen_after_the_ttl(path):
+    namespace = ("users", "u1", "profile")
+    reader = SQLiteStore(path, cache_ttl=0.2, name="test_ttl_reader")
+    writer = SQLiteStore(path, name="test_ttl_writer")
+    assert reader.search(namespace) == []
+
+    writer.put(namespace, "profile", {"name": "Asha"})
+    assert reader.search(namespace) == []
+    time.sleep(0.3)
+    assert [i.value["name"] for i in reader.search(namespace)] == ["Asha"]
+
+
+def test_cache_can_be_turned_off(path):
+    namespace = ("users", "u1", "profile")
+    reader = SQLiteStore(path, cache_ttl=0, name="test_uncached_reader")
+    writer = SQLiteStore(path, name="test_uncached_writer")
+    assert reader.get(namespace, "profile") is None
+    writer.put(namespace, "profile", {"name": "Asha"})
+    assert reader.get(namespace, "profile").value["name"] == "Asha"
+    assert reader.stats()["hot_cache"] is None
+
+
+def test_only_opted_in_namespaces_are_embedded(path):
+    store = SQLiteStore(path, embeddings=FakeEmbeddings(), embed_namespaces=[("users", "*", "memories")], name="test_embed")
+    store.put(("users", "u1", "memories"), "a", {"text": "design systems"})
+    store.put(("users", "u1", "memories"), "b", {"text": "python python backend"})
+    store.put(("users", "u1", "profile"), "profile", {"text": "python"})
+    assert store.counters["embedded_texts"] == 2
+
+    ranked = store.search(("users", "u1", "memories"), query="python jobs")
+    assert [i.key for i in ranked] == ["b", "a"]
+    assert ranked[0].score > ranked[1].score
+
+
+def test_empty_sqlite_path_uses_the_default_file(path, monkeypatch):
+    monkeypatch.setattr(core.store, "DEFAULT_SQLITE_PATH", path)
+    monkeypatch.setenv("STORE_BACKEND", "sqlite")
+    monkeypatch.setenv("STORE_SQLITE_PATH", "")
+    monkeypatch.delenv("STORE_EMBED_NAMESPACES", raising=False)
+    store = create_store()
+    assert store.path == path
+    store.put(("users", "u1", "profile"), "profile", {"work_mode": "remote"})
+    assert SQLiteStore(path).get(("users", "u1", "profile"), "profile").value == {"work_mode": "remote"}
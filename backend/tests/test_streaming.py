@@ -0,0 +1,150 @@
+import json
+import threading
+from concurrent.futures import Future
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from core.tool_runner import ToolRunner
+from server.users.streaming import SpeculativeStream, bias_error_payload, sse
+
+
+class StubOutcome:
+    def to_dict(self):
+        return {"validationPassed": False, "validatedOutput": "rephrased query"}
+
+
+class StubGuardRun:
+    """A GuardRun whose bias verdict the test decides, from any thread."""
+    speculative = True
+
+    def __init__(self):
+        self.verdict = Future()
+
+    def decide(self, failed: bool):
+        self.verdict.set_result(failed)
+
+    def bias_failed(self, timeout=None):
+        return self.verdict.result(timeout=timeout)
+
+    def add_bias_callback(self, fn):
+        self.verdict.add_done_callback(lambda _: fn())
+
+    def outcome(self):
+        return StubOutcome()
+
+
+class ObservedStream(SpeculativeStream):
+    """Signals when the worker has finished discarding, since that happens after the response ends."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.discarded = threading.Event()
+
+    def _discard(self, before):
+        super()._discard(before)
+        self.discarded.set()
+
+
+def fail_later(guard_run, delay=0.2):
+    """Fails the verdict after the agent node, while the profile tool is already waiting on it."""
+    threading.Timer(delay, guard_run.decide, args=(True,)).start()
+
+
+def build_graph(profile_updates, on_agent=lambda: None):
+    """agent -> tools -> generate, where the agent always asks for a profile update."""
+    def update_profile(state, tool_call):
+        profile_updates.append(tool_call["id"])
+        return ToolMessage(content="User profile update queued.", name=tool_call["name"], tool_call_id=tool_call["id"])
+
+    runner = ToolRunner({"update_user_profile_tool": update_profile}, timeout=5, side_effects={"update_user_profile_tool"})
+
+    def agent(state):
+        on_agent()
+        call = {"name": "update_user_profile_tool", "args": {}, "id": f"call-{len(state['messages'])}"}
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+
+    def tools(state):
+        return {"messages": runner.run(state, state["messages"][-1].tool_calls)}
+
+    def generate(state):
+        return {"messages": [AIMessage(content="Here is your answer")]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_node("tools", tools)
+    graph.add_node("generate", generate)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", "tools")
+    graph.add_edge("tools", "generate")
+    graph.add_edge("generate", END)
+    return graph.compile(checkpointer=InMemorySaver())
+
+
+def config(thread_id):
+    return {"configurable": {"user_id": "u1", "thread_id": thread_id}}
+
+
+def inputs(text):
+    return {"messages": [HumanMessage(content=text)]}
+
+
+def payloads(chunks):
+    return [json.loads(chunk.decode("utf-8")[len("data: "):]) for chunk in chunks]
+
+
+def test_passed_verdict_flushes_the_held_chunks():
+    profile_updates = []
+    guard_run = StubGuardRun()
+    # The verdict arrives while the graph is already running
+    graph = build_graph(profile_updates, on_agent=lambda: guard_run.decide(False))
+
+    stream = SpeculativeStream(graph, guard_run, inputs("remote jobs please"), config("t1"))
+    sent = payloads(list(stream))
+
+    assert stream.completed
+    assert "Here is your answer" in [p.get("content") for p in sent]
+    assert all(p["payload_type"] != "validation_error" for p in sent)
+    assert profile_updates == ["call-1"]
+    assert len(graph.get_state(config("t1")).values["messages"]) == 4
+
+
+def test_failed_verdict_sends_only_the_bias_error_and_restores_the_thread():
+    profile_updates = []
+    failing = []
+    # The second turn's verdict fails while its graph run is already under way
+    graph = build_graph(profile_updates, on_agent=lambda: failing and fail_later(failing[0]))
+    first = StubGuardRun()
+    first.decide(False)
+    list(SpeculativeStream(graph, first, inputs("remote jobs please"), config("t1")))
+    before = graph.get_state(config("t1"))
+    assert profile_updates == ["call-1"]
+
+    guard_run = StubGuardRun()
+    failing.append(guard_run)
+    stream = ObservedStream(graph, guard_run, inputs("a biased query"), config("t1"))
+    chunks = list(stream)
+
+    assert chunks == [sse(bias_error_payload(guard_run))]
+    assert stream.completed
+    assert stream.discarded.wait(5)
+    after = graph.get_state(config("t1"))
+    assert after.values["messages"] == before.values["messages"]
+    # Forking from the pre-run checkpoint leaves it as the parent of the thread's latest state
+    assert after.parent_config["configurable"]["checkpoint_id"] == before.config["configurable"]["checkpoint_id"]
+    # The profile update of the discarded run waited for the verdict and never ran
+    assert profile_updates == ["call-1"]
+
+
+def test_failed_verdict_on_a_new_thread_deletes_it():
+    profile_updates = []
+    guard_run = StubGuardRun()
+    graph = build_graph(profile_updates, on_agent=lambda: fail_later(guard_run))
+
+    stream = ObservedStream(graph, guard_run, inputs("a biased query"), config("t2"))
+    chunks = list(stream)
+
+    assert chunks == [sse(bias_error_payload(guard_run))]
+    assert stream.discarded.wait(5)
+    assert graph.get_state(config("t2")).values == {}
+    assert profile_updates == []
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from langchain_core.messages import ToolMessage
+
+from core.tool_runner import ToolRunner
+
+
+def reply(content):
+    def handler(state, tool_call):
+        return ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"])
+    return handler
+
+
+def call(name, id):
+    return {"name": name, "args": {}, "id": id}
+
+
+def test_calls_run_concurrently_with_per_tool_timeouts():
+    release = threading.Event()
+
+    def slow(state, tool_call):
+        release.wait(5)
+        return reply("too late")(state, tool_call)
+
+    def failing(state, tool_call):
+        raise RuntimeError("scrape failed")
+
+    runner = ToolRunner(
+        {"slow_tool": slow, "failing_tool": failing, "search_tool": reply("3 jobs")},
+        timeout=5,
+        timeouts={"slow_tool": 0.2},
+    )
+    started = time.monotonic()
+    try:
+        results = runner.run({"messages": []}, [call("slow_tool", "c1"), call("failing_tool", "c2"), call("search_tool", "c3"), call("missing_tool", "c4")])
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+
+    assert [m.tool_call_id for m in results] == ["c1", "c2", "c3", "c4"]
+    assert results[0].status == "error" and "timed out after 0.2 seconds" in results[0].content
+    assert results[1].status == "error" and "scrape failed" in results[1].content
+    assert results[2].status == "success" and results[2].content == "3 jobs"
+    assert results[3].status == "error" and "Unknown tool" in results[3].content
+
+
+def test_calls_do_not_wait_for_each_other():
+    def sleepy(state, tool_call):
+        time.sleep(0.3)
+        return reply("done")(state, tool_call)
+
+    runner = ToolRunner({"a": sleepy, "b": sleepy}, timeout=0.5)
+    started = time.monotonic()
+    results = runner.run({"messages": []}, [call("a", "c1"), call("b", "c2")])
+    # Both calls ran at once, so neither waited for the other to finish
+    assert time.monotonic() - started < 0.5
+    assert [m.content for m in results] == ["done", "done"]